@@ -6,9 +6,15 @@ from .models import (
     ExistingLoan,
     Document,
     CreditAssessment,
+    AssessmentJob,
     Transaction,
     Payment,
-    DueEntry
+    DueEntry,
+    EMIPlan,
+    EMIInstallment,
+    SupplierLedgerSummary,
+    SupplierMonthlyRollup,
+    SupplierDailyRollup
 )
 
 @admin.register(UserProfile)
@@ -46,6 +52,13 @@ class CreditAssessmentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'assessment_date')
     search_fields = ('retailer__user_profile__business_name',)
 
+@admin.register(AssessmentJob)
+class AssessmentJobAdmin(admin.ModelAdmin):
+    list_display = ('retailer', 'status', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('retailer__user_profile__business_name', 'worker')
+    raw_id_fields = ('retailer', 'assessment', 'requested_by')
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('supplier', 'retailer', 'amount', 'status', 'created_at', 'due_date')
@@ -54,12 +67,47 @@ class TransactionAdmin(admin.ModelAdmin):
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
-    list_display = ('transaction', 'amount', 'payment_method', 'status', 'payment_date')
+    list_display = ('due', 'transaction', 'amount', 'payment_method', 'status', 'payment_date')
     list_filter = ('status', 'payment_date', 'payment_method')
-    search_fields = ('transaction__supplier__business_name', 'transaction__retailer__business_name')
+    search_fields = (
+        'due__supplier__business_name', 'due__retailer__business_name',
+        'transaction__supplier__business_name', 'transaction__retailer__business_name',
+        'reference_id', 'idempotency_key'
+    )
 
 @admin.register(DueEntry)
 class DueEntryAdmin(admin.ModelAdmin):
-    list_display = ('supplier', 'retailer', 'amount', 'status', 'due_date')
+    list_display = ('supplier', 'retailer', 'amount', 'amount_paid', 'status', 'due_date')
     list_filter = ('status', 'due_date')
-    search_fields = ('supplier__business_name', 'retailer__business_name')
\ No newline at end of file
+    search_fields = ('supplier__business_name', 'retailer__business_name')
+
+@admin.register(EMIPlan)
+class EMIPlanAdmin(admin.ModelAdmin):
+    list_display = ('due', 'tenure_months', 'interest_rate', 'monthly_amount', 'total_amount', 'status', 'created_at')
+    list_filter = ('status', 'tenure_months', 'created_at')
+    search_fields = ('due__supplier__business_name', 'due__retailer__business_name')
+    raw_id_fields = ('due', 'activated_by')
+
+@admin.register(EMIInstallment)
+class EMIInstallmentAdmin(admin.ModelAdmin):
+    list_display = ('plan', 'number', 'due_date', 'amount', 'status', 'paid_at')
+    list_filter = ('status', 'due_date')
+    raw_id_fields = ('plan',)
+
+@admin.register(SupplierLedgerSummary)
+class SupplierLedgerSummaryAdmin(admin.ModelAdmin):
+    list_display = ('supplier', 'total_outstanding', 'overdue_amount', 'active_retailers', 'updated_at')
+    search_fields = ('supplier__business_name',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(SupplierMonthlyRollup)
+class SupplierMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('supplier', 'month', 'transaction_amount', 'due_count', 'paid_count', 'overdue_count', 'retailer_count')
+    list_filter = ('month',)
+    search_fields = ('supplier__business_name',)
+
+@admin.register(SupplierDailyRollup)
+class SupplierDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('supplier', 'day', 'transaction_amount', 'transaction_count')
+    list_filter = ('day',)
+    search_fields = ('supplier__business_name',)
\ No newline at end of file
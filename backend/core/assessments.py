@@ -0,0 +1,182 @@
+"""
+Credit assessment job queue.
+
+request_assessment() records a pending CreditAssessment and queues an
+AssessmentJob for it; the request returns at once and the scoring runs in
+the run_assessment_worker command. The worker claims batches of queued
+jobs and hands each batch to a process pool, where run_jobs() scores the
+retailers with core.scoring, fills in their assessments and marks the jobs
+done in one transaction, then sends a credit_limit_updated event for each
+retailer.
+
+Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED where the database
+supports it. SQLite has no row locks, so there a single
+UPDATE ... RETURNING claims the batch under the database write lock.
+A job left running by a worker that died is queued again once its lease
+has expired, up to MAX_ATTEMPTS times.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import events, scoring
+from .fastpath import values_serializer
+from .models import AssessmentJob, CreditAssessment, DueEntry, RetailerProfile, UserProfile
+from .serializers import RetailerProfileSerializer
+
+DEFAULT_BATCH_SIZE = 200
+LEASE = timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+
+
+def active_job(retailer):
+    return AssessmentJob.objects.filter(
+        retailer=retailer, status__in=['queued', 'running']
+    ).select_related('assessment').first()
+
+
+def request_assessment(retailer, requested_by=None):
+    """
+    Queue an assessment of retailer (a RetailerProfile). Returns (job,
+    created); a retailer with a job already queued or running gets that job.
+    """
+    existing = active_job(retailer)
+    if existing is not None:
+        return existing, False
+    try:
+        with transaction.atomic():
+            assessment = CreditAssessment.objects.create(retailer=retailer, status='pending')
+            job = AssessmentJob.objects.create(
+                retailer=retailer, assessment=assessment, requested_by=requested_by
+            )
+    except IntegrityError:
+        existing = active_job(retailer)
+        if existing is None:
+            raise
+        return existing, False
+    return job, True
+
+
+def claim(worker, batch_size=DEFAULT_BATCH_SIZE):
+    """Mark up to batch_size queued jobs as running for worker; returns their ids."""
+    now = timezone.now()
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(
+                AssessmentJob.objects.filter(status='queued').order_by('id')
+                .select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+            )
+            AssessmentJob.objects.filter(id__in=ids).update(
+                status='running', worker=worker, claimed_at=now, attempts=F('attempts') + 1
+            )
+            return ids
+
+        table = AssessmentJob._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET status = %s, worker = %s, claimed_at = %s, attempts = attempts + 1 '
+                f'WHERE id IN (SELECT id FROM {table} WHERE status = %s ORDER BY id LIMIT %s) RETURNING id',
+                ['running', worker, connection.ops.adapt_datetimefield_value(now), 'queued', batch_size]
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+
+
+def requeue_expired(lease=LEASE):
+    """Queue again the jobs whose worker has held them longer than lease; returns how many."""
+    expired = AssessmentJob.objects.filter(status='running', claimed_at__lt=timezone.now() - lease)
+    with transaction.atomic():
+        failed = expired.filter(attempts__gte=MAX_ATTEMPTS).update(
+            status='failed', error='Worker did not finish the job', finished_at=timezone.now()
+        )
+        requeued = expired.update(status='queued', worker='')
+    return failed + requeued
+
+
+def run_jobs(job_ids):
+    """
+    Score the retailers of the given running jobs, complete them and publish
+    the results. Runs in a worker process; returns the ids of the jobs it
+    completed.
+    """
+    jobs = list(AssessmentJob.objects.filter(id__in=job_ids, status='running').select_related('assessment'))
+    if not jobs:
+        return []
+    profiles = list(
+        RetailerProfile.objects.filter(id__in={job.retailer_id for job in jobs})
+        .order_by('id').values_list(*scoring.PROFILE_FIELDS)
+    )
+    updated, _ = scoring.build_updates(profiles, record=False)
+    results = {profile.id: profile for profile in updated}
+    now = timezone.now()
+
+    assessments = []
+    for job in jobs:
+        assessment = job.assessment
+        assessment.credit_score = results[job.retailer_id].credit_score
+        assessment.approved_limit = results[job.retailer_id].credit_limit
+        assessment.status = scoring.assessment_status(assessment.approved_limit)
+        assessment.updated_at = now
+        assessments.append(assessment)
+        job.status = 'done'
+        job.finished_at = now
+
+    # All reads are done, so on SQLite the transaction opens with a write
+    with transaction.atomic():
+        scoring.write_updates(updated)
+        CreditAssessment.objects.bulk_update(
+            assessments, ['credit_score', 'approved_limit', 'status', 'updated_at']
+        )
+        AssessmentJob.objects.bulk_update(jobs, ['status', 'finished_at'])
+    # Published from the worker process too, so sending scales with the pool
+    publish_results([job.id for job in jobs])
+    return [job.id for job in jobs]
+
+
+def fail_jobs(job_ids, error):
+    """Record that a batch raised; jobs with attempts left are queued again."""
+    running = AssessmentJob.objects.filter(id__in=job_ids, status='running')
+    with transaction.atomic():
+        running.filter(attempts__gte=MAX_ATTEMPTS).update(
+            status='failed', error=error, finished_at=timezone.now()
+        )
+        running.update(status='queued', worker='', error=error)
+
+
+def release(job_ids):
+    """Queue claimed jobs again without counting the attempt, e.g. when a worker stops before running them."""
+    AssessmentJob.objects.filter(id__in=job_ids, status='running').update(
+        status='queued', worker='', attempts=F('attempts') - 1
+    )
+
+
+def publish_results(job_ids):
+    """Send credit_limit_updated for each completed job to the retailer, the requester and its suppliers."""
+    jobs = list(AssessmentJob.objects.filter(id__in=job_ids).select_related(
+        'requested_by', 'retailer__user_profile'
+    ))
+    retailer_profile_ids = [job.retailer.user_profile_id for job in jobs]
+    fast = values_serializer(RetailerProfileSerializer)
+    profiles = fast.index_by_pk(fast.rows(RetailerProfile.objects.filter(id__in=[job.retailer_id for job in jobs])))
+    suppliers_by_retailer = {}
+    supplier_ids = set()
+    for supplier_id, retailer_id in DueEntry.objects.filter(
+        retailer_id__in=retailer_profile_ids
+    ).order_by().values_list('supplier_id', 'retailer_id').distinct():
+        suppliers_by_retailer.setdefault(retailer_id, []).append(supplier_id)
+        supplier_ids.add(supplier_id)
+    suppliers = UserProfile.objects.in_bulk(list(supplier_ids))
+
+    payloads = []
+    for job in jobs:
+        payload = {
+            'data': fast.to_representation(profiles[job.retailer_id]),
+            'assessment': job.assessment_id,
+        }
+        recipients = [job.retailer.user_profile, job.requested_by] + [
+            suppliers[supplier_id] for supplier_id in suppliers_by_retailer.get(job.retailer.user_profile_id, [])
+        ]
+        recipients = {profile.user_id: profile for profile in recipients if profile is not None}
+        payloads.extend((profile, payload) for profile in recipients.values())
+    events.publish_each('credit_limit_updated', payloads)
@@ -0,0 +1,121 @@
+"""
+Conditional GET for the dashboard and list endpoints.
+
+The frontend refetches these on every real-time event and connection poll,
+usually to find nothing has changed. Each endpoint has a version function
+that reads a cheap per-user token: the row count and latest updated_at of
+the user's dues (and, for analytics, transactions), served from the
+(participant, updated_at) indexes, or the ledger summary's updated_at for
+the stats. dues/ and retailers/ embed names and phones from the profiles on
+both sides of the dues, so their token adds those profiles' latest
+updated_at, which a profile save, or a save of its User, moves. The ETag
+hashes that token with the user, the full request path and the response
+format, so a matching If-None-Match gets 304 Not Modified before the view
+runs its main query or serializes anything.
+
+Counting rows catches deletions, which would not move a latest-updated_at
+token on their own. Every write to DueEntry and Transaction sets
+updated_at, including the queryset updates in core.overdue.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import ledger
+from .models import DueEntry, SupplierLedgerSummary, Transaction, UserProfile
+
+
+COUNTERPARTS = {'supplier': 'retailer', 'retailer': 'supplier'}
+
+
+def _profile(request):
+    return UserProfile.objects.filter(user_id=request.user.id).values_list(
+        'id', 'user_type', 'updated_at'
+    ).first()
+
+
+def _version(queryset):
+    totals = queryset.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return totals['count'], totals['updated']
+
+
+def _dues_version(profile):
+    """The user's dues token with the latest change to their own and their counterparts' profiles."""
+    profile_id, user_type, updated_at = profile
+    totals = DueEntry.objects.filter(**{user_type: profile_id}).aggregate(
+        count=Count('id'), updated=Max('updated_at'),
+        counterparts_updated=Max(f'{COUNTERPARTS[user_type]}__updated_at')
+    )
+    return totals['count'], totals['updated'], totals['counterparts_updated'], updated_at
+
+
+def make_etag(request, *version):
+    key = '|'.join(str(part) for part in (
+        request.user.id, request.get_full_path(), request.accepted_renderer.format, *version
+    ))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def stats_etag(request):
+    profile = _profile(request)
+    if profile is None or profile[1] != 'supplier':
+        return None
+    updated_at = SupplierLedgerSummary.objects.filter(supplier_id=profile[0]).values_list(
+        'updated_at', flat=True
+    ).first()
+    if updated_at is None:
+        return None
+    # Monthly sales is a trailing window, so the token moves with the day too
+    return make_etag(request, updated_at, ledger.sales_window_start())
+
+
+def analytics_etag(request):
+    profile = _profile(request)
+    if profile is None or profile[1] != 'supplier':
+        return None
+    return make_etag(
+        request,
+        *_version(DueEntry.objects.filter(supplier_id=profile[0])),
+        *_version(Transaction.objects.filter(supplier_id=profile[0])),
+        timezone.localdate()
+    )
+
+
+def dues_etag(request):
+    profile = _profile(request)
+    if profile is None or profile[1] not in COUNTERPARTS:
+        return None
+    return make_etag(request, *_dues_version(profile))
+
+
+def retailers_etag(request):
+    """The retailers on the supplier's dues."""
+    profile = _profile(request)
+    if profile is None or profile[1] != 'supplier':
+        return None
+    return make_etag(request, *_dues_version(profile))
+
+
+def conditional(etag_func):
+    """
+    condition() for @api_view views: a successful response carries the ETag
+    and is marked private and always revalidated, so the browser's cache
+    sends If-None-Match and hands the cached body back on a 304.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, private=True, no_cache=True)
+            elif response.has_header('ETag'):
+                del response.headers['ETag']
+            return response
+        return inner
+    return decorator
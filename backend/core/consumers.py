@@ -2,82 +2,64 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
+from .events import user_group
 
 class UpdatesConsumer(AsyncWebsocketConsumer):
+    """
+    Forwards the events core.events publishes to the connected user.
+
+    due_updated carries a single changed due. The overdue sweep
+    (core.overdue) sends dues_updated instead of one due_updated per due:
+    each recipient gets one message per chunk listing its changed dues.
+    Per-due events would mean thousands of messages per chunk, each with
+    its own sequence number and recomputed stats. Clients apply a
+    dues_updated as they would each due_updated in it.
+    """
+
     async def connect(self):
-        user_id = self.scope['url_route']['kwargs']['user_id']
-        user_type = self.scope['url_route']['kwargs']['user_type']
-        
-        self.user_group = f"user_{user_id}"
-        self.user_type_group = f"type_{user_type}"
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
 
-        # Join user-specific group
-        await self.channel_layer.group_add(
-            self.user_group,
-            self.channel_name
-        )
+        self.user_group = user_group(user.id)
 
-        # Join user-type group
+        # Join user-specific group; the server publishes only to the users
+        # an event affects (see core.events)
         await self.channel_layer.group_add(
-            self.user_type_group,
+            self.user_group,
             self.channel_name
         )
 
         await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.user_group,
-            self.channel_name
-        )
-        await self.channel_layer.group_discard(
-            self.user_type_group,
-            self.channel_name
-        )
+        if hasattr(self, 'user_group'):
+            await self.channel_layer.group_discard(
+                self.user_group,
+                self.channel_name
+            )
 
     async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        event_type = text_data_json['type']
-        data = text_data_json['data']
+        # Events are published by the server when the underlying write
+        # commits; client-sent events are not rebroadcast.
+        pass
 
-        # Handle different event types
-        if event_type == 'due_created':
-            await self.channel_layer.group_send(
-                f"type_retailer",
-                {
-                    'type': 'due_created',
-                    'data': data
-                }
-            )
-        elif event_type == 'payment_made':
-            await self.channel_layer.group_send(
-                f"type_supplier",
-                {
-                    'type': 'payment_made',
-                    'data': data
-                }
-            )
+    async def forward(self, event):
+        # Server events are already JSON-safe deltas (see core.events)
+        await self.send(text_data=json.dumps(event))
 
     async def due_created(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'due_created',
-            'data': event['data']
-        }))
+        await self.forward(event)
 
     async def due_updated(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'due_updated',
-            'data': event['data']
-        }))
+        await self.forward(event)
+
+    async def dues_updated(self, event):
+        await self.forward(event)
 
     async def payment_made(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'payment_made',
-            'data': event['data']
-        }))
+        await self.forward(event)
 
     async def credit_limit_updated(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'credit_limit_updated',
-            'data': event['data']
-        }))
\ No newline at end of file
+        await self.forward(event)
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Incremental maintenance of RetailerProfile.available_credit.
+
+available_credit is the retailer's credit_limit less the open balance
+(amount - amount_paid of pending and overdue dues) owed across suppliers.
+The DueEntry signal handlers in core.signals apply the change in open
+balance with a single F-expression UPDATE whenever a due is created, paid
+(in full or in part) or deleted. Anything that bypasses signals must call
+apply_credit_deltas() itself, as core.imports does; imports also turn away
+rows that would take a retailer over its limit, as create_due does.
+Migration 0019 set the value for retailers that had dues before it was
+maintained.
+
+Retailers without a RetailerProfile, or whose profile has never been
+assessed (no credit_score and no credit_limit), are not limited.
+reconcile() recomputes the value from the dues and repairs drift.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import DueEntry, RetailerProfile
+
+ZERO = Decimal('0')
+OPEN_STATUSES = ('pending', 'overdue')
+DELTA_BATCH_SIZE = 500
+HALF_PAISA = Decimal('0.005')
+
+
+class CreditLimitExceeded(ValueError):
+    pass
+
+
+def open_balance(status, amount, amount_paid=0):
+    """The amount a due in this state holds against the retailer's limit."""
+    if status not in OPEN_STATUSES:
+        return ZERO
+    return Decimal(amount or 0) - Decimal(amount_paid or 0)
+
+
+def apply_credit_delta(retailer_id, open_delta):
+    """Reflect a change of open_delta in retailer_id's (a UserProfile id) open balance."""
+    if open_delta:
+        RetailerProfile.objects.filter(user_profile_id=retailer_id).update(
+            available_credit=F('available_credit') - open_delta
+        )
+
+
+def apply_credit_deltas(deltas, batch_size=DELTA_BATCH_SIZE):
+    """
+    apply_credit_delta() for many retailers, one UPDATE per batch_size
+    retailers; deltas maps retailer_id to open_delta.
+    """
+    deltas = [(retailer_id, delta) for retailer_id, delta in deltas.items() if delta]
+    for start in range(0, len(deltas), batch_size):
+        batch = dict(deltas[start:start + batch_size])
+        RetailerProfile.objects.filter(user_profile_id__in=batch).update(
+            available_credit=F('available_credit') - Case(
+                *(When(user_profile_id=retailer_id, then=Value(delta)) for retailer_id, delta in batch.items()),
+                default=Value(ZERO),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+
+def limited_available_credit(retailer_ids):
+    """available_credit of each retailer in retailer_ids (UserProfile ids) that has a limit."""
+    return {
+        retailer_id: available_credit
+        for retailer_id, credit_score, credit_limit, available_credit in RetailerProfile.objects.filter(
+            user_profile_id__in=retailer_ids
+        ).values_list('user_profile_id', 'credit_score', 'credit_limit', 'available_credit')
+        if credit_score is not None or credit_limit
+    }
+
+
+def check_limit(retailer_id, amount):
+    """
+    Raise CreditLimitExceeded if a new due of amount left retailer_id over
+    its limit. Called after the due has been written, so the value read
+    already includes it and the row stays locked against concurrent dues
+    until the transaction ends.
+    """
+    row = RetailerProfile.objects.filter(user_profile_id=retailer_id).values_list(
+        'credit_score', 'credit_limit', 'available_credit'
+    ).first()
+    if row is None:
+        return
+    credit_score, credit_limit, available_credit = row
+    if credit_score is None and not credit_limit:
+        return
+    if available_credit < 0:
+        raise CreditLimitExceeded(
+            f'Amount exceeds the retailer\'s available credit of {available_credit + Decimal(amount):.2f}'
+        )
+
+
+def _expected_available():
+    balance = DueEntry.objects.filter(
+        retailer_id=OuterRef('user_profile_id'), status__in=OPEN_STATUSES
+    ).order_by().values('retailer_id').annotate(
+        balance=Sum(F('amount') - F('amount_paid'))
+    ).values('balance')
+    return F('credit_limit') - Coalesce(
+        Subquery(balance), Value(ZERO), output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def drifted(retailer_ids=None):
+    """RetailerProfiles whose available_credit disagrees with their dues, annotated with 'expected'."""
+    profiles = RetailerProfile.objects.all()
+    if retailer_ids is not None:
+        profiles = profiles.filter(id__in=retailer_ids)
+    # Within half a paisa: SQLite keeps decimals as floats, so F() updates
+    # can leave rounding error that is not real drift
+    return profiles.annotate(expected=_expected_available()).filter(
+        Q(available_credit__gt=F('expected') + HALF_PAISA)
+        | Q(available_credit__lt=F('expected') - HALF_PAISA)
+    )
+
+
+def reconcile(retailer_ids=None):
+    """Recompute available_credit for every drifted profile in one UPDATE; returns the number repaired."""
+    return drifted(retailer_ids).update(available_credit=_expected_available())
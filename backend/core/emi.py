@@ -0,0 +1,159 @@
+"""
+EMI (equated monthly instalment) plans for paying off a due.
+
+plan_options() prices every tenure in TENURES for a due's outstanding
+balance at the retailer's interest rate. The amortization factor (EMI per
+rupee of principal) is computed for all tenures at once with NumPy and
+cached per (rate, tenure set) in a bounded LRU cache. EMIs scale linearly
+with the principal, so one cached table serves every amount and a listing
+is a handful of Decimal multiplications.
+
+activate() turns one option into an EMIPlan and writes its instalment
+schedule with a single bulk_create. Every instalment is the same amount;
+the last one's principal/interest split absorbs rounding, so principal
+sums to the financed balance exactly.
+"""
+import calendar
+from datetime import date
+from decimal import ROUND_HALF_UP, ROUND_UP, Decimal
+from functools import lru_cache
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import DueEntry, EMIInstallment, EMIPlan
+
+TENURES = (3, 6, 9, 12, 18, 24)
+
+# (minimum credit score, annual interest rate %), best band first
+RATE_BANDS = (
+    (750, Decimal('12.00')),
+    (650, Decimal('15.00')),
+    (550, Decimal('18.00')),
+)
+DEFAULT_RATE = Decimal('21.00')
+
+MIN_PRINCIPAL = Decimal('1000')
+PLAN_CACHE_SIZE = 256
+PAISA = Decimal('0.01')
+
+
+class EMIRejected(ValueError):
+    pass
+
+
+def interest_rate(credit_score):
+    if credit_score is not None:
+        for floor, rate in RATE_BANDS:
+            if credit_score >= floor:
+                return rate
+    return DEFAULT_RATE
+
+
+def _monthly_rate(rate):
+    return float(rate) / 1200
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def amortization_factors(rate, tenures=TENURES):
+    """EMI per rupee of principal for each of tenures at an annual rate (percent)."""
+    months = np.array(tenures, dtype=np.float64)
+    monthly_rate = _monthly_rate(rate)
+    if monthly_rate == 0:
+        factors = 1 / months
+    else:
+        growth = (1 + monthly_rate) ** months
+        factors = monthly_rate * growth / (growth - 1)
+    return tuple(Decimal(repr(factor)) for factor in factors.tolist())
+
+
+def check_eligible(status, balance):
+    if status == 'paid' or balance <= 0:
+        raise EMIRejected('This due is already paid')
+    if balance < MIN_PRINCIPAL:
+        raise EMIRejected(f'EMI plans are available for balances of {MIN_PRINCIPAL} or more')
+
+
+def plan_options(principal, rate, tenures=TENURES):
+    """The plan for each tenure, as the fintech API returns them; id is the tenure."""
+    plans = []
+    for tenure, factor in zip(tenures, amortization_factors(rate, tenures)):
+        # Rounded up, so the instalments never fall short of the principal
+        monthly = (principal * factor).quantize(PAISA, ROUND_UP)
+        plans.append({
+            'id': str(tenure),
+            'tenure_months': tenure,
+            'monthly_amount': monthly,
+            'interest_rate': rate,
+            'total_amount': monthly * tenure,
+        })
+    return plans
+
+
+def add_months(start, months):
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def schedule(principal, rate, tenure, monthly, start):
+    """Instalments as (number, due_date, amount, principal, interest) tuples, the first a month after start."""
+    monthly_rate = _monthly_rate(rate)
+    paid_months = np.arange(tenure, dtype=np.float64)
+    # Share of the principal still outstanding before each instalment
+    if monthly_rate == 0:
+        outstanding = 1 - paid_months / tenure
+    else:
+        growth = (1 + monthly_rate) ** tenure
+        outstanding = (growth - (1 + monthly_rate) ** paid_months) / (growth - 1)
+    interests = [
+        Decimal(repr(value)).quantize(PAISA, ROUND_HALF_UP)
+        for value in (float(principal) * outstanding * monthly_rate).tolist()
+    ]
+
+    rows = []
+    repaid = Decimal('0')
+    for number, interest in enumerate(interests, start=1):
+        if number == tenure:
+            part = principal - repaid
+            interest = monthly - part
+        else:
+            part = monthly - interest
+            repaid += part
+        rows.append((number, add_months(start, number), monthly, part, interest))
+    return rows
+
+
+def activate(due_id, tenure, credit_score, activated_by=None):
+    """Create the active plan for a due with its instalments; returns the EMIPlan."""
+    if tenure not in TENURES:
+        raise EMIRejected('Unknown EMI plan')
+    rate = interest_rate(credit_score)
+    due = DueEntry.objects.only('amount', 'amount_paid', 'status').get(id=due_id)
+    check_eligible(due.status, due.balance)
+    option = plan_options(due.balance, rate, (tenure,))[0]
+    # A second activation racing this one fails on emi_plan_active_due
+    try:
+        with transaction.atomic():
+            plan = EMIPlan.objects.create(
+                due=due,
+                activated_by=activated_by,
+                tenure_months=tenure,
+                interest_rate=rate,
+                principal=due.balance,
+                monthly_amount=option['monthly_amount'],
+                total_amount=option['total_amount']
+            )
+            EMIInstallment.objects.bulk_create([
+                EMIInstallment(
+                    plan=plan, number=number, due_date=due_date,
+                    amount=amount, principal=part, interest=interest
+                )
+                for number, due_date, amount, part, interest in schedule(
+                    plan.principal, rate, tenure, plan.monthly_amount, timezone.localdate()
+                )
+            ])
+    except IntegrityError:
+        raise EMIRejected('This due already has an active EMI plan')
+    return plan
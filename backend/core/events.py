@@ -0,0 +1,101 @@
+"""
+Server-side publishing of real-time events to UpdatesConsumer.
+
+Each connected socket joins only its own user_<auth user id> group, and the
+views publish to the groups of the users a change affects, once the
+surrounding transaction has committed.
+
+Every message is a delta the client can apply without refetching:
+
+    {
+        "type": "due_created",
+        "seq": 42,            # per-user, strictly increasing; a gap means
+                              # the client missed events and should refetch
+        "data": {...},        # the changed object, serialized as the REST API does
+        "stats": {...}        # the recipient's dashboard/stats payload, or null
+    }
+
+payment_made messages also carry the updated due under "due". Batch jobs
+send dues_updated, whose "data" is a list of the recipient's changed dues.
+credit_limit_updated carries the rescored retailer profile and the id of
+its completed CreditAssessment under "assessment".
+"""
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import ledger
+from .models import UserEventSequence
+
+
+def user_group(user_id):
+    return f'user_{user_id}'
+
+
+def next_sequence(user_id):
+    with transaction.atomic():
+        updated = UserEventSequence.objects.filter(user_id=user_id).update(value=F('value') + 1)
+        if not updated:
+            UserEventSequence.objects.get_or_create(user_id=user_id)
+            UserEventSequence.objects.filter(user_id=user_id).update(value=F('value') + 1)
+        return UserEventSequence.objects.filter(user_id=user_id).values_list('value', flat=True).get()
+
+
+def recipient_stats(profile):
+    if profile.user_type == 'supplier':
+        return ledger.dashboard_stats(profile)
+    return None
+
+
+def as_json(payload):
+    # Channel layers only carry plain JSON-able values; encode the way the
+    # REST API does (Decimal -> number, datetime -> ISO string).
+    return json.loads(json.dumps(payload, cls=JSONEncoder))
+
+
+def _send(event_type, payloads):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    # Number the whole batch in one transaction rather than committing
+    # once per message
+    with transaction.atomic():
+        messages = []
+        for profile, payload in payloads:
+            message = as_json({
+                **payload,
+                'seq': next_sequence(profile.user_id),
+                'stats': recipient_stats(profile),
+            })
+            message['type'] = event_type
+            messages.append((user_group(profile.user_id), message))
+    for group, message in messages:
+        async_to_sync(channel_layer.group_send)(group, message)
+
+
+def publish(event_type, payload, recipients):
+    """
+    Send event_type with payload (a dict with at least "data") to each
+    recipient UserProfile after the current transaction commits.
+    """
+    recipients = {profile.user_id: profile for profile in recipients}.values()
+    payloads = [(profile, payload) for profile in recipients]
+    transaction.on_commit(lambda: _send(event_type, payloads))
+
+
+def publish_each(event_type, payloads):
+    """
+    Like publish(), but with a separate payload per recipient; payloads is an
+    iterable of (UserProfile, payload) pairs.
+    """
+    payloads = list(payloads)
+    transaction.on_commit(lambda: _send(event_type, payloads))
+
+
+def due_participants(due):
+    """The supplier and retailer profiles on a due."""
+    return [due.supplier, due.retailer]
@@ -0,0 +1,95 @@
+"""
+Read-only fast path for list endpoints.
+
+ValuesSerializer compiles a DRF ModelSerializer class into a flat
+values_list() query plus a per-field conversion plan. Rows come back as
+tuples instead of model instances, and each value goes through the same
+field.to_representation() the serializer would call, so the output matches
+serializer.data exactly without building instances or walking the
+serializer field machinery per row.
+"""
+from functools import lru_cache
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject, RelatedField
+
+UNSUPPORTED_FIELDS = (
+    serializers.SerializerMethodField,
+    serializers.ListSerializer,
+    serializers.ManyRelatedField,
+)
+
+
+class ValuesSerializer:
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.lookups = []
+        self.plan = self._compile(serializer_class(), prefix='')
+
+    def _lookup(self, path):
+        if path not in self.lookups:
+            self.lookups.append(path)
+        return self.lookups.index(path)
+
+    def _compile(self, serializer, prefix):
+        plan = []
+        for field in serializer._readable_fields:
+            if field.source == '*' or isinstance(field, UNSUPPORTED_FIELDS):
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{field.field_name} is not supported by ValuesSerializer'
+                )
+            path = prefix + '__'.join(field.source_attrs)
+            if isinstance(field, serializers.Serializer):
+                plan.append((field.field_name, 'nested', self._lookup(path + '__pk'),
+                             self._compile(field, path + '__')))
+            elif isinstance(field, RelatedField):
+                if not field.use_pk_only_optimization():
+                    raise ImproperlyConfigured(
+                        f'{type(serializer).__name__}.{field.field_name} is not supported by ValuesSerializer'
+                    )
+                plan.append((field.field_name, 'related', self._lookup(path), field))
+            else:
+                plan.append((field.field_name, 'value', self._lookup(path), field))
+        return plan
+
+    def _represent(self, plan, row):
+        ret = {}
+        for name, kind, index, field in plan:
+            value = row[index]
+            if value is None:
+                ret[name] = None
+            elif kind == 'nested':
+                ret[name] = self._represent(field, row)
+            elif kind == 'related':
+                ret[name] = field.to_representation(PKOnlyObject(pk=value))
+            else:
+                ret[name] = field.to_representation(value)
+        return ret
+
+    def field_names(self):
+        return [name for name, *_ in self.plan]
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def index_by_pk(self, rows):
+        """Map pk to row, for re-ordering rows fetched with an id__in filter."""
+        pk = self.row_getter('id')
+        return {pk(row): row for row in rows}
+
+    def row_getter(self, *lookups):
+        """Return a callable pulling the given lookups out of a row, like itemgetter."""
+        return itemgetter(*(self.lookups.index(lookup) for lookup in lookups))
+
+    def to_representation(self, row):
+        return self._represent(self.plan, row)
+
+    def serialize(self, rows):
+        return [self._represent(self.plan, row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
@@ -0,0 +1,225 @@
+"""
+Bulk import of a supplier's dues from CSV or NDJSON.
+
+Input is read line by line from any binary stream (an uploaded file, the
+request body, an open file), so the whole upload is never held in memory.
+Rows are validated with DueImportRowSerializer in batches. Retailers are
+resolved for a whole batch at once, by phone through the search index and
+by GST number, and valid rows are written with bulk_create.
+
+Parsing, validation and retailer lookups run outside any transaction.
+Each batch's inserts are committed in a transaction of their own, which
+holds the write lock only for that batch. Under that lock, rows that
+would take a retailer past its available credit are turned away, as
+create_due does, and listed in the report. bulk_create bypasses
+core.signals, so the same transaction applies the batch's deltas to the
+supplier's ledger summary and rollups and reduces the retailers'
+available credit. A failure part way through leaves the batches before it
+imported. Invalid rows are skipped and listed in the report.
+
+Columns / keys: retailer_phone, retailer_gst, amount, description,
+purchase_date, due_date (YYYY-MM-DD).
+"""
+import codecs
+import csv
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from rest_framework import serializers
+
+from . import credit, ledger, rollups, scorecards, search
+from .models import DueEntry, UserProfile
+from .serializers import DueImportRowSerializer
+
+ZERO = Decimal('0')
+BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = {
+    'csv': 'csv',
+    'text/csv': 'csv',
+    'ndjson': 'ndjson',
+    'jsonl': 'ndjson',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(name='', content_type=''):
+    """Pick 'csv' or 'ndjson' from a file name or content type."""
+    extension = name.rsplit('.', 1)[-1].lower() if '.' in (name or '') else ''
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    for key in (extension, content_type):
+        if key in FORMATS:
+            return FORMATS[key]
+    raise ImportFormatError('Upload a .csv or .ndjson file (text/csv or application/x-ndjson)')
+
+
+def _decoded_lines(stream):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    for line in stream:
+        yield decoder.decode(line)
+
+
+def read_rows(stream, fmt):
+    """Yield (row number, dict or parse error) pairs from a binary stream."""
+    lines = _decoded_lines(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for number, row in enumerate(reader, start=1):
+            if None in row:
+                yield number, 'Row has more columns than the header'
+            else:
+                yield number, row
+        return
+
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, row if isinstance(row, dict) else 'Each line must be a JSON object'
+
+
+def _resolve_retailers(batch):
+    phones = {row['retailer_phone'] for _, row in batch if row['retailer_phone']}
+    gsts = {row['retailer_gst'].strip().upper() for _, row in batch if row['retailer_gst']}
+    by_phone = search.retailers_by_phone(phones) if phones else {}
+    by_gst = {}
+    if gsts:
+        for retailer_id, gst_number in UserProfile.objects.filter(
+            user_type='retailer', gst_number__in=gsts
+        ).values_list('id', 'gst_number'):
+            by_gst.setdefault(gst_number, []).append(retailer_id)
+    return by_phone, by_gst
+
+
+class DueImport:
+    def __init__(self, supplier, batch_size=BATCH_SIZE):
+        self.supplier = supplier
+        self.batch_size = batch_size
+        self.validator = DueImportRowSerializer()
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, number, detail):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'errors': detail})
+
+    def validate(self, number, row):
+        if isinstance(row, str):
+            self.error(number, {'non_field_errors': [row]})
+            return None
+        try:
+            return self.validator.run_validation(row)
+        except serializers.ValidationError as exc:
+            self.error(number, exc.detail)
+            return None
+
+    def flush(self, batch):
+        by_phone, by_gst = _resolve_retailers(batch)
+        dues = []
+        for number, row in batch:
+            if row['retailer_phone']:
+                matches = by_phone.get(search.normalize_phone(row['retailer_phone']), [])
+            else:
+                matches = by_gst.get(row['retailer_gst'].strip().upper(), [])
+            if len(matches) != 1:
+                self.error(number, {'retailer': [
+                    'No retailer with this phone or GST number' if not matches
+                    else 'More than one retailer has this phone or GST number'
+                ]})
+                continue
+            dues.append((number, DueEntry(
+                supplier=self.supplier,
+                retailer_id=matches[0],
+                amount=row['amount'],
+                description=row['description'],
+                purchase_date=row['purchase_date'],
+                due_date=row['due_date']
+            )))
+        if not dues:
+            return
+        with transaction.atomic():
+            dues = self.within_limits(dues)
+            if dues:
+                DueEntry.objects.bulk_create(dues, batch_size=self.batch_size)
+                self.apply_deltas(dues)
+        self.created += len(dues)
+
+    def within_limits(self, dues):
+        """The dues that fit their retailers' available credit, taken in row order."""
+        available = credit.limited_available_credit({due.retailer_id for _, due in dues})
+        accepted = []
+        for number, due in dues:
+            if due.retailer_id in available:
+                balance = credit.open_balance(due.status, due.amount, due.amount_paid)
+                if balance > available[due.retailer_id]:
+                    self.error(number, {'amount': [
+                        f'Amount exceeds the retailer\'s available credit of {available[due.retailer_id]:.2f}'
+                    ]})
+                    continue
+                available[due.retailer_id] -= balance
+            accepted.append(due)
+        return accepted
+
+    def apply_deltas(self, dues):
+        """What core.signals does for each new due, once for the batch."""
+        supplier_id = self.supplier.id
+        retailer_ids = {due.retailer_id for due in dues}
+        earlier = set(DueEntry.objects.filter(
+            supplier_id=supplier_id, retailer_id__in=retailer_ids
+        ).exclude(pk__in=[due.pk for due in dues]).values_list('retailer_id', flat=True).distinct())
+        outstanding, overdue = ZERO, ZERO
+        open_balances = defaultdict(Decimal)
+        for due in dues:
+            due_outstanding, due_overdue = ledger.due_contribution(due.status, due.amount, due.amount_paid)
+            outstanding += due_outstanding
+            overdue += due_overdue
+            open_balances[due.retailer_id] += credit.open_balance(due.status, due.amount, due.amount_paid)
+
+        ledger.apply_due_delta(supplier_id, outstanding, overdue, len(retailer_ids - earlier))
+        rollups.add_dues(supplier_id, dues)
+        credit.apply_credit_deltas(open_balances)
+        for retailer_id in retailer_ids:
+            scorecards.invalidate_scorecard(supplier_id, retailer_id)
+
+    def run(self, rows):
+        batch = []
+        for number, row in rows:
+            validated = self.validate(number, row)
+            if validated is None:
+                continue
+            batch.append((number, validated))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_dues(supplier, stream, fmt, batch_size=BATCH_SIZE):
+    """Import dues for supplier from a binary stream in fmt ('csv' or 'ndjson'); returns the report."""
+    return DueImport(supplier, batch_size=batch_size).run(read_rows(stream, fmt))
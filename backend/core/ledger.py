@@ -0,0 +1,189 @@
+"""
+Incremental maintenance of the per-supplier ledger summary.
+
+The dashboard reads SupplierLedgerSummary instead of aggregating DueEntry
+and Transaction rows on every request. Writes go through the signal
+handlers in core.signals, which call into the helpers below; anything that
+bypasses model signals (queryset.update, bulk_create) must call
+rebuild_summaries() for the affected suppliers afterwards.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import DueEntry, SupplierLedgerSummary, Transaction
+
+SALES_WINDOW_DAYS = 30
+
+ZERO = Decimal('0')
+
+
+def due_contribution(status, amount, amount_paid=0):
+    """Return the (outstanding, overdue) amounts a due adds to its supplier."""
+    balance = Decimal(amount or 0) - Decimal(amount_paid or 0)
+    if status == 'pending':
+        return balance, ZERO
+    if status == 'overdue':
+        return ZERO, balance
+    return ZERO, ZERO
+
+
+def sales_window_start(now=None):
+    now = now or timezone.now()
+    return (now - timedelta(days=SALES_WINDOW_DAYS)).date()
+
+
+def _prune_sales(buckets, now=None):
+    start = sales_window_start(now).isoformat()
+    return {day: value for day, value in buckets.items() if day >= start}
+
+
+def monthly_sales(summary, now=None):
+    start = sales_window_start(now).isoformat()
+    return sum(
+        (Decimal(value) for day, value in summary.daily_sales.items() if day >= start),
+        ZERO
+    )
+
+
+def apply_due_delta(supplier_id, outstanding=ZERO, overdue=ZERO, retailers=0, create=True):
+    if not (outstanding or overdue or retailers):
+        return
+    with transaction.atomic():
+        updated = SupplierLedgerSummary.objects.filter(supplier_id=supplier_id).update(
+            total_outstanding=F('total_outstanding') + outstanding,
+            overdue_amount=F('overdue_amount') + overdue,
+            active_retailers=F('active_retailers') + retailers,
+            updated_at=timezone.now()
+        )
+        if not updated and create:
+            # First write for this supplier: build from the committed rows,
+            # which already include the change being applied.
+            rebuild_summaries([supplier_id])
+
+
+def apply_due_deltas(deltas):
+    """
+    apply_due_delta() for many suppliers in one UPDATE; deltas maps
+    supplier_id to an (outstanding, overdue) pair.
+    """
+    deltas = {supplier_id: delta for supplier_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    with transaction.atomic():
+        existing = set(SupplierLedgerSummary.objects.filter(
+            supplier_id__in=deltas
+        ).values_list('supplier_id', flat=True))
+
+        def per_supplier(index):
+            return Case(
+                *(When(supplier_id=supplier_id, then=Value(deltas[supplier_id][index]))
+                  for supplier_id in existing),
+                default=Value(ZERO)
+            )
+
+        SupplierLedgerSummary.objects.filter(supplier_id__in=existing).update(
+            total_outstanding=F('total_outstanding') + per_supplier(0),
+            overdue_amount=F('overdue_amount') + per_supplier(1),
+            updated_at=timezone.now()
+        )
+        missing = set(deltas) - existing
+        if missing:
+            rebuild_summaries(list(missing))
+
+
+def apply_sales_delta(supplier_id, created_at, amount, create=True):
+    amount = Decimal(amount or 0)
+    if not amount:
+        return
+    with transaction.atomic():
+        summary = SupplierLedgerSummary.objects.select_for_update().filter(
+            supplier_id=supplier_id
+        ).first()
+        if summary is None:
+            if create:
+                rebuild_summaries([supplier_id])
+            return
+        buckets = _prune_sales(summary.daily_sales)
+        day = timezone.localdate(created_at).isoformat()
+        if day >= sales_window_start().isoformat():
+            buckets[day] = str(Decimal(buckets.get(day, '0')) + amount)
+        summary.daily_sales = buckets
+        summary.save(update_fields=['daily_sales', 'updated_at'])
+
+
+def compute_summaries(supplier_ids=None, now=None, using=None):
+    """Aggregate summary values from raw rows, keyed by supplier id."""
+    dues = DueEntry.objects.using(using)
+    transactions = Transaction.objects.using(using).filter(
+        created_at__gte=timezone.now() - timedelta(days=SALES_WINDOW_DAYS + 1)
+    )
+    if supplier_ids is not None:
+        dues = dues.filter(supplier_id__in=supplier_ids)
+        transactions = transactions.filter(supplier_id__in=supplier_ids)
+
+    results = defaultdict(lambda: {
+        'total_outstanding': ZERO,
+        'overdue_amount': ZERO,
+        'active_retailers': 0,
+        'daily_sales': {},
+    })
+    for supplier_id in supplier_ids or ():
+        results[supplier_id]
+
+    due_rows = dues.order_by().values('supplier_id').annotate(
+        outstanding=Sum(F('amount') - F('amount_paid'), filter=Q(status='pending')),
+        overdue=Sum(F('amount') - F('amount_paid'), filter=Q(status='overdue')),
+        retailers=Count('retailer', distinct=True)
+    )
+    for row in due_rows:
+        summary = results[row['supplier_id']]
+        summary['total_outstanding'] = row['outstanding'] or ZERO
+        summary['overdue_amount'] = row['overdue'] or ZERO
+        summary['active_retailers'] = row['retailers']
+
+    start = sales_window_start(now).isoformat()
+    for supplier_id, created_at, amount in transactions.order_by().values_list(
+        'supplier_id', 'created_at', 'amount'
+    ).iterator():
+        day = timezone.localdate(created_at).isoformat()
+        if day < start:
+            continue
+        buckets = results[supplier_id]['daily_sales']
+        buckets[day] = str(Decimal(buckets.get(day, '0')) + amount)
+
+    return dict(results)
+
+
+def rebuild_summaries(supplier_ids=None):
+    # Read from the database being written, never from a lagging replica
+    computed = compute_summaries(supplier_ids, using=router.db_for_write(SupplierLedgerSummary))
+    with transaction.atomic():
+        for supplier_id, values in computed.items():
+            SupplierLedgerSummary.objects.update_or_create(
+                supplier_id=supplier_id, defaults=values
+            )
+    return computed
+
+
+def get_summary(supplier):
+    summary = SupplierLedgerSummary.objects.filter(supplier=supplier).first()
+    if summary is None:
+        rebuild_summaries([supplier.id])
+        summary = SupplierLedgerSummary.objects.get(supplier=supplier)
+    return summary
+
+
+def dashboard_stats(supplier):
+    """The supplier dashboard stats payload, as served by dashboard/stats/."""
+    summary = get_summary(supplier)
+    return {
+        'totalOutstanding': summary.total_outstanding or 0,
+        'activeRetailers': summary.active_retailers,
+        'monthlySales': monthly_sales(summary) or 0,
+        'overdueAmount': summary.overdue_amount or 0
+    }
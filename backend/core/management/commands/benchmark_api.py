@@ -0,0 +1,323 @@
+import json
+import math
+import platform
+import statistics
+import time
+
+import django
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from core import emi
+from core.models import DueEntry, RetailerProfile, SupplierLedgerSummary, UserProfile
+from creditguard.instrumentation import QueryTimer
+
+TRANSPORTS = ('client', 'asgi')
+PASSWORD = 'benchmark-password'
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list."""
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+class Endpoint:
+    """
+    One benchmarked request. request(key) returns the client keyword
+    arguments for a request, given a key unique to it; path may be a
+    callable returning a fresh path per request. setup(client, fetch), when
+    given, runs untimed before each request; fetch(method, path) makes a
+    request over the transport being measured.
+    """
+
+    def __init__(self, name, user, method, path, request=None, setup=None, samples=None):
+        self.name = name
+        self.user = user
+        self.method = method
+        self.path = path
+        self.request = request or (lambda key: {})
+        self.setup = setup
+        self.samples = samples
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every core API endpoint through the Django test client and through the ASGI '
+        'handler, against the data in the database (see generate_data). Records p50/p95/p99 '
+        'latency and query counts, optionally saves them as a JSON baseline, and with --baseline '
+        'exits non-zero when an endpoint is slower or issues more queries than the baseline '
+        'allows. Writes made by the benchmark are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per endpoint and transport.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests first.')
+        parser.add_argument('--transport', choices=TRANSPORTS + ('both',), default='both')
+        parser.add_argument('--supplier', type=int, help='Supplier profile id (default: the one with most retailers).')
+        parser.add_argument('--only', help='Run only endpoints whose name contains this text.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare with this JSON file written by --output.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p50/p95 slowdown against the baseline.')
+        parser.add_argument('--min-regression-ms', type=float, default=2.0,
+                            help='Ignore slowdowns smaller than this, which are noise.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        transports = TRANSPORTS if options['transport'] == 'both' else (options['transport'],)
+        # Both test clients send Host: testserver
+        allowed_hosts = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+        try:
+            with allowed_hosts, transaction.atomic():
+                endpoints = self.endpoints(options, transports)
+                if options['only']:
+                    endpoints = [endpoint for endpoint in endpoints if options['only'] in endpoint.name]
+                results = {endpoint.name: {} for endpoint in endpoints}
+                for transport in transports:
+                    for endpoint in endpoints:
+                        result = self.measure(endpoint, transport, options)
+                        results[endpoint.name][transport] = result
+                        self.report(endpoint.name, transport, result)
+                raise Rollback
+        except Rollback:
+            pass
+
+        document = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(document, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = self.compare(baseline, document, options)
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(line))
+                self.stderr.write(self.style.ERROR(f'{len(regressions)} regressions against {options["baseline"]}.'))
+                raise SystemExit(1)
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}.'))
+
+    def meta(self, options):
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'warmup': options['warmup'],
+            'dues': DueEntry.objects.count(),
+            'retailers': UserProfile.objects.filter(user_type='retailer').count(),
+        }
+
+    def profile(self, user_type, name):
+        profile = UserProfile.objects.filter(user_type=user_type).order_by('id').first()
+        if profile is None:
+            user = User.objects.create_user(username=f'benchmark-{name}', password=PASSWORD)
+            profile = UserProfile.objects.create(user=user, user_type=user_type, business_name=f'Benchmark {name}')
+        return profile
+
+    def endpoints(self, options, transports):
+        if options['supplier']:
+            supplier = UserProfile.objects.filter(id=options['supplier'], user_type='supplier').first()
+            if supplier is None:
+                raise CommandError(f"No supplier profile with id {options['supplier']}")
+        else:
+            busiest = SupplierLedgerSummary.objects.order_by('-active_retailers').values_list('supplier_id', flat=True).first()
+            supplier = UserProfile.objects.get(id=busiest) if busiest else self.profile('supplier', 'supplier')
+        retailer_id = DueEntry.objects.filter(supplier=supplier).values('retailer_id').annotate(
+            dues=Count('id')
+        ).order_by('-dues').values_list('retailer_id', flat=True).first()
+        if retailer_id is None:
+            raise CommandError('The supplier has no dues; run generate_data first.')
+        retailer = UserProfile.objects.get(id=retailer_id)
+        fintech = self.profile('fintech', 'fintech')
+        # Unassessed, so create due is not refused for want of credit
+        new_retailer = UserProfile.objects.create(
+            user=User.objects.create_user(username='benchmark-retailer', password=PASSWORD),
+            user_type='retailer', business_name='Benchmark Retailer'
+        )
+
+        user = User.objects.create_user(username='benchmark-login', email='benchmark-login@example.com', password=PASSWORD)
+        UserProfile.objects.create(user=user, user_type='supplier', business_name='Benchmark Login')
+
+        runs = options['warmup'] + options['repeat']
+        open_dues = DueEntry.objects.filter(
+            supplier=supplier, retailer=retailer, status__in=['pending', 'overdue']
+        ).annotate(open_balance=F('amount') - F('amount_paid'))
+        payable = open_dues.order_by('-open_balance').first()
+        due = payable or DueEntry.objects.filter(supplier=supplier, retailer=retailer).first()
+        emi_dues = list(open_dues.filter(
+            open_balance__gte=emi.MIN_PRINCIPAL
+        ).exclude(emi_plans__status='active').exclude(id=due.id).order_by('id').values_list(
+            'id', flat=True
+        )[:runs * len(transports) + 1])
+        # Plans are listed for the first; each activation needs another due without a plan
+        emi_due_ids = iter(emi_dues[1:])
+        emi_tenure = str(emi.TENURES[0])
+        import_body = ''.join(
+            ['retailer_phone,retailer_gst,amount,description,purchase_date,due_date\n']
+            + [f'{retailer.phone},,100,Benchmark row {n},2026-01-01,2026-02-01\n' for n in range(50)]
+        )
+        conditional = {}
+
+        def if_none_match(client, fetch):
+            # Fetched untimed each time, so the timed request is a revalidation
+            conditional['etag'] = fetch('get', reverse('dues-list')).headers.get('ETag', '')
+
+        endpoints = [
+            Endpoint('register', None, 'post', reverse('register'), lambda n: {'data': {
+                'user_type': 'retailer', 'businessName': 'Benchmark Register',
+                'user': {'email': f'benchmark-register-{n}@example.com', 'password': PASSWORD}
+            }, 'content_type': 'application/json'}),
+            Endpoint('login', None, 'post', reverse('login'), lambda n: {'data': {
+                'email': user.email, 'password': PASSWORD
+            }, 'content_type': 'application/json'}),
+            Endpoint('logout', None, 'post', reverse('logout'),
+                     setup=lambda client, fetch: client.force_login(user)),
+            Endpoint('dashboard stats', supplier, 'get', reverse('dashboard-stats')),
+            Endpoint('dashboard analytics', supplier, 'get', reverse('dashboard-analytics')),
+            Endpoint('retailers', supplier, 'get', reverse('retailers-list')),
+            Endpoint('retailer search', supplier, 'get', reverse('retailers-search'),
+                     lambda n: {'data': {'q': retailer.business_name[:4]}}),
+            Endpoint('recent retailers', supplier, 'get', reverse('recent-retailers')),
+            Endpoint('retailer details', supplier, 'get', reverse('retailer-details', args=[retailer.id])),
+            Endpoint('supplier dues', supplier, 'get', reverse('dues-list')),
+            Endpoint('supplier dues by status', supplier, 'get', reverse('dues-list'),
+                     lambda n: {'data': {'status': 'pending,overdue'}}),
+            Endpoint('supplier dues not modified', supplier, 'get', reverse('dues-list'),
+                     lambda n: {'headers': {'If-None-Match': conditional['etag']}}, setup=if_none_match),
+            Endpoint('retailer dues', retailer, 'get', reverse('dues-list')),
+            Endpoint('create due', supplier, 'post', reverse('create-due'), lambda n: {'data': {
+                'retailer': new_retailer.id, 'amount': '100.00', 'description': f'Benchmark {n}',
+                'purchase_date': '2026-01-01', 'due_date': '2026-02-01'
+            }, 'content_type': 'application/json'}),
+            Endpoint('bulk import dues', supplier, 'post', reverse('bulk-create-dues'), lambda n: {
+                'data': import_body, 'content_type': 'text/csv'
+            }),
+            Endpoint('export dues', supplier, 'get', reverse('export-dues'), lambda n: {'data': {'format': 'csv'}}),
+            Endpoint('export transactions', supplier, 'get', reverse('export-transactions'),
+                     lambda n: {'data': {'format': 'csv'}}),
+            Endpoint('due details', supplier, 'get', reverse('due-details', args=[due.id])),
+            Endpoint('request assessment', fintech, 'post', reverse('request-assessment', args=[retailer.id])),
+        ]
+        if payable is not None:
+            endpoints.append(Endpoint('make payment', retailer, 'post', reverse('make-payment', args=[due.id]), lambda n: {
+                'data': {'payment_method': 'upi', 'amount': '0.01', 'idempotency_key': f'benchmark-{n}'},
+                'content_type': 'application/json'
+            }))
+        if emi_dues:
+            endpoints.append(Endpoint('emi plans', retailer, 'get', reverse('emi-plans', args=[emi_dues[0]])))
+        if len(emi_dues) > len(transports):
+            endpoints.append(Endpoint(
+                'activate emi plan', fintech, 'post',
+                lambda: reverse('activate-emi-plan', args=[next(emi_due_ids), emi_tenure]),
+                samples=(len(emi_dues) - 1) // len(transports)
+            ))
+        if not RetailerProfile.objects.filter(user_profile=retailer).exists():
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name != 'request assessment']
+        return endpoints
+
+    def client_for(self, transport, user):
+        client = Client() if transport == 'client' else AsyncClient()
+        if user is not None:
+            client.force_login(user.user)
+        return client
+
+    def call(self, transport, client, method, path, kwargs=None):
+        """Make the request and read the whole body, streamed or not; returns the response."""
+        kwargs = kwargs or {}
+        if transport == 'client':
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+
+        async def call_async():
+            response = await getattr(client, method)(path, **kwargs)
+            if response.streaming and response.is_async:
+                async for _ in response.streaming_content:
+                    pass
+            return response
+        response = async_to_sync(call_async)()
+        # A synchronous iterator queries the database, so it is read here
+        # rather than on the event loop, as the ASGI handler does in a thread
+        if response.streaming and not response.is_async:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, endpoint, transport, options):
+        client = self.client_for(transport, endpoint.user)
+        runs = options['warmup'] + options['repeat']
+        if endpoint.samples is not None:
+            runs = min(runs, endpoint.samples)
+        warmup = min(options['warmup'], runs - 1)
+
+        timings = []
+        queries = []
+        status_codes = set()
+        for iteration in range(runs):
+            if endpoint.setup:
+                endpoint.setup(client, lambda method, path: self.call(transport, client, method, path))
+            path = endpoint.path() if callable(endpoint.path) else endpoint.path
+            kwargs = endpoint.request(f'{transport}-{iteration}')
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                started = time.perf_counter()
+                response = self.call(transport, client, endpoint.method, path, kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+            status_codes.add(response.status_code)
+            if iteration >= warmup:
+                timings.append(elapsed)
+                queries.append(timer.count)
+            if response.status_code >= 400:
+                raise CommandError(f'{endpoint.name} ({transport}) returned {response.status_code}: {response.content[:200]!r}')
+
+        timings.sort()
+        return {
+            'samples': len(timings),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'status': sorted(status_codes),
+        }
+
+    def report(self, name, transport, result):
+        self.stdout.write(
+            f"{name:<30} {transport:<6} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+            f"p99 {result['p99_ms']:9.2f} ms  {result['queries']:4d} queries"
+        )
+
+    def compare(self, baseline, document, options):
+        regressions = []
+        for name, transports in document['results'].items():
+            for transport, result in transports.items():
+                before = baseline.get('results', {}).get(name, {}).get(transport)
+                if before is None:
+                    continue
+                if result['queries'] > before['queries']:
+                    regressions.append(
+                        f"{name} ({transport}): {result['queries']} queries, baseline {before['queries']}"
+                    )
+                for key in ('p50_ms', 'p95_ms'):
+                    allowed = max(before[key] * (1 + options['tolerance']), before[key] + options['min_regression_ms'])
+                    if result[key] > allowed:
+                        regressions.append(
+                            f"{name} ({transport}): {key} {result[key]:.2f}, baseline {before[key]:.2f} (allowed {allowed:.2f})"
+                        )
+        return regressions
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from creditguard.layers import SQLiteChannelLayer
+
+
+def layer_for(path):
+    # High capacity so the benchmark measures throughput, not backpressure
+    return SQLiteChannelLayer(path=path, capacity=100000)
+
+
+def run_consumer(path, group, expected, ready, results):
+    async def consume():
+        layer = layer_for(path)
+        channel = await layer.new_channel()
+        await layer.group_add(group, channel)
+        ready.release()
+        received = 0
+        first = None
+        while received < expected:
+            await layer.receive(channel)
+            first = first or time.perf_counter()
+            received += 1
+        await layer.group_discard(group, channel)
+        await layer.close()
+        results.put((os.getpid(), received, time.perf_counter() - first))
+
+    asyncio.run(consume())
+
+
+def run_producer(path, group, count, start):
+    async def produce():
+        layer = layer_for(path)
+        start.wait()
+        for number in range(count):
+            await layer.group_send(group, {'type': 'due.updated', 'seq': number, 'data': {'id': number}})
+        await layer.close()
+
+    asyncio.run(produce())
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure SQLiteChannelLayer throughput with producer and consumer processes '
+        'sharing one database, as separate ASGI workers would.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--producers', type=int, default=2)
+        parser.add_argument('--consumers', type=int, default=4)
+        parser.add_argument('--messages', type=int, default=2000,
+                            help='Group messages sent by each producer.')
+        parser.add_argument('--path', help='Database file; a temporary file by default.')
+
+    def handle(self, *args, **options):
+        producers = options['producers']
+        consumers = options['consumers']
+        per_producer = options['messages']
+        expected = producers * per_producer
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = options['path'] or os.path.join(directory, 'channels.sqlite3')
+            context = multiprocessing.get_context('spawn')
+            ready = context.Semaphore(0)
+            start = context.Event()
+            results = context.Queue()
+
+            workers = [
+                context.Process(target=run_consumer, args=(path, 'benchmark', expected, ready, results))
+                for _ in range(consumers)
+            ]
+            for worker in workers:
+                worker.start()
+            for _ in workers:
+                ready.acquire()
+
+            senders = [
+                context.Process(target=run_producer, args=(path, 'benchmark', per_producer, start))
+                for _ in range(producers)
+            ]
+            for sender in senders:
+                sender.start()
+            began = time.perf_counter()
+            start.set()
+
+            for sender in senders:
+                sender.join()
+            sent_in = time.perf_counter() - began
+            stats = [results.get() for _ in workers]
+            delivered_in = time.perf_counter() - began
+            for worker in workers:
+                worker.join()
+
+        delivered = sum(received for _, received, _ in stats)
+        self.stdout.write(
+            f'{producers} producers x {per_producer} group sends, {consumers} consumer processes'
+        )
+        self.stdout.write(f'  sent:      {expected} in {sent_in:.2f}s ({expected / sent_in:,.0f} msgs/s)')
+        self.stdout.write(
+            f'  delivered: {delivered} in {delivered_in:.2f}s ({delivered / delivered_in:,.0f} msgs/s)'
+        )
+        for pid, received, elapsed in stats:
+            self.stdout.write(f'  consumer {pid}: {received} messages in {elapsed:.2f}s')
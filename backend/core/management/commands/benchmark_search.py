@@ -0,0 +1,120 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core import search
+from core.models import UserProfile
+
+SUFFIXES = [
+    'traders', 'stores', 'kirana', 'general', 'agencies', 'enterprises', 'medical',
+    'super', 'market', 'mart', 'provisions', 'distributors', 'fancy', 'textiles',
+    'electricals', 'hardware',
+]
+SYLLABLES = [
+    'sri', 'lak', 'shmi', 'ga', 'nesh', 'ba', 'la', 'ji', 'sai', 'kri', 'shna', 'ven',
+    'ka', 'tesh', 'ma', 'hal', 'ra', 'vi', 'pra', 'kash', 'su', 'dha', 'an', 'jan',
+    'ku', 'mar', 'de', 'vi', 'ro', 'hit', 'pa', 'dma', 'go', 'pal', 'na', 'ran',
+]
+
+
+def make_vocabulary(rng, size=5000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure retailer search latency against N synthetic retailers, comparing the '
+        'token index with the previous icontains scan. Data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retailers', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-legacy', action='store_true',
+                            help='Do not time the icontains scan.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.populate(options['retailers'], options['batch_size'])
+                self.measure(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count, batch_size):
+        rng = random.Random(42)
+        vocabulary = make_vocabulary(rng)
+        started = time.perf_counter()
+        first_user = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            users = User.objects.bulk_create([
+                User(username=f'bench-retailer-{first_user + offset + i}', password='!')
+                for i in range(size)
+            ])
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user=user,
+                    user_type='retailer',
+                    business_name=' '.join(
+                        rng.sample(vocabulary, rng.randint(1, 2)) + [rng.choice(SUFFIXES)]
+                    ).title(),
+                    phone=f'9{rng.randrange(10 ** 9):09d}'
+                )
+                for user in users
+            ])
+        created = time.perf_counter() - started
+        indexed = search.reindex_retailers(
+            UserProfile.objects.filter(user__username__startswith='bench-retailer-'),
+            batch_size=batch_size
+        )
+        self.stdout.write(
+            f'Created {count} retailers in {created:.1f}s, '
+            f'indexed {indexed} in {time.perf_counter() - started - created:.1f}s'
+        )
+
+    def time_queries(self, label, queries, repeat, run):
+        samples = []
+        for _ in range(repeat):
+            for query in queries:
+                started = time.perf_counter()
+                run(query)
+                samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:<28} p50 {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms'
+        )
+
+    def measure(self, options):
+        queries = {
+            'short prefix': ['sr', 'ka', 'ba'],
+            'word': ['srilak', 'traders', 'ganesh kirana'],
+            'substring': ['aders', 'akshm', 'ectric'],
+            'phone': ['98765', '9123456789', '+91 90000'],
+            'no match': ['zzyzx', 'qwerty stores', '5550001'],
+        }
+
+        def legacy(query):
+            list(UserProfile.objects.filter(user_type='retailer').filter(
+                Q(business_name__icontains=query) | Q(phone__icontains=query)
+            ).values_list('id', flat=True)[:10])
+
+        for label, batch in queries.items():
+            self.time_queries(f'index / {label}', batch, options['repeat'], search.search_retailer_ids)
+            if not options['skip_legacy']:
+                self.time_queries(f'icontains / {label}', batch, options['repeat'], legacy)
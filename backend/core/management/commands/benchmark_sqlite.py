@@ -0,0 +1,198 @@
+import math
+import multiprocessing
+import os
+import queue
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+# Stock Django settings: rollback journal, a connection per request
+BASELINE = {'ENGINE': 'django.db.backends.sqlite3'}
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return 0.0
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def copy_database(source, target, journal_mode):
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+        dst.execute(f'PRAGMA journal_mode = {journal_mode}')
+    src.close()
+    dst.close()
+
+
+def setup(database):
+    # Before django.setup(), so no connection is made with the real settings;
+    # events go to an in-memory layer instead of the shared channels database
+    settings.DATABASES['default'] = database
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    django.setup()
+
+
+def run_reader(database, supplier_id, start, stop, results):
+    setup(database)
+    from django.db import close_old_connections
+
+    from core import ledger
+    from core.models import DueEntry, UserProfile
+
+    supplier = UserProfile.objects.get(id=supplier_id)
+    close_old_connections()
+    latencies, errors = [], 0
+    start.wait()
+    while not stop.is_set():
+        began = time.perf_counter()
+        try:
+            # What a supplier's dashboard loads: the stats and the first page of dues
+            ledger.dashboard_stats(supplier)
+            list(DueEntry.objects.filter(supplier_id=supplier_id).order_by('-created_at', '-id').values()[:50])
+        except django.db.OperationalError:
+            errors += 1
+        else:
+            latencies.append((time.perf_counter() - began) * 1000)
+        # A request boundary: closes the connection unless CONN_MAX_AGE keeps it
+        close_old_connections()
+    results.put(('read', latencies, errors, 0))
+
+
+def run_writer(database, supplier_id, interval, start, stop, results):
+    setup(database)
+    from django.contrib.auth.models import User
+    from django.db import close_old_connections, transaction
+
+    from core import credit
+    from core.models import UserProfile
+    from core.serializers import DueEntrySerializer
+
+    # A retailer of its own with no RetailerProfile, so no credit limit turns
+    # the writes away; the copy is discarded after the run
+    user = User.objects.create_user(username=f'benchmark-sqlite-{os.getpid()}')
+    retailer = UserProfile.objects.create(user=user, user_type='retailer', business_name='Benchmark retailer')
+    close_old_connections()
+    today = timezone.localdate()
+    latencies, errors, rejected = [], 0, 0
+    start.wait()
+    while not stop.is_set():
+        began = time.perf_counter()
+        # As create_due does, so the signal handlers write their derived rows too
+        serializer = DueEntrySerializer(data={
+            'supplier': supplier_id,
+            'retailer': retailer.id,
+            'amount': Decimal('1.00'),
+            'description': 'benchmark_sqlite',
+            'purchase_date': today,
+            'due_date': today,
+        })
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                due = serializer.save()
+                credit.check_limit(due.retailer_id, due.amount)
+        except django.db.OperationalError:
+            errors += 1
+        except credit.CreditLimitExceeded:
+            rejected += 1
+        else:
+            latencies.append((time.perf_counter() - began) * 1000)
+        close_old_connections()
+        if interval:
+            time.sleep(interval)
+    results.put(('write', latencies, errors, rejected))
+
+
+class Command(BaseCommand):
+    help = (
+        'Run reader and writer processes against copies of the database, once with stock '
+        'SQLite settings (rollback journal, connection per request) and once with the '
+        'configured DATABASES, and compare read latency while dues are being created.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per configuration.')
+        parser.add_argument('--write-interval', type=float, default=0.01,
+                            help='Seconds each writer sleeps between dues.')
+        parser.add_argument('--conn-max-age', type=int, default=600,
+                            help='CONN_MAX_AGE for the configured run, as creditguard.wsgi sets it.')
+
+    def handle(self, *args, **options):
+        from core.models import DueEntry
+
+        configured = settings.DATABASES['default']
+        if configured['ENGINE'] not in ('django.db.backends.sqlite3', 'creditguard.sqlite'):
+            raise CommandError('benchmark_sqlite needs an SQLite default database')
+        supplier_id = DueEntry.objects.values_list('supplier_id', flat=True).order_by('id').first()
+        if supplier_id is None:
+            raise CommandError('No dues to read; run generate_data first')
+
+        configurations = (
+            ('stock', {**BASELINE, 'NAME': None}, 'DELETE'),
+            ('configured', {**configured, 'NAME': None, 'CONN_MAX_AGE': options['conn_max_age']}, 'WAL'),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, database, journal_mode in configurations:
+                path = os.path.join(directory, f'{name}.sqlite3')
+                copy_database(str(configured['NAME']), path, journal_mode)
+                database = {**database, 'NAME': path}
+                reads, writes = self.run(database, supplier_id, options)
+                self.report(name, database, options['duration'], reads, writes)
+
+    def run(self, database, supplier_id, options):
+        context = multiprocessing.get_context('spawn')
+        start, stop = context.Event(), context.Event()
+        results = context.Queue()
+        workers = [
+            context.Process(target=run_reader, args=(database, supplier_id, start, stop, results))
+            for _ in range(options['readers'])
+        ] + [
+            context.Process(target=run_writer, args=(
+                database, supplier_id, options['write_interval'], start, stop, results
+            ))
+            for _ in range(options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        # Let every process finish setting Django up before the clock starts
+        time.sleep(2)
+        start.set()
+        time.sleep(options['duration'])
+        stop.set()
+
+        collected = {'read': ([], 0, 0), 'write': ([], 0, 0)}
+        for _ in workers:
+            while True:
+                try:
+                    kind, latencies, errors, rejected = results.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise CommandError('A benchmark process exited without reporting')
+            samples, failed, turned_away = collected[kind]
+            collected[kind] = (samples + latencies, failed + errors, turned_away + rejected)
+        for worker in workers:
+            worker.join()
+        return collected['read'], collected['write']
+
+    def report(self, name, database, duration, reads, writes):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{name}: {database['ENGINE']}, CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}"
+        ))
+        for label, (samples, errors, rejected) in (('reads', reads), ('writes', writes)):
+            samples = sorted(samples)
+            self.stdout.write(
+                f'  {label:<7}{len(samples):>7} ({len(samples) / duration:,.0f}/s), {errors} failed, '
+                f'{rejected} over credit limit; '
+                f'p50 {percentile(samples, 0.5):.1f} ms, p95 {percentile(samples, 0.95):.1f} ms, '
+                f'p99 {percentile(samples, 0.99):.1f} ms, max {samples[-1] if samples else 0:.1f} ms'
+            )
@@ -0,0 +1,235 @@
+import asyncio
+import gc
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import tempfile
+import time
+
+import django
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+LAYERS = ('inmemory', 'sqlite', 'redis')
+RUN_OPTIONS = ('connections', 'rate', 'duration', 'fanout', 'connect_concurrency', 'drain_timeout', 'seed')
+
+# Shaped like a due_created event from core.events
+SAMPLE_DUE = {
+    'id': 0, 'supplier': 1, 'retailer': 2, 'supplier_name': 'Sri Lakshmi Traders',
+    'retailer_name': 'Ganesh Kirana', 'amount': 12500.0, 'amount_paid': 0.0,
+    'description': 'Invoice 1024', 'purchase_date': '2026-01-01', 'due_date': '2026-01-31',
+    'status': 'pending', 'created_at': '2026-01-01T10:00:00Z', 'updated_at': '2026-01-01T10:00:00Z',
+}
+SAMPLE_STATS = {'totalOutstanding': 125000.0, 'activeRetailers': 42, 'monthlySales': 98000.0, 'overdueAmount': 0}
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return 0.0
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Peak rather than current size, in kilobytes, where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def layer_config(name, directory, options):
+    if name == 'inmemory':
+        return {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': options['capacity']}}
+    if name == 'sqlite':
+        return {'BACKEND': 'creditguard.layers.SQLiteChannelLayer', 'CONFIG': {
+            'path': os.path.join(directory, 'channels.sqlite3'), 'capacity': options['capacity'],
+        }}
+    return {'BACKEND': 'channels_redis.core.RedisChannelLayer', 'CONFIG': {
+        'hosts': [options['redis_url']], 'capacity': options['capacity'],
+    }}
+
+
+async def load_test(options):
+    from django.contrib.auth.models import User
+
+    from core.consumers import UpdatesConsumer
+    from core.events import user_group
+
+    rng = random.Random(options['seed'])
+    count = options['connections']
+    application = UpdatesConsumer.as_asgi()
+    latencies = []
+    received = [0]
+
+    gc.collect()
+    memory_before = rss_bytes()
+    connect_times = []
+    failed = [0]
+    limit = asyncio.Semaphore(options['connect_concurrency'])
+
+    async def open_connection(user_id):
+        communicator = WebsocketCommunicator(application, '/ws/updates/')
+        # Only the id and is_authenticated are used, so an unsaved User will do
+        communicator.scope['user'] = User(id=user_id)
+        async with limit:
+            started = time.perf_counter()
+            connected, _ = await communicator.connect(timeout=30)
+            connect_times.append((time.perf_counter() - started) * 1000)
+        if not connected:
+            failed[0] += 1
+            return None
+        return communicator
+
+    started = time.perf_counter()
+    communicators = await asyncio.gather(*(open_connection(user_id) for user_id in range(1, count + 1)))
+    connected_in = time.perf_counter() - started
+    gc.collect()
+    memory_per_connection = (rss_bytes() - memory_before) / count
+    open_users = [user_id for user_id, communicator in enumerate(communicators, start=1) if communicator]
+
+    async def receive(communicator):
+        while True:
+            # Large timeout: on expiry the communicator cancels the consumer
+            message = json.loads(await communicator.receive_from(timeout=3600))
+            latencies.append((time.perf_counter() - message['sent_at']) * 1000)
+            received[0] += 1
+
+    receivers = [asyncio.create_task(receive(communicator)) for communicator in communicators if communicator]
+
+    layer = get_channel_layer()
+    total = int(options['rate'] * options['duration'])
+    expected = 0
+    send_started = time.perf_counter()
+    for number in range(total):
+        # Paced against the schedule, so a slow send does not lower the rate for the rest
+        delay = send_started + number / options['rate'] - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = {
+            'type': 'due_created',
+            'seq': number,
+            'data': {**SAMPLE_DUE, 'id': number},
+            'stats': SAMPLE_STATS,
+            'sent_at': time.perf_counter(),
+        }
+        for user_id in rng.sample(open_users, min(options['fanout'], len(open_users))):
+            await layer.group_send(user_group(user_id), message)
+            expected += 1
+    sent_in = time.perf_counter() - send_started
+
+    deadline = time.perf_counter() + options['drain_timeout']
+    while received[0] < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+    for task in receivers:
+        task.cancel()
+    await asyncio.gather(*receivers, return_exceptions=True)
+    await asyncio.gather(*(communicator.disconnect() for communicator in communicators if communicator))
+    if hasattr(layer, 'close'):
+        await layer.close()
+
+    connect_times.sort()
+    latencies.sort()
+    return {
+        'connected': len(open_users),
+        'failed': failed[0],
+        'connected_in': connected_in,
+        'connect_ms': connect_times,
+        'memory_per_connection': memory_per_connection,
+        'events': total,
+        'sent_in': sent_in,
+        'expected': expected,
+        'received': received[0],
+        'latency_ms': latencies,
+    }
+
+
+def run_layer(config, options, results):
+    # Runs in a fresh process per layer, so memory freed by one run is not
+    # reused by the next; app models are imported once Django is set up
+    django.setup()
+    with override_settings(CHANNEL_LAYERS={'default': config}):
+        results.put(asyncio.run(load_test(options)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Open thousands of UpdatesConsumer connections in process with WebsocketCommunicator, '
+        'publish events to their user groups at a fixed rate, and report connect time, delivery '
+        'latency percentiles, memory per connection and dropped messages for each channel layer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--rate', type=float, default=200, help='Events published per second.')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to publish for.')
+        parser.add_argument('--fanout', type=int, default=2,
+                            help='User groups each event is sent to, as a due goes to its supplier and retailer.')
+        parser.add_argument('--layers', default='inmemory,sqlite',
+                            help=f"Comma-separated channel layers: {', '.join(LAYERS)}.")
+        parser.add_argument('--capacity', type=int, default=100, help='Channel capacity for every layer.')
+        parser.add_argument('--redis-url', default='redis://localhost:6379',
+                            help='For the redis layer, which needs channels_redis.')
+        parser.add_argument('--connect-concurrency', type=int, default=100,
+                            help='Handshakes in flight at once.')
+        parser.add_argument('--drain-timeout', type=float, default=5,
+                            help='Seconds to wait for deliveries after the last event.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        layers = [name.strip() for name in options['layers'].split(',') if name.strip()]
+        unknown = set(layers) - set(LAYERS)
+        if unknown:
+            raise CommandError(f"Unknown layers: {', '.join(sorted(unknown))}")
+        if options['fanout'] > options['connections']:
+            raise CommandError('--fanout cannot exceed --connections')
+        if 'redis' in layers and importlib.util.find_spec('channels_redis') is None:
+            raise CommandError('The redis layer needs channels_redis installed')
+
+        run_options = {key: options[key] for key in RUN_OPTIONS}
+        context = multiprocessing.get_context('spawn')
+        for name in layers:
+            with tempfile.TemporaryDirectory() as directory:
+                config = layer_config(name, directory, options)
+                results = context.Queue()
+                process = context.Process(target=run_layer, args=(config, run_options, results))
+                process.start()
+                while True:
+                    try:
+                        result = results.get(timeout=1)
+                        break
+                    except queue.Empty:
+                        if not process.is_alive():
+                            raise CommandError(f'The {name} run exited with code {process.exitcode}')
+                process.join()
+            self.report(name, options, result)
+
+    def report(self, name, options, result):
+        connect = result['connect_ms']
+        latency = result['latency_ms']
+        dropped = result['expected'] - result['received']
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{name} layer'))
+        self.stdout.write(
+            f"  connections: {result['connected']} open, {result['failed']} refused, "
+            f"in {result['connected_in']:.2f}s; connect p50 {percentile(connect, 0.5):.1f} ms, "
+            f"p95 {percentile(connect, 0.95):.1f} ms, p99 {percentile(connect, 0.99):.1f} ms"
+        )
+        self.stdout.write(f"  memory:      {result['memory_per_connection'] / 1024:.1f} KiB per connection")
+        self.stdout.write(
+            f"  events:      {result['events']} x fan-out {options['fanout']} in {result['sent_in']:.2f}s "
+            f"({result['events'] / result['sent_in']:,.0f}/s, target {options['rate']:,.0f}/s)"
+        )
+        self.stdout.write(
+            f"  delivery:    {result['received']} of {result['expected']}, {dropped} dropped; "
+            f"p50 {percentile(latency, 0.5):.1f} ms, p95 {percentile(latency, 0.95):.1f} ms, "
+            f"p99 {percentile(latency, 0.99):.1f} ms, max {latency[-1] if latency else 0:.1f} ms"
+        )
@@ -0,0 +1,198 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import views
+from core.models import DueEntry, RetailerProfile, Transaction, UserProfile
+
+# "SCAN core_dueentry" and "SCAN core_dueentry USING INDEX ..." both walk the
+# whole table or index; "SCAN CONSTANT ROW" and subquery scans do not.
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(?!\()(\w+)')
+SKIPPED = ('INSERT', 'SAVEPOINT', 'RELEASE', 'ROLLBACK', 'BEGIN', 'COMMIT')
+# ANALYZE run while a table held a handful of rows (a new job queue, say, by
+# PRAGMA optimize) tells SQLite that scanning it is cheapest, for a join on
+# its primary key too. Statistics for tables under this many rows are set
+# aside, so every query is planned as it would be once the table has grown.
+SMALL_TABLE_ROWS = 1000
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(SKIPPED):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Call every API view against a throwaway supplier and retailer, run EXPLAIN QUERY PLAN '
+        'on each query it issues and exit non-zero if any of them scans a whole table. '
+        'Nothing is written: all of it runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true',
+                            help='Print the plan of every query, not only the failing ones.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans reads SQLite EXPLAIN QUERY PLAN output.')
+
+        with transaction.atomic():
+            self.set_aside_small_table_statistics()
+            results = self.check_views()
+            transaction.set_rollback(True)
+        self.reload_statistics()
+
+        failures = 0
+        for name, sql, plan, scans in results:
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'{name}: full scan of {", ".join(scans)}'))
+            elif not options['show_plans']:
+                continue
+            else:
+                self.stdout.write(f'{name}:')
+            self.stdout.write(f'  {sql}')
+            for line in plan:
+                self.stdout.write(f'    {line}')
+
+        if failures:
+            self.stderr.write(self.style.ERROR(f'{failures} of {len(results)} queries scan a whole table.'))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} queries checked, none scans a whole table.'))
+
+    def check_views(self):
+        supplier = self.make_profile('plan-supplier', 'supplier')
+        retailer = self.make_profile('plan-retailer', 'retailer')
+        fintech = self.make_profile('plan-fintech', 'fintech')
+        RetailerProfile.objects.create(user_profile=retailer)
+        today = timezone.localdate()
+        due = DueEntry.objects.create(
+            supplier=supplier, retailer=retailer, amount=100, description='Query plan check',
+            purchase_date=today, due_date=today + timedelta(days=30)
+        )
+        emi_due = DueEntry.objects.create(
+            supplier=supplier, retailer=retailer, amount=5000, description='Query plan check',
+            purchase_date=today, due_date=today + timedelta(days=30)
+        )
+        Transaction.objects.create(
+            supplier=supplier, retailer=retailer, amount=100, description='Query plan check',
+            due_date=timezone.now() + timedelta(days=30)
+        )
+        period = {'created_from': today.isoformat(), 'created_to': today.isoformat()}
+        import_body = (
+            'retailer_phone,retailer_gst,amount,description,purchase_date,due_date\n'
+            f'{retailer.phone},,10,Query plan check,{today},{today}\n'
+            f',{retailer.gst_number},10,Query plan check,{today},{today}\n'
+        ).encode()
+
+        calls = [
+            ('register', None, 'post', views.register_user, {}, {'data': {
+                'user_type': 'retailer', 'businessName': 'Plan Register',
+                'user': {'email': 'plan-register@example.com', 'password': 'plan-check'}
+            }, 'format': 'json'}),
+            ('login', None, 'post', views.login_view, {}, {'data': {
+                'email': supplier.user.email, 'password': 'plan-check'
+            }, 'format': 'json'}),
+            ('dashboard stats', supplier, 'get', views.get_dashboard_stats, {}, {}),
+            ('dashboard analytics', supplier, 'get', views.get_dashboard_analytics, {}, {}),
+            ('retailers', supplier, 'get', views.get_retailers, {}, {}),
+            ('retailer search by name', supplier, 'get', views.search_retailers, {}, {'data': {'q': 'plan'}}),
+            ('retailer search by phone', supplier, 'get', views.search_retailers, {}, {'data': {'q': retailer.phone}}),
+            ('recent retailers', supplier, 'get', views.get_recent_retailers, {}, {}),
+            ('retailer details', supplier, 'get', views.get_retailer_details, {'retailer_id': retailer.id}, {}),
+            ('supplier dues', supplier, 'get', views.get_dues, {}, {}),
+            ('supplier dues by status', supplier, 'get', views.get_dues, {}, {'data': {'status': 'pending,overdue'}}),
+            ('supplier dues by retailer', supplier, 'get', views.get_dues, {}, {'data': {'retailer': retailer.id}}),
+            ('supplier dues by due date', supplier, 'get', views.get_dues, {}, {'data': {
+                'due_date_from': today.isoformat(), 'due_date_to': today.isoformat()
+            }}),
+            ('retailer dues', retailer, 'get', views.get_dues, {}, {}),
+            ('due details', supplier, 'get', views.get_due_details, {'due_id': due.id}, {}),
+            ('export dues', supplier, 'get', views.export_dues, {}, {'data': {'format': 'csv', **period}}),
+            ('export transactions', supplier, 'get', views.export_transactions, {}, {'data': {'format': 'csv'}}),
+            ('export transactions by status', supplier, 'get', views.export_transactions, {}, {'data': {
+                'format': 'csv', 'status': 'pending', **period
+            }}),
+            ('export transactions by retailer', supplier, 'get', views.export_transactions, {}, {'data': {
+                'format': 'csv', 'retailer': retailer.id, 'status': 'pending'
+            }}),
+            ('retailer export transactions', retailer, 'get', views.export_transactions, {}, {'data': {
+                'format': 'ndjson', **period
+            }}),
+            ('create due', supplier, 'post', views.create_due, {}, {'data': {
+                'retailer': retailer.id, 'amount': '50.00', 'description': 'Query plan check',
+                'purchase_date': today.isoformat(), 'due_date': today.isoformat()
+            }, 'format': 'json'}),
+            ('bulk import dues', supplier, 'post', views.bulk_create_dues, {}, {
+                'data': import_body, 'content_type': 'text/csv'
+            }),
+            ('make payment', retailer, 'post', views.make_payment, {'due_id': due.id}, {'data': {
+                'payment_method': 'upi', 'amount': '10.00', 'idempotency_key': 'plan-check'
+            }, 'format': 'json'}),
+            ('repeat payment', retailer, 'post', views.make_payment, {'due_id': due.id}, {'data': {
+                'payment_method': 'upi', 'amount': '10.00', 'idempotency_key': 'plan-check'
+            }, 'format': 'json'}),
+            ('request assessment', fintech, 'post', views.request_credit_assessment, {'retailer_id': retailer.id}, {}),
+            ('repeat assessment request', fintech, 'post', views.request_credit_assessment, {'retailer_id': retailer.id}, {}),
+            ('emi plans', retailer, 'get', views.get_emi_plans, {'due_id': emi_due.id}, {}),
+            ('activate emi plan', fintech, 'post', views.activate_emi_plan, {'due_id': emi_due.id, 'plan_id': '6'}, {}),
+        ]
+
+        factory = APIRequestFactory()
+        results = []
+        for name, profile, method, view, kwargs, request_options in calls:
+            request = getattr(factory, method)('/', **request_options)
+            request.session = SessionStore()
+            if profile is not None:
+                force_authenticate(request, user=profile.user)
+
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                response = view(request, **kwargs)
+                if getattr(response, 'streaming', False):
+                    for _ in response.streaming_content:
+                        pass
+            if response.status_code >= 400:
+                raise CommandError(f'{name} returned {response.status_code}')
+
+            for sql, params in recorder.queries:
+                plan = self.explain(sql, params)
+                scans = sorted({match.group(1) for match in map(FULL_SCAN.match, plan) if match})
+                results.append((name, sql % tuple(repr(param) for param in params or ()), plan, scans))
+        return results
+
+    def make_profile(self, name, user_type):
+        user = User.objects.create_user(username=name, email=f'{name}@example.com', password='plan-check')
+        return UserProfile.objects.create(
+            user=user, user_type=user_type, business_name=name.replace('-', ' ').title(),
+            phone=f'9{user.id:09d}'[-10:], gst_number=f'PLAN{user.id:011d}'[-15:]
+        )
+
+    def set_aside_small_table_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return
+            # The first number of each row is the table's row count
+            cursor.execute('DELETE FROM sqlite_stat1 WHERE CAST(stat AS INTEGER) < %s', [SMALL_TABLE_ROWS])
+        self.reload_statistics()
+
+    def reload_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE sqlite_schema')
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
@@ -0,0 +1,297 @@
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core import credit, ledger, rollups, scoring, search
+from core.models import DueEntry, ExistingLoan, Payment, RetailerProfile, Transaction, UserProfile
+
+WORDS = [
+    'sri', 'lakshmi', 'ganesh', 'balaji', 'sai', 'krishna', 'venkatesh', 'mahalakshmi',
+    'ravi', 'prakash', 'sudha', 'anjana', 'kumar', 'devi', 'rohit', 'padma', 'gopal',
+    'narayan', 'durga', 'shiva', 'annapurna', 'vijaya', 'bharat', 'kaveri', 'tirumala',
+]
+RETAILER_SUFFIXES = ['kirana', 'general stores', 'provisions', 'medical', 'mart', 'super market', 'fancy stores']
+SUPPLIER_SUFFIXES = ['traders', 'distributors', 'agencies', 'enterprises', 'wholesale']
+PAYMENT_METHODS = ['upi', 'bank_transfer', 'card', 'cash']
+PAYMENT_TERMS = [15, 30, 45, 60]
+
+# Share of overdue-date dues that were settled, and of open dues part paid
+PAID_SHARE = 0.75
+PART_PAID_SHARE = 0.2
+TRANSACTION_STATUSES = (['completed', 'pending', 'failed'], [0.85, 0.1, 0.05])
+# Limits raised to cover open dues leave this much room over the balance
+LIMIT_HEADROOM = 1.25
+
+
+def zipf_choice(rng, count, size, exponent):
+    """Indexes 0..count-1 drawn with Zipf-like popularity, in a random order of popularity."""
+    weights = 1 / np.arange(1, count + 1) ** exponent
+    ranks = rng.choice(count, size=size, p=weights / weights.sum())
+    return rng.permutation(count)[ranks]
+
+
+def amounts(rng, size, median, sigma=1.0, low=100, high=5000000):
+    values = np.clip(rng.lognormal(np.log(median), sigma, size), low, high)
+    return [Decimal(f'{value:.2f}') for value in values.tolist()]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the auto_now/auto_now_add values set on the objects."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic suppliers, retailers, fintech users, dues, payments and transactions '
+        'with bulk_create, with skewed (Zipf-like) activity per supplier and retailer and a history '
+        'of --days, then rebuild the ledger summaries, rollups, search index and credit fields.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suppliers', type=int, default=50)
+        parser.add_argument('--retailers', type=int, default=5000)
+        parser.add_argument('--fintech', type=int, default=2)
+        parser.add_argument('--dues', type=int, default=1000000)
+        parser.add_argument('--transactions', type=int, default=1000000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread created_at over this many days before now.')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent for how activity concentrates on a few suppliers and retailers.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.rng = np.random.default_rng(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        self.verbose = options['verbosity'] > 1
+        started = time.perf_counter()
+        self.tag = f"synthetic{(User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1}"
+
+        suppliers = self.create_profiles('supplier', options['suppliers'], SUPPLIER_SUFFIXES)
+        retailers = self.create_profiles('retailer', options['retailers'], RETAILER_SUFFIXES)
+        self.create_profiles('fintech', options['fintech'], ['capital'])
+        retailer_profiles = self.create_retailer_profiles(retailers)
+        self.stdout.write(f'Created {len(suppliers)} suppliers and {len(retailers)} retailers ({self.elapsed(started)})')
+
+        with explicit_timestamps(DueEntry, Transaction, Payment):
+            dues, payments = self.create_dues(suppliers, retailers, options['dues'], options['skew'])
+            self.stdout.write(f'Created {dues} dues and {payments} payments ({self.elapsed(started)})')
+            transactions = self.create_transactions(suppliers, retailers, options['transactions'], options['skew'])
+            self.stdout.write(f'Created {transactions} transactions ({self.elapsed(started)})')
+
+        # bulk_create bypasses core.signals, so derived data is rebuilt here
+        ledger.rebuild_summaries(suppliers)
+        rollups.rebuild_rollups(suppliers)
+        search.reindex_retailers(UserProfile.objects.filter(id__in=retailers))
+        scoring.score_retailers(retailer_profiles, record=False)
+        self.fit_limits(retailers)
+        credit.reconcile(retailer_profiles)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {self.tag} data set and rebuilt derived tables in {self.elapsed(started)}.'
+        ))
+
+    def elapsed(self, started):
+        return f'{time.perf_counter() - started:.1f}s'
+
+    def batches(self, count):
+        for offset in range(0, count, self.batch_size):
+            yield offset, min(self.batch_size, count - offset)
+
+    def random_times(self, size):
+        # Activity grows towards the present: more rows in recent days
+        seconds_ago = np.minimum(self.rng.exponential(self.days / 3, size), self.days) * 86400
+        return [self.now - timedelta(seconds=value) for value in seconds_ago.tolist()]
+
+    def create_profiles(self, user_type, count, suffixes):
+        ids = []
+        for offset, size in self.batches(count):
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(
+                        username=f'{self.tag}-{user_type}-{offset + index}',
+                        email=f'{self.tag}-{user_type}-{offset + index}@example.com',
+                        password='!'
+                    )
+                    for index in range(size)
+                ])
+                names = self.rng.choice(WORDS, size=(size, 2))
+                profiles = UserProfile.objects.bulk_create([
+                    UserProfile(
+                        user=user,
+                        user_type=user_type,
+                        business_name=f'{first} {second} {self.rng.choice(suffixes)}'.title(),
+                        phone=f'9{self.rng.integers(10 ** 9):09d}',
+                        gst_number=f'{self.rng.integers(1, 38):02d}AAACS{self.rng.integers(10 ** 4):04d}A1Z5'
+                    )
+                    for user, (first, second) in zip(users, names.tolist())
+                ])
+            ids.extend(profile.id for profile in profiles)
+        return ids
+
+    def create_retailer_profiles(self, retailers):
+        rng = self.rng
+        ids = []
+        for offset, size in self.batches(len(retailers)):
+            batch = retailers[offset:offset + size]
+            turnover = amounts(rng, size, median=2400000, sigma=1.2, low=100000, high=500000000)
+            with transaction.atomic():
+                profiles = RetailerProfile.objects.bulk_create([
+                    RetailerProfile(
+                        user_profile_id=profile_id,
+                        annual_turnover=turnover[index],
+                        years_in_business=int(rng.integers(0, 25)),
+                        shop_ownership='owned' if rng.random() < 0.35 else 'rented',
+                        monthly_rent=None if rng.random() < 0.35 else Decimal(int(rng.integers(3000, 60000))),
+                        employee_count=int(rng.integers(1, 20)),
+                        bank_statement_score=None if rng.random() < 0.3 else int(rng.integers(20, 100))
+                    )
+                    for index, profile_id in enumerate(batch)
+                ])
+                ExistingLoan.objects.bulk_create([
+                    ExistingLoan(
+                        retailer=profile,
+                        loan_amount=Decimal(int(rng.integers(50, 2000)) * 1000),
+                        loan_provider=str(rng.choice(['SBI', 'HDFC', 'Bajaj Finance', 'Muthoot'])),
+                        monthly_emi=Decimal(int(rng.integers(2, 60)) * 500)
+                    )
+                    for profile in profiles if rng.random() < 0.25
+                ])
+            ids.extend(profile.id for profile in profiles)
+        return ids
+
+    def fit_limits(self, retailers):
+        """
+        Raise the scored limits that the open dues already exceed. Scoring
+        prices a limit from the profile alone and the dues were generated
+        without one, so otherwise many retailers would start over their limit
+        and every new due for them would be rejected.
+        """
+        for offset, size in self.batches(len(retailers)):
+            batch = retailers[offset:offset + size]
+            balances = dict(DueEntry.objects.filter(
+                retailer_id__in=batch, status__in=credit.OPEN_STATUSES
+            ).order_by().values('retailer_id').annotate(
+                balance=Sum(F('amount') - F('amount_paid'))
+            ).values_list('retailer_id', 'balance'))
+            profiles = RetailerProfile.objects.filter(user_profile_id__in=balances).only(
+                'id', 'user_profile_id', 'credit_limit'
+            )
+            raised = []
+            for profile in profiles:
+                steps = math.ceil(float(balances[profile.user_profile_id]) * LIMIT_HEADROOM / scoring.LIMIT_STEP)
+                if steps * scoring.LIMIT_STEP > profile.credit_limit:
+                    profile.credit_limit = Decimal(steps * scoring.LIMIT_STEP)
+                    raised.append(profile)
+            RetailerProfile.objects.bulk_update(raised, ['credit_limit'], batch_size=1000)
+            RetailerProfile.objects.bulk_update(profiles, ['credit_limit'], batch_size=1000)
+
+    def create_dues(self, suppliers, retailers, count, skew):
+        rng = self.rng
+        today = timezone.localdate(self.now)
+        due_count = payment_count = 0
+        for offset, size in self.batches(count):
+            supplier_index = zipf_choice(rng, len(suppliers), size, skew)
+            retailer_index = zipf_choice(rng, len(retailers), size, skew)
+            created = self.random_times(size)
+            due_amounts = amounts(rng, size, median=5000)
+            terms = rng.choice(PAYMENT_TERMS, size).tolist()
+            settle = rng.random(size).tolist()
+            part = rng.random(size).tolist()
+
+            dues = []
+            for index in range(size):
+                amount = due_amounts[index]
+                purchase_date = timezone.localdate(created[index])
+                due_date = purchase_date + timedelta(days=terms[index])
+                updated = created[index]
+                if due_date < today and settle[index] < PAID_SHARE:
+                    status, amount_paid = 'paid', amount
+                    updated = min(self.now, timezone.make_aware(
+                        datetime.combine(due_date, datetime.min.time())
+                    ) - timedelta(days=int(terms[index] * part[index] / 2)))
+                else:
+                    status = 'overdue' if due_date < today else 'pending'
+                    amount_paid = (amount * Decimal(f'{part[index]:.2f}')).quantize(Decimal('0.01')) \
+                        if part[index] < PART_PAID_SHARE else Decimal('0')
+                dues.append(DueEntry(
+                    supplier_id=suppliers[supplier_index[index]],
+                    retailer_id=retailers[retailer_index[index]],
+                    amount=amount,
+                    amount_paid=amount_paid,
+                    description=f'Invoice {offset + index + 1}',
+                    purchase_date=purchase_date,
+                    due_date=due_date,
+                    status=status,
+                    created_at=created[index],
+                    updated_at=max(updated, created[index])
+                ))
+            with transaction.atomic():
+                DueEntry.objects.bulk_create(dues)
+                payments = Payment.objects.bulk_create([
+                    Payment(
+                        due_id=due.id,
+                        amount=due.amount_paid,
+                        payment_date=due.updated_at,
+                        payment_method=PAYMENT_METHODS[due.id % len(PAYMENT_METHODS)],
+                        status='completed',
+                        reference_id=f'SYN{due.id}'
+                    )
+                    for due in dues if due.amount_paid
+                ])
+            due_count += len(dues)
+            payment_count += len(payments)
+            if self.verbose:
+                self.stdout.write(f'  {due_count} dues')
+        return due_count, payment_count
+
+    def create_transactions(self, suppliers, retailers, count, skew):
+        rng = self.rng
+        statuses, weights = TRANSACTION_STATUSES
+        created_count = 0
+        for offset, size in self.batches(count):
+            supplier_index = zipf_choice(rng, len(suppliers), size, skew)
+            retailer_index = zipf_choice(rng, len(retailers), size, skew)
+            created = self.random_times(size)
+            transaction_amounts = amounts(rng, size, median=8000)
+            status = rng.choice(statuses, size, p=weights).tolist()
+            with transaction.atomic():
+                Transaction.objects.bulk_create([
+                    Transaction(
+                        supplier_id=suppliers[supplier_index[index]],
+                        retailer_id=retailers[retailer_index[index]],
+                        amount=transaction_amounts[index],
+                        description=f'Order {offset + index + 1}',
+                        status=status[index],
+                        created_at=created[index],
+                        updated_at=created[index],
+                        due_date=created[index] + timedelta(days=30)
+                    )
+                    for index in range(size)
+                ])
+            created_count += size
+            if self.verbose:
+                self.stdout.write(f'  {created_count} transactions')
+        return created_count
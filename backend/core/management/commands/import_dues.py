@@ -0,0 +1,40 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import imports
+from core.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Import dues for a supplier from a CSV or NDJSON file (see core.imports for the columns).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('supplier', type=int, help='Supplier profile id.')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        supplier = UserProfile.objects.filter(id=options['supplier'], user_type='supplier').first()
+        if supplier is None:
+            raise CommandError(f"No supplier profile with id {options['supplier']}")
+        try:
+            fmt = options['format'] or imports.detect_format(options['path'])
+        except imports.ImportFormatError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        with open(options['path'], 'rb') as stream:
+            report = imports.import_dues(supplier, stream, fmt, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        if report['errors_truncated']:
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more rows failed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} dues, {report['failed']} rows failed ({elapsed:.1f}s)."
+        ))
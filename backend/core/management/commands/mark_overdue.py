@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from core import overdue
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark pending dues whose due date has passed as overdue, in bounded chunks. '
+        'Safe to interrupt and re-run; it resumes where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=overdue.DEFAULT_CHUNK_SIZE,
+                            help='Dues updated per transaction.')
+        parser.add_argument('--limit', type=int,
+                            help='Stop after this many dues.')
+        parser.add_argument('--today', type=parse_date,
+                            help='Treat this date (YYYY-MM-DD) as today.')
+        parser.add_argument('--no-events', action='store_true',
+                            help='Do not publish dues_updated events (e.g. for a large backfill).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(processed, remaining):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{processed} marked overdue, {remaining} left ({elapsed:.1f}s)')
+
+        moved = overdue.sweep(
+            today=options['today'],
+            chunk_size=options['chunk_size'],
+            limit=options['limit'],
+            publish=not options['no_events'],
+            progress=progress if options['verbosity'] else None
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {moved} dues overdue in {time.perf_counter() - started:.1f}s.'
+        ))
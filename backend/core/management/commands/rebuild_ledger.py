@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from core import ledger
+from core.models import SupplierLedgerSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild supplier ledger summaries from DueEntry and Transaction rows, or check them for drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--supplier', type=int, action='append', dest='suppliers',
+                            help='Limit to this supplier profile id (repeatable).')
+        parser.add_argument('--check', action='store_true',
+                            help='Report drift without writing; exits non-zero if any is found.')
+
+    def handle(self, *args, **options):
+        supplier_ids = options['suppliers']
+        if not options['check']:
+            computed = ledger.rebuild_summaries(supplier_ids)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(computed)} ledger summaries.'))
+            return
+
+        computed = ledger.compute_summaries(supplier_ids)
+        stored = SupplierLedgerSummary.objects.all()
+        if supplier_ids is not None:
+            stored = stored.filter(supplier_id__in=supplier_ids)
+        stored = {summary.supplier_id: summary for summary in stored}
+
+        drifted = 0
+        for supplier_id, expected in computed.items():
+            summary = stored.get(supplier_id)
+            if summary is None:
+                drifted += 1
+                self.stdout.write(f'Supplier {supplier_id}: summary missing')
+                continue
+            actual = {
+                'total_outstanding': summary.total_outstanding,
+                'overdue_amount': summary.overdue_amount,
+                'active_retailers': summary.active_retailers,
+                'monthly_sales': ledger.monthly_sales(summary),
+            }
+            wanted = dict(expected, monthly_sales=sum(
+                (Decimal(value) for value in expected['daily_sales'].values()), Decimal('0')
+            ))
+            diffs = [
+                f'{field} {actual[field]} != {wanted[field]}'
+                for field in actual if actual[field] != wanted[field]
+            ]
+            if diffs:
+                drifted += 1
+                self.stdout.write(f'Supplier {supplier_id}: ' + ', '.join(diffs))
+
+        if drifted:
+            self.stderr.write(self.style.ERROR(f'{drifted} ledger summaries drifted.'))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(f'{len(computed)} ledger summaries consistent.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = 'Backfill monthly and daily analytics rollups from DueEntry and Transaction rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--supplier', type=int, action='append', dest='suppliers',
+                            help='Limit to this supplier profile id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per bulk insert.')
+
+    def handle(self, *args, **options):
+        monthly, daily = rollups.rebuild_rollups(options['suppliers'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(monthly)} monthly and {len(daily)} daily rollups.'
+        ))
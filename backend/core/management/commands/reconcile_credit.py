@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core import credit
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute RetailerProfile.available_credit as credit_limit less open dues and repair any '
+        'profile that has drifted, or report drift only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retailer', type=int, action='append', dest='retailers',
+                            help='Limit to this RetailerProfile id (repeatable).')
+        parser.add_argument('--check', action='store_true',
+                            help='Report drift without writing; exits non-zero if any is found.')
+
+    def handle(self, *args, **options):
+        retailer_ids = options['retailers']
+        if not options['check']:
+            repaired = credit.reconcile(retailer_ids)
+            self.stdout.write(self.style.SUCCESS(f'Repaired available credit for {repaired} retailers.'))
+            return
+
+        drifted = 0
+        for profile_id, available, expected in credit.drifted(retailer_ids).values_list(
+            'id', 'available_credit', 'expected'
+        ).iterator():
+            drifted += 1
+            self.stdout.write(f'Retailer profile {profile_id}: available_credit {available} != {expected}')
+
+        if drifted:
+            self.stderr.write(self.style.ERROR(f'{drifted} retailers have drifted available credit.'))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS('Available credit consistent for all retailers.'))
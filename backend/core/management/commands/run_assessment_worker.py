@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import assessments
+
+
+class Command(BaseCommand):
+    help = (
+        'Process queued credit assessments: claim jobs in batches and score them in a pool of '
+        'worker processes, which publish credit_limit_updated as each batch completes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: one per core).')
+        parser.add_argument('--batch-size', type=int, default=assessments.DEFAULT_BATCH_SIZE,
+                            help='Jobs claimed and scored together by one process.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait for new jobs when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling.')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        batch_size = options['batch_size']
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        started = time.perf_counter()
+        completed = 0
+
+        # Children are spawned, not forked, so none inherits this process's
+        # database connection; each sets Django up and opens its own.
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        )
+        running = {}
+        try:
+            while True:
+                assessments.requeue_expired()
+                # Keep every process busy with one batch queued behind it
+                while len(running) < processes * 2:
+                    job_ids = assessments.claim(worker, batch_size)
+                    if not job_ids:
+                        break
+                    running[pool.submit(assessments.run_jobs, job_ids)] = job_ids
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_ids = running.pop(future)
+                    try:
+                        finished = future.result()
+                    except Exception as e:
+                        assessments.fail_jobs(job_ids, repr(e))
+                        self.stderr.write(f'Batch of {len(job_ids)} jobs failed: {e!r}')
+                        continue
+                    completed += len(finished)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{completed} assessments completed ({time.perf_counter() - started:.1f}s)')
+        except KeyboardInterrupt:
+            # Batches that had not started go straight back to the queue;
+            # ones already running are queued again when their lease expires
+            for future, job_ids in running.items():
+                if future.cancel():
+                    assessments.release(job_ids)
+            self.stdout.write('Stopping.')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Completed {completed} assessments in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import scoring
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute credit_score, credit_limit and available_credit for retailers from their profile, '
+        'existing loans and repayment record, recording a CreditAssessment for each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retailer', type=int, action='append', dest='retailers',
+                            help='Limit to this RetailerProfile id (repeatable).')
+        parser.add_argument('--chunk-size', type=int, default=scoring.DEFAULT_CHUNK_SIZE,
+                            help='Retailers scored and written per transaction.')
+        parser.add_argument('--no-assessments', action='store_true',
+                            help='Update the profiles without recording CreditAssessment rows.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(scored):
+            self.stdout.write(f'{scored} retailers scored ({time.perf_counter() - started:.1f}s)')
+
+        scored = scoring.score_retailers(
+            retailer_ids=options['retailers'],
+            chunk_size=options['chunk_size'],
+            record=not options['no_assessments'],
+            progress=progress if options['verbosity'] else None
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} retailers in {time.perf_counter() - started:.1f}s.'
+        ))
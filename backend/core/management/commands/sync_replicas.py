@@ -0,0 +1,41 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source, target):
+    # The backup API copies a consistent snapshot while both files are in use
+    with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target, timeout=30)) as dst:
+        src.backup(dst)
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database over each alias in DATABASE_REPLICAS, once or every '
+        '--interval seconds; a local stand-in for replication when testing the replica router.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep copying, this many seconds apart.')
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('No replicas configured; set DB_REPLICAS')
+        if any(connections[alias].vendor != 'sqlite' for alias in [DEFAULT_DB_ALIAS, *replicas]):
+            raise CommandError('sync_replicas copies SQLite files; replicate other databases with their own tools')
+
+        primary = str(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        while True:
+            for alias in replicas:
+                started = time.perf_counter()
+                copy_database(primary, str(settings.DATABASES[alias]['NAME']))
+                self.stdout.write(f'Copied to {alias} in {time.perf_counter() - started:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
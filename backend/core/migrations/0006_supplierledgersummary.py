@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_retailerprofile_available_credit_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierLedgerSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_retailers', models.IntegerField(default=0)),
+                ('daily_sales', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_summary', to='core.userprofile')),
+            ],
+        ),
+    ]
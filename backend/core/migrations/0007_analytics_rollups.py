@@ -0,0 +1,53 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_supplierledgersummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('transaction_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.userprofile')),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('due_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('due_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('overdue_count', models.IntegerField(default=0)),
+                ('retailer_count', models.IntegerField(default=0)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='core.userprofile')),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='supplierdailyrollup',
+            constraint=models.UniqueConstraint(fields=('supplier', 'day'), name='unique_supplier_day_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='suppliermonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('supplier', 'month'), name='unique_supplier_month_rollup'),
+        ),
+    ]
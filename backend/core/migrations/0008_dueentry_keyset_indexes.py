@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['supplier', '-created_at', '-id'], name='due_supplier_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['retailer', '-created_at', '-id'], name='due_retailer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['supplier', 'status', '-created_at', '-id'], name='due_supplier_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['supplier', 'retailer', '-created_at', '-id'], name='due_supplier_retailer_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:05
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of core.search.tokens_for as of this migration, so later
+# changes to the live tokenizer do not change what the migration writes
+MAX_TOKEN_LENGTH = 40
+
+_non_alnum = re.compile(r'[^0-9a-z]+')
+_non_digit = re.compile(r'\D+')
+
+
+def normalize_text(value):
+    return _non_alnum.sub(' ', (value or '').lower()).strip()
+
+
+def normalize_phone(value):
+    digits = _non_digit.sub('', value or '')
+    if len(digits) > 10 and (digits.startswith('91') or digits.startswith('0')):
+        digits = digits[-10:]
+    return digits
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def tokens_for(business_name, phone):
+    name = normalize_text(business_name)
+    digits = normalize_phone(phone)
+    tokens = {f'w:{word}' for word in name.split()}
+    tokens.update(f't:{gram}' for gram in trigrams(name))
+    if digits:
+        tokens.add(f'p:{digits}')
+        tokens.update(f't:{gram}' for gram in trigrams(digits))
+    return {token[:MAX_TOKEN_LENGTH] for token in tokens}
+
+
+def index_existing_retailers(apps, schema_editor):
+    UserProfile = apps.get_model('core', 'UserProfile')
+    RetailerSearchToken = apps.get_model('core', 'RetailerSearchToken')
+    batch = []
+    for profile_id, business_name, phone in UserProfile.objects.filter(
+        user_type='retailer'
+    ).values_list('id', 'business_name', 'phone').iterator():
+        batch.extend(
+            RetailerSearchToken(retailer_id=profile_id, token=token)
+            for token in tokens_for(business_name, phone)
+        )
+        if len(batch) >= 1000:
+            RetailerSearchToken.objects.bulk_create(batch)
+            batch = []
+    RetailerSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_dueentry_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetailerSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=40)),
+                ('retailer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='core.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'retailer'], name='search_token_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_retailers, migrations.RunPython.noop),
+    ]
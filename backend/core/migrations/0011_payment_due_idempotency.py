@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def settle_paid_dues(apps, schema_editor):
+    # Dues marked paid before partial payments existed were paid in full
+    DueEntry = apps.get_model('core', 'DueEntry')
+    DueEntry.objects.filter(status='paid').update(amount_paid=F('amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_usereventsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dueentry',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='due',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='core.dueentry'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='reference_id',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='transaction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.transaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('due', 'idempotency_key'), name='payment_due_idempotency_key'),
+        ),
+        migrations.RunPython(settle_paid_dues, migrations.RunPython.noop),
+    ]
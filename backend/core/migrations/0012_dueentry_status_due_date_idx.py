@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_payment_due_idempotency'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['status', 'due_date', 'id'], name='due_status_due_date_idx'),
+        ),
+    ]
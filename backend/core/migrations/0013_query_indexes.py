@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_dueentry_status_due_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['supplier', '-created_at', '-id'], name='txn_supplier_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['retailer', '-created_at', '-id'], name='txn_retailer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['supplier', 'status', '-created_at', '-id'], name='txn_supplier_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['supplier', 'retailer', 'status', '-created_at', '-id'], name='txn_supplier_retailer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['user_type', 'business_name'], name='profile_type_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['user_type', 'gst_number'], name='profile_type_gst_idx'),
+        ),
+        # login_view looks users up by email, which auth_user does not index
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email)',
+            reverse_sql='DROP INDEX IF EXISTS auth_user_email_idx',
+        ),
+    ]
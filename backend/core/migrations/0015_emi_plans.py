@@ -0,0 +1,58 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_assessmentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EMIPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenure_months', models.PositiveSmallIntegerField()),
+                ('interest_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('principal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('monthly_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='active', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activated_emi_plans', to='core.userprofile')),
+                ('due', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emi_plans', to='core.dueentry')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EMIInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('principal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('interest', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('overdue', 'Overdue')], default='pending', max_length=10)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='core.emiplan')),
+            ],
+            options={
+                'ordering': ['plan', 'number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='emiplan',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('due',), name='emi_plan_active_due'),
+        ),
+        migrations.AddIndex(
+            model_name='emiinstallment',
+            index=models.Index(fields=['status', 'due_date'], name='emi_installment_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='emiinstallment',
+            constraint=models.UniqueConstraint(fields=('plan', 'number'), name='emi_installment_plan_number'),
+        ),
+    ]
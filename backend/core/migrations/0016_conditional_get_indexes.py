@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_emi_plans'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['supplier', 'updated_at'], name='due_supplier_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dueentry',
+            index=models.Index(fields=['retailer', 'updated_at'], name='due_retailer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['supplier', 'updated_at'], name='txn_supplier_updated_idx'),
+        ),
+    ]
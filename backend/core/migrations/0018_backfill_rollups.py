@@ -0,0 +1,71 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:20
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    # A frozen copy of core.rollups.compute_rollups as of this migration, so
+    # later changes to it do not change what the migration writes
+    DueEntry = apps.get_model('core', 'DueEntry')
+    Transaction = apps.get_model('core', 'Transaction')
+    SupplierMonthlyRollup = apps.get_model('core', 'SupplierMonthlyRollup')
+    SupplierDailyRollup = apps.get_model('core', 'SupplierDailyRollup')
+
+    tzinfo = timezone.get_current_timezone()
+    month = TruncMonth('created_at', output_field=DateField(), tzinfo=tzinfo)
+    day = TruncDate('created_at', tzinfo=tzinfo)
+
+    monthly = defaultdict(dict)
+    for row in DueEntry.objects.order_by().annotate(month=month).values('supplier_id', 'month').annotate(
+        due_amount=Sum('amount'),
+        due_count=Count('id'),
+        paid_count=Count('id', filter=Q(status='paid')),
+        overdue_count=Count('id', filter=Q(status='overdue')),
+        retailer_count=Count('retailer', distinct=True)
+    ):
+        monthly[(row.pop('supplier_id'), row.pop('month'))].update(row)
+    for row in Transaction.objects.order_by().annotate(month=month).values('supplier_id', 'month').annotate(
+        transaction_amount=Sum('amount'), transaction_count=Count('id')
+    ):
+        monthly[(row.pop('supplier_id'), row.pop('month'))].update(row)
+
+    daily = {}
+    for row in Transaction.objects.order_by().annotate(day=day).values('supplier_id', 'day').annotate(
+        transaction_amount=Sum('amount'), transaction_count=Count('id')
+    ):
+        daily[(row.pop('supplier_id'), row.pop('day'))] = row
+
+    # Rows written before 0007 never reached the rollups, so replace them all
+    # rather than topping up what the signals added
+    SupplierMonthlyRollup.objects.all().delete()
+    SupplierDailyRollup.objects.all().delete()
+    SupplierMonthlyRollup.objects.bulk_create(
+        [
+            SupplierMonthlyRollup(supplier_id=supplier_id, month=month, **values)
+            for (supplier_id, month), values in monthly.items()
+        ],
+        batch_size=1000
+    )
+    SupplierDailyRollup.objects.bulk_create(
+        [
+            SupplierDailyRollup(supplier_id=supplier_id, day=day, **values)
+            for (supplier_id, day), values in daily.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_userprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
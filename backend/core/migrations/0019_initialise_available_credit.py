@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def initialise_available_credit(apps, schema_editor):
+    # available_credit was added at 0 and only moved by dues written since;
+    # set it to the limit less every open due's balance
+    DueEntry = apps.get_model('core', 'DueEntry')
+    RetailerProfile = apps.get_model('core', 'RetailerProfile')
+    balance = DueEntry.objects.filter(
+        retailer_id=OuterRef('user_profile_id'), status__in=('pending', 'overdue')
+    ).order_by().values('retailer_id').annotate(
+        balance=Sum(F('amount') - F('amount_paid'))
+    ).values('balance')
+    RetailerProfile.objects.update(available_credit=F('credit_limit') - Coalesce(
+        Subquery(balance), Value(Decimal('0')), output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_backfill_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(initialise_available_credit, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,13 @@ class UserProfile(models.Model):
     gst_number = models.CharField(max_length=15, null=True, blank=True)
     address = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_type', 'business_name'], name='profile_type_name_idx'),
+            models.Index(fields=['user_type', 'gst_number'], name='profile_type_gst_idx'),
+        ]
 
     def __str__(self):
         return f"{self.business_name} ({self.user_type})"
@@ -88,6 +95,39 @@ class CreditAssessment(models.Model):
     def __str__(self):
         return f"Credit Assessment - {self.retailer.user_profile.business_name}"
 
+class AssessmentJob(models.Model):
+    retailer = models.ForeignKey(RetailerProfile, on_delete=models.CASCADE, related_name='assessment_jobs')
+    assessment = models.OneToOneField(CreditAssessment, on_delete=models.CASCADE, related_name='job')
+    requested_by = models.ForeignKey(UserProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='requested_assessments')
+    status = models.CharField(max_length=10, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='assessment_job_queue_idx'),
+        ]
+        constraints = [
+            # At most one queued or running job per retailer
+            models.UniqueConstraint(
+                fields=['retailer'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='assessment_job_active_retailer'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Assessment Job {self.pk} - {self.status}"
+
 class Transaction(models.Model):
     supplier = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='supplied_transactions')
     retailer = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='received_transactions')
@@ -102,24 +142,48 @@ class Transaction(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['supplier', '-created_at', '-id'], name='txn_supplier_created_idx'),
+            models.Index(fields=['retailer', '-created_at', '-id'], name='txn_retailer_created_idx'),
+            models.Index(fields=['supplier', 'status', '-created_at', '-id'], name='txn_supplier_status_idx'),
+            models.Index(fields=['supplier', 'retailer', 'status', '-created_at', '-id'], name='txn_supplier_retailer_idx'),
+            # Version tokens for conditional GET (core.conditional)
+            models.Index(fields=['supplier', 'updated_at'], name='txn_supplier_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Transaction - {self.supplier.business_name} to {self.retailer.business_name}"
 
 class Payment(models.Model):
-    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE)
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, null=True, blank=True)
+    due = models.ForeignKey('DueEntry', on_delete=models.CASCADE, null=True, blank=True, related_name='payments')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateTimeField(auto_now_add=True)
     payment_method = models.CharField(max_length=50)
     status = models.CharField(max_length=10)
-    reference_id = models.CharField(max_length=100)
+    reference_id = models.CharField(max_length=100, blank=True)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['due', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='payment_due_idempotency_key'
+            ),
+        ]
 
     def __str__(self):
-        return f"Payment - {self.transaction.id}"
+        if self.due_id:
+            return f"Payment - due {self.due_id}"
+        return f"Payment - {self.transaction_id}"
 
 class DueEntry(models.Model):
     supplier = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='given_dues')
     retailer = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='received_dues')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     description = models.TextField()
     purchase_date = models.DateField()
     due_date = models.DateField()
@@ -133,6 +197,140 @@ class DueEntry(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['supplier', '-created_at', '-id'], name='due_supplier_created_idx'),
+            models.Index(fields=['retailer', '-created_at', '-id'], name='due_retailer_created_idx'),
+            models.Index(fields=['supplier', 'status', '-created_at', '-id'], name='due_supplier_status_idx'),
+            models.Index(fields=['supplier', 'retailer', '-created_at', '-id'], name='due_supplier_retailer_idx'),
+            models.Index(fields=['status', 'due_date', 'id'], name='due_status_due_date_idx'),
+            # Version tokens for conditional GET (core.conditional)
+            models.Index(fields=['supplier', 'updated_at'], name='due_supplier_updated_idx'),
+            models.Index(fields=['retailer', 'updated_at'], name='due_retailer_updated_idx'),
+        ]
+
+    @property
+    def balance(self):
+        return self.amount - self.amount_paid
+
+    def __str__(self):
+        return f"Due Entry - {self.supplier.business_name} to {self.retailer.business_name}"
+
+class EMIPlan(models.Model):
+    due = models.ForeignKey(DueEntry, on_delete=models.CASCADE, related_name='emi_plans')
+    activated_by = models.ForeignKey(UserProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='activated_emi_plans')
+    tenure_months = models.PositiveSmallIntegerField()
+    interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    principal = models.DecimalField(max_digits=10, decimal_places=2)
+    monthly_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=10, choices=[
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled')
+    ], default='active')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # At most one active plan per due
+            models.UniqueConstraint(
+                fields=['due'],
+                condition=models.Q(status='active'),
+                name='emi_plan_active_due'
+            ),
+        ]
+
+    def __str__(self):
+        return f"EMI Plan - due {self.due_id}, {self.tenure_months} months"
+
+class EMIInstallment(models.Model):
+    plan = models.ForeignKey(EMIPlan, on_delete=models.CASCADE, related_name='installments')
+    number = models.PositiveSmallIntegerField()
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    principal = models.DecimalField(max_digits=10, decimal_places=2)
+    interest = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=[
+        ('pending', 'Pending'),
+        ('paid', 'Paid'),
+        ('overdue', 'Overdue')
+    ], default='pending')
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['plan', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['plan', 'number'], name='emi_installment_plan_number'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='emi_installment_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Installment {self.number} - plan {self.plan_id}"
+
+class SupplierLedgerSummary(models.Model):
+    supplier = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='ledger_summary')
+    total_outstanding = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    overdue_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_retailers = models.IntegerField(default=0)
+    # Transaction totals bucketed by ISO date; only the last 30 days are kept
+    daily_sales = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ledger Summary - {self.supplier.business_name}"
+
+class SupplierMonthlyRollup(models.Model):
+    supplier = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField()
+    transaction_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    due_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    due_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)
+    overdue_count = models.IntegerField(default=0)
+    retailer_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['month']
+        constraints = [
+            models.UniqueConstraint(fields=['supplier', 'month'], name='unique_supplier_month_rollup')
+        ]
+
+    def __str__(self):
+        return f"Monthly Rollup - {self.supplier.business_name} {self.month:%Y-%m}"
+
+class SupplierDailyRollup(models.Model):
+    supplier = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    transaction_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['supplier', 'day'], name='unique_supplier_day_rollup')
+        ]
+
+    def __str__(self):
+        return f"Daily Rollup - {self.supplier.business_name} {self.day}"
+
+class RetailerSearchToken(models.Model):
+    retailer = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=40)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'retailer'], name='search_token_idx')
+        ]
+
+    def __str__(self):
+        return f"{self.token} - {self.retailer.business_name}"
+
+class UserEventSequence(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='event_sequence')
+    value = models.BigIntegerField(default=0)
 
     def __str__(self):
-        return f"Due Entry - {self.supplier.business_name} to {self.retailer.business_name}"
\ No newline at end of file
+        return f"Event Sequence - {self.user} ({self.value})"
\ No newline at end of file
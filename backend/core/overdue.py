@@ -0,0 +1,144 @@
+"""
+Moving pending dues past their due date to overdue.
+
+sweep() walks the (status, due_date, id) index in bounded chunks. Each chunk
+is one short transaction that flips the next pending ids with a single
+set-based UPDATE, so no write lock is held for longer than one chunk. That
+UPDATE bypasses core.signals, so the chunk also applies its ledger and
+rollup deltas in aggregate. Progress lives in the rows themselves: an
+interrupted sweep resumes where it stopped on the next run.
+
+Affected suppliers and retailers get one dues_updated event per chunk
+listing their dues that changed, in place of a due_updated per due (see
+UpdatesConsumer).
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import events, ledger, rollups
+from .fastpath import values_serializer
+from .models import DueEntry, UserProfile
+from .serializers import DueEntrySerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def overdue_candidates(today=None):
+    return DueEntry.objects.filter(status='pending', due_date__lt=today or timezone.localdate())
+
+
+def _claim_chunk(today, chunk_size, now):
+    """Flip up to chunk_size pending dues to overdue and return their ids."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        # One statement that both picks and updates the chunk, so on SQLite
+        # the write lock is taken before anything is read.
+        table = DueEntry._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET status = %s, updated_at = %s WHERE id IN ('
+                f'SELECT id FROM {table} WHERE status = %s AND due_date < %s '
+                'ORDER BY due_date, id LIMIT %s) RETURNING id',
+                [
+                    'overdue', connection.ops.adapt_datetimefield_value(now),
+                    'pending', connection.ops.adapt_datefield_value(today), chunk_size
+                ]
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+
+    ids = list(
+        overdue_candidates(today).order_by('due_date', 'id')
+        .select_for_update(skip_locked=True)
+        .values_list('id', flat=True)[:chunk_size]
+    )
+    DueEntry.objects.filter(id__in=ids).update(status='overdue', updated_at=now)
+    return ids
+
+
+def sweep_chunk(today, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Process one chunk; returns the ids of the dues that became overdue."""
+    with transaction.atomic():
+        ids = _claim_chunk(today, chunk_size, timezone.now())
+        if not ids:
+            return ids
+
+        moved = defaultdict(Decimal)
+        months = {}
+        for row in DueEntry.objects.filter(id__in=ids).order_by().values(
+            'supplier_id', month=TruncMonth('created_at', output_field=DateField())
+        ).annotate(balance=Sum(F('amount') - F('amount_paid')), count=Count('id')):
+            moved[row['supplier_id']] += row['balance']
+            months[(row['supplier_id'], row['month'])] = row['count']
+
+        ledger.apply_due_deltas({
+            supplier_id: (-balance, balance) for supplier_id, balance in moved.items()
+        })
+        rollups.add_status_counts(months, 'overdue')
+    return ids
+
+
+def publish_chunk(ids):
+    fast = values_serializer(DueEntrySerializer)
+    rows = list(fast.rows(DueEntry.objects.filter(id__in=ids)))
+    participants = fast.row_getter('supplier', 'retailer')
+
+    by_profile = defaultdict(list)
+    for row in rows:
+        supplier_id, retailer_id = participants(row)
+        due = fast.to_representation(row)
+        by_profile[supplier_id].append(due)
+        by_profile[retailer_id].append(due)
+
+    profiles = UserProfile.objects.in_bulk(list(by_profile))
+    events.publish_each('dues_updated', (
+        (profiles[profile_id], {'data': dues})
+        for profile_id, dues in by_profile.items()
+    ))
+
+
+def sweep(today=None, chunk_size=DEFAULT_CHUNK_SIZE, limit=None, publish=True, progress=None):
+    """
+    Mark every pending due with a due_date before today as overdue.
+
+    limit caps the number of dues processed in this run; progress, when
+    given, is called with (processed, remaining) after each chunk. Returns
+    the number of dues moved.
+    """
+    today = today or timezone.localdate()
+    processed = 0
+    remaining = overdue_candidates(today).count() if progress else None
+    while limit is None or processed < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - processed)
+        ids = sweep_chunk(today, size)
+        if not ids:
+            break
+        processed += len(ids)
+        if publish:
+            publish_chunk(ids)
+        if progress:
+            remaining = max(remaining - len(ids), 0)
+            progress(processed, remaining)
+        if len(ids) < size:
+            break
+    return processed
+
+
+async def run_periodically(interval, **options):
+    """Run sweep() every interval seconds; for use as a task inside the ASGI process."""
+    while True:
+        try:
+            moved = await sync_to_async(sweep, thread_sensitive=False)(**options)
+            if moved:
+                logger.info('Marked %d dues overdue', moved)
+        except Exception:
+            logger.exception('Overdue sweep failed')
+        await asyncio.sleep(interval)
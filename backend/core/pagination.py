@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+
+Cursors are opaque URL-safe tokens encoding the (created_at, id) of the last
+row on a page. The next page is fetched with a range condition on those
+columns, so its cost does not depend on how deep into the list it is.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise InvalidCursor('Invalid cursor')
+    if created_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return created_at, pk
+
+
+def parse_page_size(value):
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid limit')
+    if size < 1:
+        raise InvalidCursor('Invalid limit')
+    return min(size, MAX_PAGE_SIZE)
+
+
+def instance_key(row):
+    return row.created_at, row.pk
+
+
+def paginate_keyset(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, key=instance_key):
+    """
+    Return (rows, next_cursor) for one page of queryset ordered by
+    (-created_at, -id). next_cursor is None on the last page. key extracts
+    (created_at, id) from a row, for querysets that yield tuples or dicts.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
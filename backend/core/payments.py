@@ -0,0 +1,85 @@
+"""
+Posting retailer payments against a due.
+
+A payment reduces the due's running balance (amount - amount_paid) and the
+due is marked paid once nothing is left. Each post runs in one transaction
+with the due row locked, so concurrent payments on the same due are applied
+one after the other and can never overpay it.
+
+Clients send an idempotency key (the Idempotency-Key header or an
+"idempotency_key" field) and reuse it when retrying. A retry whose payment
+was already recorded is answered from a single lookup on the
+(due, idempotency_key) unique index, without touching the due again; two
+retries racing each other are settled by that same index.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from .models import DueEntry, Payment
+
+
+class PaymentRejected(ValueError):
+    pass
+
+
+def find_existing(due_id, idempotency_key, retailer_id=None):
+    if not idempotency_key:
+        return None
+    payments = Payment.objects.filter(due_id=due_id, idempotency_key=idempotency_key)
+    if retailer_id is not None:
+        payments = payments.filter(due__retailer_id=retailer_id)
+    return payments.first()
+
+
+def post_payment(due_id, amount=None, payment_method='', reference_id='', idempotency_key=None):
+    """
+    Apply a payment of amount (the full balance when None) to a due.
+
+    Returns (payment, due, created). created is False when idempotency_key
+    matches a payment already posted to this due; due is then None.
+    """
+    existing = find_existing(due_id, idempotency_key)
+    if existing is not None:
+        return existing, None, False
+
+    try:
+        with transaction.atomic():
+            # Insert the payment before reading the due. On SQLite this takes
+            # the write lock first, so the balance read below is current; on
+            # databases with row locks a concurrent duplicate key blocks here
+            # until the first request commits, then fails the unique index.
+            payment = Payment.objects.create(
+                due_id=due_id,
+                amount=Decimal(amount or 0),
+                payment_method=payment_method,
+                reference_id=reference_id or '',
+                status='completed',
+                idempotency_key=idempotency_key or None
+            )
+            due = DueEntry.objects.select_for_update().select_related(
+                'supplier', 'retailer'
+            ).get(id=due_id)
+            payment.due = due
+
+            if due.status == 'paid' or due.balance <= 0:
+                raise PaymentRejected('This due is already paid')
+            if amount is None:
+                payment.amount = due.balance
+                payment.save(update_fields=['amount'])
+            elif payment.amount <= 0:
+                raise PaymentRejected('Payment amount must be positive')
+            elif payment.amount > due.balance:
+                raise PaymentRejected(f'Payment exceeds the outstanding balance of {due.balance}')
+
+            due.amount_paid += payment.amount
+            if due.balance == 0:
+                due.status = 'paid'
+            due.save()
+    except IntegrityError:
+        existing = find_existing(due_id, idempotency_key)
+        if existing is None:
+            raise
+        return existing, None, False
+
+    return payment, due, True
@@ -0,0 +1,59 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from .exports import WRITERS
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Output is byte-for-byte the same as JSONRenderer for compact, ASCII-
+    unescaped JSON: datetimes and other non-native types are handed back to
+    DRF's encoder, and U+2028/U+2029 are escaped the same way. Falls back to
+    the stock renderer for indented output or non-default JSON settings.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = encoders.JSONEncoder()
+        ret = orjson.dumps(
+            data,
+            default=encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ExportRenderer(renderers.BaseRenderer):
+    """
+    Renders a list of serialized rows as a file. Export views stream their
+    body through core.exports; these renderers exist so ?format= and Accept
+    negotiation select the export format.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return ''.join(WRITERS[self.format](rows, fields)).encode()
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
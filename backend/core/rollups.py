@@ -0,0 +1,220 @@
+"""
+Pre-aggregated analytics rollups per supplier.
+
+SupplierMonthlyRollup is keyed by (supplier, first day of the month) and
+SupplierDailyRollup by (supplier, day), both bucketed on created_at in the
+current time zone. core.signals keeps them up to date on model writes;
+rebuild_rollups() recomputes them from raw rows for backfills and for
+writes that bypass signals.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import DueEntry, SupplierDailyRollup, SupplierMonthlyRollup, Transaction
+
+STATUS_COUNTERS = {
+    'paid': 'paid_count',
+    'overdue': 'overdue_count',
+}
+
+
+def month_of(created_at):
+    return timezone.localdate(created_at).replace(day=1)
+
+
+def day_of(created_at):
+    return timezone.localdate(created_at)
+
+
+def _increment(model, lookup, create=True, **deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    with transaction.atomic():
+        updated = model.objects.filter(**lookup).update(
+            **{field: F(field) + value for field, value in deltas.items()}
+        )
+        if not updated and create:
+            model.objects.create(**lookup, **deltas)
+
+
+def _month_dues(supplier_id, month):
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return DueEntry.objects.filter(
+        supplier_id=supplier_id,
+        created_at__gte=timezone.make_aware(datetime.combine(month, time.min)),
+        created_at__lt=timezone.make_aware(datetime.combine(next_month, time.min))
+    )
+
+
+def _month_has_other_dues(supplier_id, retailer_id, month, exclude_pk):
+    return _month_dues(supplier_id, month).filter(retailer_id=retailer_id).exclude(pk=exclude_pk).exists()
+
+
+def due_counters(status, amount):
+    counters = {'due_amount': Decimal(amount or 0), 'due_count': 1}
+    if status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[status]] = 1
+    return counters
+
+
+def add_due(supplier_id, retailer_id, created_at, status, amount, pk):
+    month = month_of(created_at)
+    counters = due_counters(status, amount)
+    if not _month_has_other_dues(supplier_id, retailer_id, month, pk):
+        counters['retailer_count'] = 1
+    _increment(SupplierMonthlyRollup, {'supplier_id': supplier_id, 'month': month}, **counters)
+
+
+def add_dues(supplier_id, dues):
+    """
+    add_due() for a supplier's dues written with bulk_create, one UPDATE per
+    month they were created in.
+    """
+    by_month = defaultdict(list)
+    for due in dues:
+        by_month[month_of(due.created_at)].append(due)
+    for month, month_dues in by_month.items():
+        counters = defaultdict(int)
+        for due in month_dues:
+            for field, value in due_counters(due.status, due.amount).items():
+                counters[field] += value
+        retailer_ids = {due.retailer_id for due in month_dues}
+        earlier = set(_month_dues(supplier_id, month).filter(
+            retailer_id__in=retailer_ids
+        ).exclude(pk__in=[due.pk for due in month_dues]).values_list('retailer_id', flat=True).distinct())
+        counters['retailer_count'] = len(retailer_ids - earlier)
+        _increment(SupplierMonthlyRollup, {'supplier_id': supplier_id, 'month': month}, **counters)
+
+
+def remove_due(supplier_id, retailer_id, created_at, status, amount, pk):
+    month = month_of(created_at)
+    counters = {field: -value for field, value in due_counters(status, amount).items()}
+    if not _month_has_other_dues(supplier_id, retailer_id, month, pk):
+        counters['retailer_count'] = -1
+    _increment(SupplierMonthlyRollup, {'supplier_id': supplier_id, 'month': month}, create=False, **counters)
+
+
+def change_due(supplier_id, created_at, old_status, old_amount, status, amount):
+    old = due_counters(old_status, old_amount)
+    new = due_counters(status, amount)
+    deltas = {field: new.get(field, 0) - old.get(field, 0) for field in set(old) | set(new)}
+    _increment(SupplierMonthlyRollup, {'supplier_id': supplier_id, 'month': month_of(created_at)}, **deltas)
+
+
+def add_status_counts(counts, status):
+    """
+    Count dues that moved from pending to status, in one UPDATE; counts maps
+    (supplier_id, month) to the number of dues moved.
+    """
+    counts = {key: count for key, count in counts.items() if count}
+    if not counts:
+        return
+    field = STATUS_COUNTERS[status]
+    suppliers = {supplier_id for supplier_id, _ in counts}
+    months = {month for _, month in counts}
+    with transaction.atomic():
+        # The supplier x month filter can match a few rows outside counts;
+        # those get + 0.
+        rollups = SupplierMonthlyRollup.objects.filter(supplier_id__in=suppliers, month__in=months)
+        existing = set(rollups.values_list('supplier_id', 'month'))
+        rollups.update(**{field: F(field) + Case(
+            *(When(supplier_id=supplier_id, month=month, then=Value(count))
+              for (supplier_id, month), count in counts.items() if (supplier_id, month) in existing),
+            default=Value(0)
+        )})
+        SupplierMonthlyRollup.objects.bulk_create([
+            SupplierMonthlyRollup(supplier_id=supplier_id, month=month, **{field: count})
+            for (supplier_id, month), count in counts.items() if (supplier_id, month) not in existing
+        ])
+
+
+def add_transaction(supplier_id, created_at, amount, sign=1):
+    amount = Decimal(amount or 0) * sign
+    create = sign > 0
+    _increment(
+        SupplierMonthlyRollup,
+        {'supplier_id': supplier_id, 'month': month_of(created_at)},
+        create=create, transaction_amount=amount, transaction_count=sign
+    )
+    _increment(
+        SupplierDailyRollup,
+        {'supplier_id': supplier_id, 'day': day_of(created_at)},
+        create=create, transaction_amount=amount, transaction_count=sign
+    )
+
+
+def remove_transaction(supplier_id, created_at, amount):
+    add_transaction(supplier_id, created_at, amount, sign=-1)
+
+
+def compute_rollups(supplier_ids=None):
+    """Aggregate monthly and daily rollup values from raw rows."""
+    tzinfo = timezone.get_current_timezone()
+    dues = DueEntry.objects.order_by()
+    transactions = Transaction.objects.order_by()
+    if supplier_ids is not None:
+        dues = dues.filter(supplier_id__in=supplier_ids)
+        transactions = transactions.filter(supplier_id__in=supplier_ids)
+
+    month = TruncMonth('created_at', output_field=DateField(), tzinfo=tzinfo)
+    day = TruncDate('created_at', tzinfo=tzinfo)
+
+    monthly = defaultdict(dict)
+    due_rows = dues.annotate(month=month).values(
+        'supplier_id', 'month'
+    ).annotate(
+        due_amount=Sum('amount'),
+        due_count=Count('id'),
+        paid_count=Count('id', filter=Q(status='paid')),
+        overdue_count=Count('id', filter=Q(status='overdue')),
+        retailer_count=Count('retailer', distinct=True)
+    )
+    for row in due_rows:
+        monthly[(row.pop('supplier_id'), row.pop('month'))].update(row)
+
+    transaction_rows = transactions.annotate(month=month).values(
+        'supplier_id', 'month'
+    ).annotate(transaction_amount=Sum('amount'), transaction_count=Count('id'))
+    for row in transaction_rows:
+        monthly[(row.pop('supplier_id'), row.pop('month'))].update(row)
+
+    daily = {}
+    daily_rows = transactions.annotate(day=day).values(
+        'supplier_id', 'day'
+    ).annotate(transaction_amount=Sum('amount'), transaction_count=Count('id'))
+    for row in daily_rows:
+        daily[(row.pop('supplier_id'), row.pop('day'))] = row
+
+    return monthly, daily
+
+
+def rebuild_rollups(supplier_ids=None, batch_size=1000):
+    monthly, daily = compute_rollups(supplier_ids)
+    with transaction.atomic():
+        for model in (SupplierMonthlyRollup, SupplierDailyRollup):
+            existing = model.objects.all()
+            if supplier_ids is not None:
+                existing = existing.filter(supplier_id__in=supplier_ids)
+            existing.delete()
+        SupplierMonthlyRollup.objects.bulk_create(
+            [
+                SupplierMonthlyRollup(supplier_id=supplier_id, month=month, **values)
+                for (supplier_id, month), values in monthly.items()
+            ],
+            batch_size=batch_size
+        )
+        SupplierDailyRollup.objects.bulk_create(
+            [
+                SupplierDailyRollup(supplier_id=supplier_id, day=day, **values)
+                for (supplier_id, day), values in daily.items()
+            ],
+            batch_size=batch_size
+        )
+    return monthly, daily
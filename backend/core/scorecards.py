@@ -0,0 +1,71 @@
+"""
+Supplier-side scorecard for one retailer, as shown in the retailer modal.
+
+The due counts and outstanding amount come from a single conditional
+aggregation. The finished scorecard is cached per (supplier, retailer) and
+dropped by core.signals when that pair's dues or transactions change. The
+cache is per process unless CACHES points at a shared backend, so entries
+also expire after RETAILER_SCORECARD_TTL seconds.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import DueEntry, Transaction
+from .serializers import TransactionSerializer
+
+DEFAULT_TTL = 60
+
+
+def cache_key(supplier_id, retailer_id):
+    return f'retailer-scorecard:{supplier_id}:{retailer_id}'
+
+
+def payment_history_bucket(total_dues, paid_on_time):
+    if not total_dues:
+        return 'new'
+    payment_ratio = paid_on_time / total_dues
+    return 'excellent' if payment_ratio > 0.9 else \
+           'good' if payment_ratio > 0.7 else \
+           'fair'
+
+
+def compute_scorecard(supplier_id, retailer_id):
+    totals = DueEntry.objects.filter(
+        supplier_id=supplier_id,
+        retailer_id=retailer_id
+    ).aggregate(
+        total_dues=Count('id'),
+        paid_on_time=Count('id', filter=Q(status='paid')),
+        outstanding_amount=Sum(F('amount') - F('amount_paid'), filter=Q(status__in=['pending', 'overdue']))
+    )
+
+    recent_transactions = Transaction.objects.filter(
+        supplier_id=supplier_id,
+        retailer_id=retailer_id
+    ).order_by('-created_at')[:5]
+
+    return {
+        'payment_history': payment_history_bucket(totals['total_dues'], totals['paid_on_time']),
+        'outstanding_amount': totals['outstanding_amount'] or 0,
+        'total_dues': totals['total_dues'],
+        'paid_on_time': totals['paid_on_time'],
+        'recent_transactions': TransactionSerializer(recent_transactions, many=True).data
+    }
+
+
+def get_scorecard(supplier_id, retailer_id):
+    key = cache_key(supplier_id, retailer_id)
+    scorecard = cache.get(key)
+    if scorecard is None:
+        scorecard = compute_scorecard(supplier_id, retailer_id)
+        cache.set(key, scorecard, getattr(settings, 'RETAILER_SCORECARD_TTL', DEFAULT_TTL))
+    return scorecard
+
+
+def invalidate_scorecard(supplier_id, retailer_id):
+    # Drop the entry once the write is visible, so a concurrent read can't
+    # re-cache the pre-commit state.
+    key = cache_key(supplier_id, retailer_id)
+    transaction.on_commit(lambda: cache.delete(key))
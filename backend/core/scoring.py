@@ -0,0 +1,206 @@
+"""
+Batch credit scoring of retailers.
+
+Retailers are scored a chunk at a time, walking RetailerProfile by id. For
+each chunk the profile features (turnover, years in business, shop
+ownership, rent, employees, bank statement score), the sum of existing loan
+EMIs and the retailer's repayment record (counts of paid and overdue dues)
+are loaded with three queries into NumPy arrays and scored in one
+vectorized pass.
+credit_score, credit_limit and available_credit are written back with
+bulk_update and, unless disabled, one CreditAssessment is recorded per
+retailer for the run. available_credit moves by the change in limit, as an
+expression on the row, so dues posted while a run is in progress (see
+core.credit) are not lost.
+
+The score is a weighted sum of features normalised to 0..1, mapped onto
+300-900. The limit is a share of monthly turnover that grows with the score,
+less existing EMIs, rounded down to LIMIT_STEP.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.utils import timezone
+
+from .models import CreditAssessment, DueEntry, ExistingLoan, RetailerProfile
+
+DEFAULT_CHUNK_SIZE = 20000
+
+MIN_SCORE = 300
+MAX_SCORE = 900
+APPROVAL_SCORE = 550
+
+WEIGHTS = {
+    'repayment': 0.30,
+    'bank_statement': 0.15,
+    'debt_service': 0.15,
+    'turnover': 0.15,
+    'vintage': 0.10,
+    'rent_burden': 0.05,
+    'ownership': 0.05,
+    'employees': 0.05,
+}
+
+# Monthly turnover share granted at MAX_SCORE; nothing at or below APPROVAL_SCORE
+MAX_TURNOVER_SHARE = 0.5
+LIMIT_STEP = 1000
+LIMIT_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+PROFILE_FIELDS = (
+    'id', 'user_profile_id', 'annual_turnover', 'years_in_business', 'shop_ownership',
+    'monthly_rent', 'employee_count', 'bank_statement_score'
+)
+
+
+def _floats(values):
+    return np.array(values, dtype=np.float64)
+
+
+def load_features(profiles):
+    """Feature arrays for a list of RetailerProfile value rows (PROFILE_FIELDS)."""
+    ids = [row[0] for row in profiles]
+    position = {profile_id: index for index, profile_id in enumerate(ids)}
+    by_user_profile = {row[1]: index for index, row in enumerate(profiles)}
+    count = len(profiles)
+
+    columns = list(zip(*profiles))
+    features = {
+        'annual_turnover': _floats(columns[2]),
+        'years_in_business': _floats(columns[3]),
+        'owned': np.array([value == 'owned' for value in columns[4]]),
+        'monthly_rent': np.nan_to_num(_floats(columns[5])),
+        'employee_count': _floats(columns[6]),
+        'bank_statement_score': _floats(columns[7]),
+        'monthly_emi': np.zeros(count),
+        'paid_dues': np.zeros(count),
+        'overdue_dues': np.zeros(count),
+    }
+
+    for retailer_id, emi in ExistingLoan.objects.filter(
+        retailer_id__in=ids
+    ).order_by().values('retailer_id').annotate(emi=Sum('monthly_emi')).values_list('retailer_id', 'emi'):
+        features['monthly_emi'][position[retailer_id]] = float(emi)
+
+    for retailer_id, paid, overdue in DueEntry.objects.filter(
+        retailer_id__in=[row[1] for row in profiles]
+    ).order_by().values('retailer_id').annotate(
+        paid=Count('id', filter=Q(status='paid')),
+        overdue=Count('id', filter=Q(status='overdue'))
+    ).values_list('retailer_id', 'paid', 'overdue'):
+        index = by_user_profile[retailer_id]
+        features['paid_dues'][index] = paid
+        features['overdue_dues'][index] = overdue
+
+    return ids, features
+
+
+def score(features):
+    """Vectorized scores and limits; returns (credit_score, credit_limit) integer arrays."""
+    turnover = np.maximum(features['annual_turnover'], 0)
+    monthly_turnover = turnover / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rent_share = np.where(turnover > 0, features['monthly_rent'] * 12 / turnover, 1.0)
+        debt_share = np.where(turnover > 0, features['monthly_emi'] * 12 / turnover, 1.0)
+
+    paid = features['paid_dues']
+    overdue = features['overdue_dues']
+    components = {
+        # Smoothed on-time share, so a thin history sits near the middle
+        'repayment': (paid + 1) / (paid + overdue + 2),
+        'bank_statement': np.nan_to_num(features['bank_statement_score'] / 100, nan=0.5),
+        'debt_service': 1 - debt_share * 2,
+        # Rs 1 lakh scores 0, Rs 10 crore scores 1
+        'turnover': (np.log10(turnover + 1) - 5) / 3,
+        'vintage': features['years_in_business'] / 10,
+        'rent_burden': 1 - rent_share * 4,
+        'ownership': np.where(features['owned'], 1.0, 0.5),
+        'employees': np.log2(np.maximum(features['employee_count'], 0) + 1) / 5,
+    }
+    weighted = sum(WEIGHTS[name] * np.clip(value, 0, 1) for name, value in components.items())
+    credit_score = np.rint(MIN_SCORE + (MAX_SCORE - MIN_SCORE) * weighted).astype(np.int64)
+
+    share = MAX_TURNOVER_SHARE * np.clip(
+        (credit_score - APPROVAL_SCORE) / (MAX_SCORE - APPROVAL_SCORE), 0, 1
+    )
+    limit = np.maximum(monthly_turnover * share - features['monthly_emi'], 0)
+    credit_limit = (np.floor(limit / LIMIT_STEP) * LIMIT_STEP).astype(np.int64)
+    return credit_score, credit_limit
+
+
+def assessment_status(credit_limit):
+    return 'approved' if credit_limit > 0 else 'rejected'
+
+
+def build_updates(profiles, record=True, notes=''):
+    """
+    Score a list of PROFILE_FIELDS rows without writing anything; returns
+    the RetailerProfiles to bulk_update and the CreditAssessments to create.
+    """
+    ids, features = load_features(profiles)
+    credit_scores, credit_limits = score(features)
+
+    updated = []
+    assessments = []
+    for index, profile_id in enumerate(ids):
+        credit_score = int(credit_scores[index])
+        credit_limit = Decimal(int(credit_limits[index]))
+        updated.append(RetailerProfile(
+            id=profile_id,
+            credit_score=credit_score,
+            credit_limit=credit_limit,
+            available_credit=F('available_credit') + Value(credit_limit, output_field=LIMIT_FIELD) - F('credit_limit')
+        ))
+        if record:
+            assessments.append(CreditAssessment(
+                retailer_id=profile_id,
+                credit_score=credit_score,
+                status=assessment_status(credit_limit),
+                approved_limit=credit_limit,
+                notes=notes
+            ))
+    return updated, assessments
+
+
+def write_updates(updated, assessments=()):
+    RetailerProfile.objects.bulk_update(
+        updated, ['credit_score', 'credit_limit', 'available_credit'], batch_size=1000
+    )
+    CreditAssessment.objects.bulk_create(assessments, batch_size=1000)
+
+
+def score_chunk(profiles, record=True, notes=''):
+    """Score and write back a list of PROFILE_FIELDS rows; returns how many were scored."""
+    updated, assessments = build_updates(profiles, record=record, notes=notes)
+    # Everything is read before the transaction starts, so on SQLite it
+    # opens with a write and waits for the lock instead of failing
+    with transaction.atomic():
+        write_updates(updated, assessments)
+    return len(updated)
+
+
+def score_retailers(retailer_ids=None, chunk_size=DEFAULT_CHUNK_SIZE, record=True, progress=None):
+    """
+    Rescore every RetailerProfile (or those in retailer_ids). progress, when
+    given, is called with the number scored so far after each chunk.
+    Returns the number of retailers scored.
+    """
+    profiles = RetailerProfile.objects.order_by('id')
+    if retailer_ids is not None:
+        profiles = profiles.filter(id__in=retailer_ids)
+    notes = f'Batch scoring run {timezone.now():%Y-%m-%d %H:%M %Z}'
+
+    scored = 0
+    last_id = 0
+    while True:
+        chunk = list(profiles.filter(id__gt=last_id).values_list(*PROFILE_FIELDS)[:chunk_size])
+        if not chunk:
+            break
+        scored += score_chunk(chunk, record=record, notes=notes)
+        last_id = chunk[-1][0]
+        if progress:
+            progress(scored)
+        if len(chunk) < chunk_size:
+            break
+    return scored
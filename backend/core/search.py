@@ -0,0 +1,194 @@
+"""
+Indexed retailer search.
+
+Each retailer profile is broken into tokens stored in RetailerSearchToken:
+
+    w:<word>     every word of the normalized business name (prefix lookups)
+    p:<digits>   the normalized phone number (prefix lookups)
+    t:<trigram>  trigrams of the normalized name and of the phone digits
+                 (substring lookups)
+
+Short queries do a range scan over word/phone prefixes; longer queries
+intersect trigram posting lists. Both hit the (token, retailer) index and
+never scan UserProfile. Candidates are then ranked: exact match, prefix
+match, word-prefix match, substring match and trigram-only match.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import RetailerSearchToken, UserProfile
+
+MIN_TRIGRAM_QUERY = 3
+MAX_TOKEN_LENGTH = 40
+MAX_CANDIDATES = 200
+MAX_QUERY_TRIGRAMS = 4
+PREFIX_END = '\uffff'
+
+_non_alnum = re.compile(r'[^0-9a-z]+')
+_non_digit = re.compile(r'\D+')
+
+
+def normalize_text(value):
+    return _non_alnum.sub(' ', (value or '').lower()).strip()
+
+
+def normalize_phone(value):
+    """Digits only, with a leading +91 / 91 / 0 trunk prefix dropped from full numbers."""
+    digits = _non_digit.sub('', value or '')
+    if len(digits) > 10 and (digits.startswith('91') or digits.startswith('0')):
+        digits = digits[-10:]
+    return digits
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def query_trigrams(value):
+    """
+    Up to MAX_QUERY_TRIGRAMS trigrams spread across the query. Matching a
+    few of them already narrows the candidates sharply, and each extra
+    trigram adds a full posting-list scan; ranking checks the whole query.
+    """
+    ordered = list(dict.fromkeys(value[i:i + 3] for i in range(len(value) - 2)))
+    if len(ordered) <= MAX_QUERY_TRIGRAMS:
+        return set(ordered)
+    step = (len(ordered) - 1) / (MAX_QUERY_TRIGRAMS - 1)
+    return {ordered[round(i * step)] for i in range(MAX_QUERY_TRIGRAMS)}
+
+
+def tokens_for(business_name, phone):
+    name = normalize_text(business_name)
+    digits = normalize_phone(phone)
+    tokens = {f'w:{word}' for word in name.split()}
+    tokens.update(f't:{gram}' for gram in trigrams(name))
+    if digits:
+        tokens.add(f'p:{digits}')
+        tokens.update(f't:{gram}' for gram in trigrams(digits))
+    return {token[:MAX_TOKEN_LENGTH] for token in tokens}
+
+
+def retailers_by_phone(phones):
+    """Map normalized phone numbers to the ids of the retailers that have them, in one lookup."""
+    matches = {}
+    tokens = {f'p:{digits}'[:MAX_TOKEN_LENGTH] for digits in map(normalize_phone, phones) if digits}
+    for token, retailer_id in RetailerSearchToken.objects.filter(
+        token__in=tokens
+    ).values_list('token', 'retailer_id'):
+        matches.setdefault(token[2:], []).append(retailer_id)
+    return matches
+
+
+def index_retailer(profile):
+    with transaction.atomic():
+        RetailerSearchToken.objects.filter(retailer=profile).delete()
+        if profile.user_type != 'retailer':
+            return
+        RetailerSearchToken.objects.bulk_create([
+            RetailerSearchToken(retailer=profile, token=token)
+            for token in tokens_for(profile.business_name, profile.phone)
+        ])
+
+
+def _insert_tokens(rows):
+    # Plain executemany: for millions of two-column rows the per-object
+    # work in bulk_create costs more than the inserts themselves.
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {qn(RetailerSearchToken._meta.db_table)} '
+            f'({qn("retailer_id")}, {qn("token")}) VALUES (%s, %s)',
+            rows
+        )
+
+
+def reindex_retailers(queryset=None, batch_size=10000):
+    """Rebuild tokens for the given retailers (default: all). Returns the profile count."""
+    if queryset is None:
+        queryset = UserProfile.objects.all()
+    queryset = queryset.filter(user_type='retailer').order_by('id')
+    count = 0
+    batch = []
+    with transaction.atomic():
+        RetailerSearchToken.objects.filter(retailer__in=queryset.values('id')).delete()
+        for profile_id, business_name, phone in queryset.values_list('id', 'business_name', 'phone').iterator():
+            count += 1
+            batch.extend((profile_id, token) for token in tokens_for(business_name, phone))
+            if len(batch) >= batch_size:
+                _insert_tokens(batch)
+                batch = []
+        _insert_tokens(batch)
+    return count
+
+
+def _prefix_candidates(tokens, prefix):
+    return tokens.filter(
+        token__gte=prefix, token__lt=prefix + PREFIX_END
+    ).values_list('retailer_id', flat=True).distinct()[:MAX_CANDIDATES]
+
+
+def _candidates(name_query, phone_query, limit):
+    tokens = RetailerSearchToken.objects.order_by()
+    # Prefix hits rank highest, so always collect them first; trigram
+    # intersections then add substring matches for longer queries.
+    ids = []
+    if name_query:
+        ids.extend(_prefix_candidates(tokens, f'w:{name_query.split()[0]}'))
+    if phone_query:
+        ids.extend(_prefix_candidates(tokens, f'p:{phone_query}'))
+    if len(name_query) < MIN_TRIGRAM_QUERY and len(phone_query) < MIN_TRIGRAM_QUERY:
+        return ids
+    if ' ' not in name_query and len(ids) >= limit:
+        # A single-word prefix hit always outranks a substring hit.
+        return ids
+
+    for value in (name_query, phone_query):
+        grams = query_trigrams(value)
+        if not grams:
+            continue
+        ids.extend(
+            tokens.filter(token__in=[f't:{gram}' for gram in grams])
+            .values('retailer_id')
+            .annotate(hits=Count('retailer_id'))
+            .filter(hits=len(grams))
+            .values_list('retailer_id', flat=True)[:MAX_CANDIDATES]
+        )
+    return ids
+
+
+def _rank(name_query, phone_query, business_name, phone):
+    name = normalize_text(business_name)
+    digits = normalize_phone(phone)
+    if name_query and name == name_query or phone_query and digits == phone_query:
+        return 0
+    if name_query and name.startswith(name_query) or phone_query and digits.startswith(phone_query):
+        return 1
+    if name_query and any(word.startswith(name_query) for word in name.split()):
+        return 2
+    if name_query and name_query in name or phone_query and phone_query in digits:
+        return 3
+    return 4
+
+
+def search_retailer_ids(query, limit=10):
+    """Return up to limit retailer profile ids matching query, best match first."""
+    name_query = normalize_text(query)
+    phone_query = normalize_phone(query) if any(ch.isdigit() for ch in query or '') else ''
+    if not name_query and not phone_query:
+        return list(UserProfile.objects.filter(user_type='retailer').order_by('id').values_list('id', flat=True)[:limit])
+
+    candidate_ids = set(_candidates(name_query, phone_query, limit))
+    if not candidate_ids:
+        return []
+    rows = UserProfile.objects.filter(
+        id__in=candidate_ids, user_type='retailer'
+    ).values_list('id', 'business_name', 'phone')
+    ranked = sorted(
+        rows,
+        key=lambda row: (_rank(name_query, phone_query, row[1], row[2]), len(row[1]), row[1].lower(), row[0])
+    )
+    return [row[0] for row in ranked[:limit]]
@@ -1,25 +1,59 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import QuerySet
 from .models import (
     UserProfile, RetailerProfile, BankDetails, Document, CreditAssessment,
-    Transaction, Payment, DueEntry, ExistingLoan
+    AssessmentJob, Transaction, Payment, DueEntry, ExistingLoan, EMIPlan, EMIInstallment
 )
 
+class EagerLoadingMixin:
+    """
+    Declares the relations a serializer reads so querysets can load them up
+    front instead of issuing one query per row. Querysets passed to a
+    many=True serializer get the plan applied automatically; views that
+    evaluate the queryset themselves (e.g. for pagination) should call
+    setup_eager_loading() first.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if args and isinstance(args[0], QuerySet):
+            args = (cls.setup_eager_loading(args[0]),) + args[1:]
+        elif isinstance(kwargs.get('instance'), QuerySet):
+            kwargs['instance'] = cls.setup_eager_loading(kwargs['instance'])
+        return super().many_init(*args, **kwargs)
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name')
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
+    select_related_fields = ('user',)
+    
     class Meta:
         model = UserProfile
         fields = '__all__'
 
-class RetailerProfileSerializer(serializers.ModelSerializer):
+class RetailerProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user_profile = UserProfileSerializer(read_only=True)
     
+    select_related_fields = ('user_profile__user',)
+    
     class Meta:
         model = RetailerProfile
         fields = '__all__'
@@ -34,17 +68,45 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = '__all__'
 
-class CreditAssessmentSerializer(serializers.ModelSerializer):
+class CreditAssessmentSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     retailer_name = serializers.CharField(source='retailer.user_profile.business_name', read_only=True)
     
+    select_related_fields = ('retailer__user_profile',)
+    
     class Meta:
         model = CreditAssessment
         fields = '__all__'
 
-class TransactionSerializer(serializers.ModelSerializer):
+class AssessmentJobSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    assessment = CreditAssessmentSerializer(read_only=True)
+    
+    select_related_fields = ('assessment__retailer__user_profile',)
+    
+    class Meta:
+        model = AssessmentJob
+        fields = ('id', 'retailer', 'assessment', 'status', 'attempts', 'error', 'created_at', 'finished_at')
+
+class EMIInstallmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EMIInstallment
+        fields = ('id', 'number', 'due_date', 'amount', 'principal', 'interest', 'status', 'paid_at')
+
+class EMIPlanSerializer(serializers.ModelSerializer):
+    installments = EMIInstallmentSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = EMIPlan
+        fields = (
+            'id', 'due', 'tenure_months', 'interest_rate', 'principal', 'monthly_amount',
+            'total_amount', 'status', 'created_at', 'installments'
+        )
+
+class TransactionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     supplier_name = serializers.CharField(source='supplier.business_name', read_only=True)
     retailer_name = serializers.CharField(source='retailer.business_name', read_only=True)
     
+    select_related_fields = ('supplier', 'retailer')
+    
     class Meta:
         model = Transaction
         fields = '__all__'
@@ -54,14 +116,38 @@ class PaymentSerializer(serializers.ModelSerializer):
         model = Payment
         fields = '__all__'
 
-class DueEntrySerializer(serializers.ModelSerializer):
+class PaymentRequestSerializer(serializers.Serializer):
+    # amount defaults to the due's outstanding balance
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+    payment_method = serializers.CharField(max_length=50)
+    reference_id = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    idempotency_key = serializers.CharField(max_length=64, required=False, allow_blank=True, default='')
+
+class DueEntrySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     supplier_name = serializers.CharField(source='supplier.business_name', read_only=True)
     retailer_name = serializers.CharField(source='retailer.business_name', read_only=True)
     retailer_phone = serializers.CharField(source='retailer.phone', read_only=True)
     
+    select_related_fields = ('supplier', 'retailer')
+    
     class Meta:
         model = DueEntry
         fields = '__all__'
+        read_only_fields = ('amount_paid',)
+
+class DueImportRowSerializer(serializers.Serializer):
+    """One row of a bulk due import; the retailer is identified by phone or GST number."""
+    retailer_phone = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    retailer_gst = serializers.CharField(max_length=15, required=False, allow_blank=True, default='')
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    purchase_date = serializers.DateField()
+    due_date = serializers.DateField()
+
+    def validate(self, attrs):
+        if not attrs['retailer_phone'] and not attrs['retailer_gst']:
+            raise serializers.ValidationError('Either retailer_phone or retailer_gst is required')
+        return attrs
 
 class ExistingLoanSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,142 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import credit, ledger, rollups, scorecards, search
+from .models import DueEntry, Transaction, UserProfile
+
+
+@receiver(pre_save, sender=DueEntry)
+def remember_due_state(sender, instance, raw=False, **kwargs):
+    instance._ledger_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._ledger_previous = DueEntry.objects.filter(pk=instance.pk).values(
+        'supplier_id', 'retailer_id', 'status', 'amount', 'amount_paid', 'created_at'
+    ).first()
+
+
+def _pair_has_other_dues(supplier_id, retailer_id, exclude_pk):
+    return DueEntry.objects.filter(
+        supplier_id=supplier_id, retailer_id=retailer_id
+    ).exclude(pk=exclude_pk).exists()
+
+
+@receiver(post_save, sender=DueEntry)
+def update_ledger_for_due(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    scorecards.invalidate_scorecard(instance.supplier_id, instance.retailer_id)
+    if previous is not None:
+        scorecards.invalidate_scorecard(previous['supplier_id'], previous['retailer_id'])
+    outstanding, overdue = ledger.due_contribution(instance.status, instance.amount, instance.amount_paid)
+    open_balance = credit.open_balance(instance.status, instance.amount, instance.amount_paid)
+
+    if previous is None:
+        credit.apply_credit_delta(instance.retailer_id, open_balance)
+        new_pair = not _pair_has_other_dues(instance.supplier_id, instance.retailer_id, instance.pk)
+        ledger.apply_due_delta(instance.supplier_id, outstanding, overdue, int(new_pair))
+        rollups.add_due(
+            instance.supplier_id, instance.retailer_id, instance.created_at,
+            instance.status, instance.amount, instance.pk
+        )
+        return
+
+    old_outstanding, old_overdue = ledger.due_contribution(previous['status'], previous['amount'], previous['amount_paid'])
+    old_open_balance = credit.open_balance(previous['status'], previous['amount'], previous['amount_paid'])
+    if previous['retailer_id'] == instance.retailer_id:
+        credit.apply_credit_delta(instance.retailer_id, open_balance - old_open_balance)
+    else:
+        credit.apply_credit_delta(previous['retailer_id'], -old_open_balance)
+        credit.apply_credit_delta(instance.retailer_id, open_balance)
+
+    if previous['supplier_id'] == instance.supplier_id and previous['retailer_id'] == instance.retailer_id:
+        ledger.apply_due_delta(
+            instance.supplier_id,
+            outstanding - old_outstanding,
+            overdue - old_overdue
+        )
+        rollups.change_due(
+            instance.supplier_id, instance.created_at,
+            previous['status'], previous['amount'], instance.status, instance.amount
+        )
+        return
+
+    # The due moved to another supplier/retailer pair: retract it from the
+    # old pair and count it against the new one.
+    pair_gone = not _pair_has_other_dues(previous['supplier_id'], previous['retailer_id'], instance.pk)
+    ledger.apply_due_delta(previous['supplier_id'], -old_outstanding, -old_overdue, -int(pair_gone), create=False)
+    new_pair = not _pair_has_other_dues(instance.supplier_id, instance.retailer_id, instance.pk)
+    ledger.apply_due_delta(instance.supplier_id, outstanding, overdue, int(new_pair))
+    rollups.remove_due(
+        previous['supplier_id'], previous['retailer_id'], previous['created_at'],
+        previous['status'], previous['amount'], instance.pk
+    )
+    rollups.add_due(
+        instance.supplier_id, instance.retailer_id, instance.created_at,
+        instance.status, instance.amount, instance.pk
+    )
+
+
+@receiver(post_delete, sender=DueEntry)
+def retract_due_from_ledger(sender, instance, **kwargs):
+    scorecards.invalidate_scorecard(instance.supplier_id, instance.retailer_id)
+    outstanding, overdue = ledger.due_contribution(instance.status, instance.amount, instance.amount_paid)
+    credit.apply_credit_delta(instance.retailer_id, -credit.open_balance(instance.status, instance.amount, instance.amount_paid))
+    pair_gone = not _pair_has_other_dues(instance.supplier_id, instance.retailer_id, instance.pk)
+    ledger.apply_due_delta(instance.supplier_id, -outstanding, -overdue, -int(pair_gone), create=False)
+    rollups.remove_due(
+        instance.supplier_id, instance.retailer_id, instance.created_at,
+        instance.status, instance.amount, instance.pk
+    )
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction_state(sender, instance, raw=False, **kwargs):
+    instance._ledger_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._ledger_previous = Transaction.objects.filter(pk=instance.pk).values(
+        'supplier_id', 'retailer_id', 'amount', 'created_at'
+    ).first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_ledger_for_transaction(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    scorecards.invalidate_scorecard(instance.supplier_id, instance.retailer_id)
+    if previous is not None:
+        scorecards.invalidate_scorecard(previous['supplier_id'], previous['retailer_id'])
+        if previous['supplier_id'] == instance.supplier_id and previous['amount'] == instance.amount:
+            return
+        ledger.apply_sales_delta(previous['supplier_id'], previous['created_at'], -previous['amount'], create=False)
+        rollups.remove_transaction(previous['supplier_id'], previous['created_at'], previous['amount'])
+    ledger.apply_sales_delta(instance.supplier_id, instance.created_at, instance.amount)
+    rollups.add_transaction(instance.supplier_id, instance.created_at, instance.amount)
+
+
+@receiver(post_delete, sender=Transaction)
+def retract_transaction_from_ledger(sender, instance, **kwargs):
+    scorecards.invalidate_scorecard(instance.supplier_id, instance.retailer_id)
+    ledger.apply_sales_delta(instance.supplier_id, instance.created_at, -instance.amount, create=False)
+    rollups.remove_transaction(instance.supplier_id, instance.created_at, instance.amount)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_retailer_for_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_retailer(instance)
+
+
+@receiver(post_save, sender=User)
+def touch_profile_for_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Profiles are served with their user's name and email, so a change to
+    # those moves the profile's updated_at; logins only touch last_login
+    if raw or update_fields == frozenset({'last_login'}):
+        return
+    UserProfile.objects.filter(user=instance).update(updated_at=timezone.now())
@@ -0,0 +1,492 @@
+import asyncio
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from io import BytesIO, StringIO
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from creditguard.layers import SQLiteChannelLayer
+
+from . import assessments, exports, imports, ledger, overdue, rollups
+from .consumers import UpdatesConsumer
+from .fastpath import values_serializer
+from .models import (
+    DueEntry, RetailerProfile, SupplierLedgerSummary, SupplierMonthlyRollup, Transaction, UserProfile
+)
+from .renderers import FastJSONRenderer
+from .serializers import (
+    DueEntrySerializer, RetailerProfileSerializer, TransactionSerializer, UserProfileSerializer
+)
+
+
+def make_profile(name, user_type):
+    user = User.objects.create_user(username=name, email=f'{name}@example.com', password='password')
+    return UserProfile.objects.create(
+        user=user, user_type=user_type, business_name=name.title(), phone=f'98{user.id:08d}'
+    )
+
+
+def make_dues(supplier, retailers, count):
+    today = timezone.localdate()
+    start = DueEntry.objects.count()
+    for number in range(start, start + count):
+        DueEntry.objects.create(
+            supplier=supplier,
+            retailer=retailers[number % len(retailers)],
+            amount=Decimal('1000.00') + number,
+            description=f'Invoice {number}',
+            purchase_date=today,
+            due_date=today + timedelta(days=30)
+        )
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints run the same number of queries for few rows and many."""
+
+    # Session, user, the ETag's profile and version, the view's profile, the list
+    DUES_QUERIES = 6
+    RETAILERS_QUERIES = 6
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        self.retailers = [make_profile(f'retailer{number}', 'retailer') for number in range(5)]
+
+    def assertQueriesAtSizes(self, user, url, queries, key=None):
+        self.client.force_login(user.user)
+        for size in (3, 30):
+            make_dues(self.supplier, self.retailers, size - DueEntry.objects.count())
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows = response.json()[key] if key else response.json()
+            self.assertTrue(rows)
+
+    def test_supplier_dues(self):
+        self.assertQueriesAtSizes(self.supplier, reverse('dues-list'), self.DUES_QUERIES, key='results')
+
+    def test_retailer_dues(self):
+        self.assertQueriesAtSizes(self.retailers[0], reverse('dues-list'), self.DUES_QUERIES, key='results')
+
+    def test_retailers(self):
+        self.assertQueriesAtSizes(self.supplier, reverse('retailers-list'), self.RETAILERS_QUERIES)
+
+
+class ProfileETagTests(TestCase):
+    """dues/ and retailers/ are revalidated when a profile or user they show changes."""
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        self.retailer = make_profile('retailer', 'retailer')
+        make_dues(self.supplier, [self.retailer], 1)
+
+    def assertModifiedAfter(self, viewer, url, change):
+        self.client.force_login(viewer.user)
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return body['results'][0] if 'results' in body else body[0]
+
+    def rename(self, profile, name):
+        def change():
+            profile.business_name = name
+            profile.save()
+        return change
+
+    def test_retailers_after_profile_edit(self):
+        row = self.assertModifiedAfter(
+            self.supplier, reverse('retailers-list'), self.rename(self.retailer, 'Renamed Kirana')
+        )
+        self.assertEqual(row['business_name'], 'Renamed Kirana')
+
+    def test_retailers_after_user_edit(self):
+        def change_email():
+            self.retailer.user.email = 'renamed@example.com'
+            self.retailer.user.save()
+        row = self.assertModifiedAfter(self.supplier, reverse('retailers-list'), change_email)
+        self.assertEqual(row['user']['email'], 'renamed@example.com')
+
+    def test_supplier_dues_after_retailer_edit(self):
+        row = self.assertModifiedAfter(
+            self.supplier, reverse('dues-list'), self.rename(self.retailer, 'Renamed Kirana')
+        )
+        self.assertEqual(row['retailer_name'], 'Renamed Kirana')
+
+    def test_retailer_dues_after_supplier_edit(self):
+        row = self.assertModifiedAfter(
+            self.retailer, reverse('dues-list'), self.rename(self.supplier, 'Renamed Traders')
+        )
+        self.assertEqual(row['supplier_name'], 'Renamed Traders')
+
+    def test_dues_after_own_edit(self):
+        row = self.assertModifiedAfter(
+            self.retailer, reverse('dues-list'), self.rename(self.retailer, 'Renamed Kirana')
+        )
+        self.assertEqual(row['retailer_name'], 'Renamed Kirana')
+
+
+class PaymentIdempotencyTests(TestCase):
+    """A retried payment is answered with the payment its key already posted."""
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        self.retailer = make_profile('retailer', 'retailer')
+        make_dues(self.supplier, [self.retailer], 2)
+        self.due, self.other_due = DueEntry.objects.order_by('id')
+
+    def pay(self, retailer, due, key=None, **data):
+        self.client.force_login(retailer.user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(
+            reverse('make-payment', args=[due.id]),
+            {'amount': '100.00', 'payment_method': 'upi', **data},
+            content_type='application/json', **headers
+        )
+
+    def test_replay_returns_original_payment(self):
+        first = self.pay(self.retailer, self.due, key='retry-1')
+        self.assertEqual(first.status_code, 201)
+        replay = self.pay(self.retailer, self.due, key='retry-1', amount='250.00')
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay.json(), first.json())
+        self.due.refresh_from_db()
+        self.assertEqual(self.due.amount_paid, Decimal('100.00'))
+        self.assertEqual(self.due.payments.count(), 1)
+
+    def test_key_is_scoped_to_its_due(self):
+        first = self.pay(self.retailer, self.due, key='retry-1')
+        second = self.pay(self.retailer, self.other_due, key='retry-1')
+        self.assertEqual(second.status_code, 201)
+        self.assertNotEqual(second.json()['id'], first.json()['id'])
+        self.other_due.refresh_from_db()
+        self.assertEqual(self.other_due.amount_paid, Decimal('100.00'))
+
+    def test_key_reused_by_another_retailer(self):
+        self.pay(self.retailer, self.due, key='retry-1')
+        intruder = make_profile('intruder', 'retailer')
+        response = self.pay(intruder, self.due, key='retry-1')
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('id', response.json())
+
+    def test_header_takes_precedence_over_body(self):
+        first = self.pay(self.retailer, self.due, key='header-key', idempotency_key='body-key')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(self.due.payments.get().idempotency_key, 'header-key')
+        self.assertEqual(self.pay(self.retailer, self.due, key='header-key').status_code, 200)
+        self.assertEqual(self.pay(self.retailer, self.due, idempotency_key='body-key').status_code, 201)
+
+
+class OverdueSweepTests(TestCase):
+    """The sweep moves past-due pending dues to overdue and keeps the aggregates in step."""
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        self.retailers = [make_profile(f'retailer{number}', 'retailer') for number in range(2)]
+        make_dues(self.supplier, self.retailers, 6)
+        dues = list(DueEntry.objects.order_by('id'))
+        dues[0].amount_paid = Decimal('400.00')
+        dues[0].save()
+        self.past_due = [due.id for due in dues[:3]]
+        DueEntry.objects.filter(id__in=self.past_due).update(
+            due_date=timezone.localdate() - timedelta(days=1)
+        )
+
+    def aggregates(self):
+        return (
+            list(SupplierLedgerSummary.objects.values('supplier_id', 'total_outstanding', 'overdue_amount')),
+            list(SupplierMonthlyRollup.objects.values('supplier_id', 'month', 'due_count', 'overdue_count'))
+        )
+
+    def test_sweep_marks_past_due_overdue(self):
+        with mock.patch.object(overdue.events, 'publish_each') as publish_each:
+            self.assertEqual(overdue.sweep(chunk_size=2), 3)
+
+        self.assertEqual(
+            sorted(DueEntry.objects.filter(status='overdue').values_list('id', flat=True)), self.past_due
+        )
+        self.assertEqual(DueEntry.objects.filter(status='pending').count(), 3)
+        # One dues_updated per chunk, listing each participant's dues
+        self.assertEqual(publish_each.call_count, 2)
+        published = []
+        for (event_type, payloads), _ in publish_each.call_args_list:
+            self.assertEqual(event_type, 'dues_updated')
+            payloads = dict(payloads)
+            published.extend(due['id'] for due in payloads[self.supplier]['data'])
+        self.assertEqual(sorted(published), self.past_due)
+
+        swept = self.aggregates()
+        ledger.rebuild_summaries()
+        rollups.rebuild_rollups()
+        self.assertEqual(swept, self.aggregates())
+
+    def test_sweep_resumes_after_limit(self):
+        self.assertEqual(overdue.sweep(chunk_size=2, limit=2, publish=False), 2)
+        self.assertEqual(overdue.sweep(chunk_size=2, publish=False), 1)
+        self.assertEqual(overdue.sweep(publish=False), 0)
+
+
+class ImportCreditLimitTests(TestCase):
+    """Imported dues are held to the retailer's credit limit, as created ones are."""
+
+    def test_rows_over_the_limit_are_turned_away(self):
+        supplier = make_profile('supplier', 'supplier')
+        retailer = make_profile('retailer', 'retailer')
+        profile = RetailerProfile.objects.create(
+            user_profile=retailer, credit_limit=Decimal('1000.00'), available_credit=Decimal('1000.00')
+        )
+        today = timezone.localdate()
+        rows = '\n'.join(
+            ['retailer_phone,retailer_gst,amount,description,purchase_date,due_date']
+            + [f'{retailer.phone},,{amount},Invoice,{today},{today}' for amount in ('600', '500', '300')]
+        )
+
+        report = imports.import_dues(supplier, BytesIO(rows.encode()), 'csv')
+
+        self.assertEqual((report['created'], report['failed']), (2, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertIn('amount', report['errors'][0]['errors'])
+        profile.refresh_from_db()
+        self.assertEqual(profile.available_credit, Decimal('100.00'))
+
+
+class ExportStreamingTests(TestCase):
+    """Over ASGI an export goes out a block at a time, not read whole before the first byte."""
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        make_dues(self.supplier, [make_profile('retailer', 'retailer')], 50)
+
+    async def test_asgi_export_streams(self):
+        iter_rows = exports.iter_rows
+        read = []
+
+        def counted_rows(*args, **kwargs):
+            for row in iter_rows(*args, **kwargs):
+                read.append(row)
+                yield row
+
+        await self.async_client.aforce_login(self.supplier.user)
+        with mock.patch.object(exports, 'ROWS_PER_BLOCK', 10), mock.patch.object(exports, 'iter_rows', counted_rows):
+            response = await self.async_client.get(reverse('export-dues'), {'format': 'csv'})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            blocks = response.streaming_content.__aiter__()
+            first = await anext(blocks)
+            self.assertEqual(len(read), 10)
+            body = first + b''.join([block async for block in blocks])
+        self.assertEqual(len(read), 50)
+        self.assertEqual(len(body.decode().splitlines()), 51)
+
+
+class FastPathParityTests(TestCase):
+    """values_serializer() and FastJSONRenderer emit exactly what the serializer and JSONRenderer do."""
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        # Nulls, non-ASCII and the separators JSON-in-HTML escapes
+        self.retailer = make_profile('retailer', 'retailer')
+        self.retailer.business_name = 'Sri Lakshmi Kirana \u0c36\u0c4d\u0c30\u0c40 \u2028\u2029'
+        self.retailer.phone = None
+        self.retailer.save()
+        make_profile('other', 'retailer')
+        make_dues(self.supplier, [self.retailer], 3)
+        due = DueEntry.objects.order_by('id').first()
+        due.amount_paid = Decimal('250.55')
+        due.status = 'paid'
+        due.save()
+        Transaction.objects.create(
+            supplier=self.supplier, retailer=self.retailer, amount=Decimal('99.99'),
+            description='Order 1', due_date=timezone.now() + timedelta(days=30)
+        )
+        RetailerProfile.objects.create(user_profile=self.retailer, annual_turnover=Decimal('1200000.50'))
+
+    def assertParity(self, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        fast = values_serializer(serializer_class)
+        rows = fast.serialize(fast.rows(queryset))
+        self.assertEqual(JSONRenderer().render(rows), expected)
+        self.assertEqual(FastJSONRenderer().render(rows), expected)
+
+    def test_due_entry(self):
+        self.assertParity(DueEntrySerializer, DueEntry.objects.order_by('id'))
+
+    def test_user_profile(self):
+        self.assertParity(UserProfileSerializer, UserProfile.objects.order_by('id'))
+
+    def test_transaction(self):
+        self.assertParity(TransactionSerializer, Transaction.objects.order_by('id'))
+
+    def test_retailer_profile(self):
+        self.assertParity(RetailerProfileSerializer, RetailerProfile.objects.order_by('id'))
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class EventFanOutTests(TestCase):
+    """A due event reaches its supplier and retailer, and no other connected user."""
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        self.retailer = make_profile('retailer', 'retailer')
+        self.bystanders = [make_profile(f'bystander{number}', 'retailer') for number in range(5)]
+
+    async def connect(self, profile):
+        communicator = WebsocketCommunicator(UpdatesConsumer.as_asgi(), '/ws/updates/')
+        communicator.scope['user'] = profile.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def create_due(self):
+        self.client.force_login(self.supplier.user)
+        today = timezone.localdate()
+        # Events are published once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create-due'), {
+                'retailer': self.retailer.id,
+                'amount': '1500.00',
+                'description': 'Invoice 1',
+                'purchase_date': today.isoformat(),
+                'due_date': (today + timedelta(days=30)).isoformat(),
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    async def test_due_created_reaches_only_participants(self):
+        participants = [await self.connect(self.supplier), await self.connect(self.retailer)]
+        bystanders = [await self.connect(profile) for profile in self.bystanders]
+
+        due = await sync_to_async(self.create_due)()
+
+        for communicator in participants:
+            message = await communicator.receive_json_from()
+            self.assertEqual(message['type'], 'due_created')
+            self.assertEqual(message['data']['id'], due['id'])
+            self.assertTrue(await communicator.receive_nothing())
+        for communicator in bystanders:
+            self.assertTrue(await communicator.receive_nothing())
+
+        for communicator in participants + bystanders:
+            await communicator.disconnect()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """dues/ reads from a replica until the client writes."""
+
+    # A TEST MIRROR of the primary, like a DB_REPLICAS alias under test. It
+    # is added after the runner's database checks, and reads through a
+    # connection of its own, so the data has to be committed.
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        primary = connections['default'].settings_dict
+        connections.settings['replica'] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': 'default'}}
+        connections['replica'].creation.set_as_test_mirror(primary)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        self.supplier = make_profile('supplier', 'supplier')
+        self.retailer = make_profile('retailer', 'retailer')
+        make_dues(self.supplier, [self.retailer], 3)
+        self.client.force_login(self.supplier.user)
+
+    def test_list_reads_from_replica(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('dues-list'))
+        self.assertEqual(len(response.json()['results']), 3)
+        table = DueEntry._meta.db_table
+        self.assertFalse([query for query in primary if table in query['sql']])
+        self.assertTrue([query for query in replica if table in query['sql']])
+
+    def test_write_pins_client_to_primary(self):
+        today = timezone.localdate()
+        response = self.client.post(reverse('create-due'), {
+            'retailer': self.retailer.id,
+            'amount': '1500.00',
+            'description': 'Invoice 4',
+            'purchase_date': today.isoformat(),
+            'due_date': (today + timedelta(days=30)).isoformat(),
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('dues-list'))
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(len(replica), 0)
+
+
+class QueryPlanTests(TestCase):
+    """check_query_plans passes against generated data."""
+
+    def setUp(self):
+        call_command('generate_data', suppliers=2, retailers=20, dues=200, transactions=50, stdout=StringIO())
+
+    def check_query_plans(self):
+        stdout = StringIO()
+        try:
+            call_command('check_query_plans', stdout=stdout, stderr=stdout)
+        except SystemExit:
+            self.fail(stdout.getvalue())
+
+    def test_generated_data(self):
+        self.check_query_plans()
+
+    def test_analyzed_while_small(self):
+        # Statistics recorded while the assessment tables held a single job
+        assessments.request_assessment(RetailerProfile.objects.first())
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.check_query_plans()
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    """Messages claimed for a consumer that has gone away do not keep the poller alive."""
+
+    async def test_buffers_for_departed_consumers_expire(self):
+        with tempfile.TemporaryDirectory() as directory:
+            layer = SQLiteChannelLayer(
+                path=os.path.join(directory, 'channels.sqlite3'), expiry=0.5, cleanup_interval=0.1
+            )
+            live, departed = await layer.new_channel(), await layer.new_channel()
+            for channel in (live, departed):
+                await layer.group_add('dues', channel)
+
+            # The departed consumer received once, then disconnected
+            receiving = asyncio.create_task(layer.receive(departed))
+            await layer.send(departed, {'type': 'due.created', 'number': 0})
+            self.assertEqual((await receiving)['number'], 0)
+
+            receiving = asyncio.create_task(layer.receive(live))
+            for number in range(3):
+                await layer.group_send('dues', {'type': 'due.created', 'number': number})
+            self.assertEqual((await receiving)['number'], 0)
+            # Held for the live consumer between its receives
+            self.assertEqual((await layer.receive(live))['number'], 1)
+
+            await asyncio.sleep(1.5)
+            self.assertEqual(layer._buffers, {})
+            self.assertTrue(layer._poller.done())
+            await layer.close()
@@ -20,6 +20,14 @@ urlpatterns = [
     # Dues endpoints
     path('dues/', views.get_dues, name='dues-list'),
     path('dues/create/', views.create_due, name='create-due'),
+    path('dues/bulk/', views.bulk_create_dues, name='bulk-create-dues'),
+    path('dues/export/', views.export_dues, name='export-dues'),
+    path('transactions/export/', views.export_transactions, name='export-transactions'),
     path('dues/<str:due_id>/', views.get_due_details, name='due-details'),
     path('dues/<str:due_id>/pay/', views.make_payment, name='make-payment'),
+    
+    # Fintech endpoints
+    path('fintech/retailers/<str:retailer_id>/request-assessment', views.request_credit_assessment, name='request-assessment'),
+    path('fintech/dues/<str:due_id>/emi-plans', views.get_emi_plans, name='emi-plans'),
+    path('fintech/dues/<str:due_id>/emi-plans/<str:plan_id>/activate', views.activate_emi_plan, name='activate-emi-plan'),
 ]
\ No newline at end of file
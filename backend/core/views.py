@@ -4,19 +4,34 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.db.models import Sum, Count, Q
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date
+from datetime import datetime, timedelta
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from .models import UserProfile, RetailerProfile, DueEntry, Transaction, Payment
+from . import assessments, credit, emi, events, exports, imports, ledger, payments, scorecards, search
+from .conditional import conditional, analytics_etag, dues_etag, retailers_etag, stats_etag
+from .fastpath import values_serializer
+from .pagination import InvalidCursor, paginate_keyset, parse_page_size
+from .renderers import CSVRenderer, FastJSONRenderer, NDJSONRenderer
+from .models import (
+    UserProfile, RetailerProfile, DueEntry, Transaction,
+    SupplierMonthlyRollup, SupplierDailyRollup, EMIPlan
+)
 from .serializers import (
-    UserProfileSerializer, RetailerProfileSerializer, DueEntrySerializer,
-    TransactionSerializer, PaymentSerializer
+    UserProfileSerializer, DueEntrySerializer,
+    TransactionSerializer, PaymentSerializer, PaymentRequestSerializer,
+    AssessmentJobSerializer, EMIPlanSerializer
 )
 
+LIST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer]
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_user(request):
@@ -99,72 +114,64 @@ def logout_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional(stats_etag)
 def get_dashboard_stats(request):
     user_profile = get_object_or_404(UserProfile, user=request.user)
     
     if user_profile.user_type == 'supplier':
-        total_outstanding = DueEntry.objects.filter(
-            supplier=user_profile,
-            status='pending'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        active_retailers = DueEntry.objects.filter(
-            supplier=user_profile
-        ).values('retailer').distinct().count()
-        
-        monthly_sales = Transaction.objects.filter(
-            supplier=user_profile,
-            created_at__gte=timezone.now() - timedelta(days=30)
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        overdue_amount = DueEntry.objects.filter(
-            supplier=user_profile,
-            status='overdue'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        return Response({
-            'totalOutstanding': total_outstanding,
-            'activeRetailers': active_retailers,
-            'monthlySales': monthly_sales,
-            'overdueAmount': overdue_amount
-        })
+        return Response(ledger.dashboard_stats(user_profile))
     
     return Response({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional(analytics_etag)
 def get_dashboard_analytics(request):
     user_profile = get_object_or_404(UserProfile, user=request.user)
     
     if user_profile.user_type == 'supplier':
-        # Get last 6 months of data
-        end_date = timezone.now()
+        # Get last 6 months of data from the pre-aggregated rollups
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=180)
         
         # Transaction trends
-        transactions = Transaction.objects.filter(
+        transactions = [
+            {'created_at__date': rollup.day, 'amount': rollup.transaction_amount}
+            for rollup in SupplierDailyRollup.objects.filter(
+                supplier=user_profile,
+                day__range=(start_date, end_date),
+                transaction_count__gt=0
+            )
+        ]
+        
+        # Rollups are per month, so the trends cover the whole month the
+        # window starts in rather than from start_date on
+        monthly_rollups = SupplierMonthlyRollup.objects.filter(
             supplier=user_profile,
-            created_at__range=(start_date, end_date)
-        ).values('created_at__date').annotate(
-            amount=Sum('amount')
-        ).order_by('created_at__date')
+            month__range=(start_date.replace(day=1), end_date),
+            due_count__gt=0
+        )
         
         # Payment trends
-        payment_trends = DueEntry.objects.filter(
-            supplier=user_profile,
-            created_at__range=(start_date, end_date)
-        ).values('created_at__month').annotate(
-            on_time=Count('id', filter=Q(status='paid')),
-            late=Count('id', filter=Q(status='overdue'))
-        ).order_by('created_at__month')
+        payment_trends = [
+            {
+                'created_at__year': rollup.month.year,
+                'created_at__month': rollup.month.month,
+                'on_time': rollup.paid_count,
+                'late': rollup.overdue_count
+            }
+            for rollup in monthly_rollups
+        ]
         
         # Retailer growth
-        retailer_growth = DueEntry.objects.filter(
-            supplier=user_profile,
-            created_at__range=(start_date, end_date)
-        ).values('created_at__month').annotate(
-            count=Count('retailer', distinct=True)
-        ).order_by('created_at__month')
+        retailer_growth = [
+            {
+                'created_at__year': rollup.month.year,
+                'created_at__month': rollup.month.month,
+                'count': rollup.retailer_count
+            }
+            for rollup in monthly_rollups
+        ]
         
         return Response({
             'transactions': transactions,
@@ -176,6 +183,8 @@ def get_dashboard_analytics(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERERS)
+@conditional(retailers_etag)
 def get_retailers(request):
     user_profile = get_object_or_404(UserProfile, user=request.user)
     
@@ -184,26 +193,23 @@ def get_retailers(request):
             user_type='retailer',
             received_dues__supplier=user_profile
         ).distinct()
-        serializer = UserProfileSerializer(retailers, many=True)
-        return Response(serializer.data)
+        fast = values_serializer(UserProfileSerializer)
+        return Response(fast.serialize(fast.rows(retailers)))
     
     return Response({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERERS)
 def search_retailers(request):
     user_profile = get_object_or_404(UserProfile, user=request.user)
     query = request.GET.get('q', '')
     
     if user_profile.user_type == 'supplier':
-        retailers = UserProfile.objects.filter(
-            user_type='retailer'
-        ).filter(
-            Q(business_name__icontains=query) |
-            Q(phone__icontains=query)
-        )[:10]
-        serializer = UserProfileSerializer(retailers, many=True)
-        return Response(serializer.data)
+        retailer_ids = search.search_retailer_ids(query, limit=10)
+        fast = values_serializer(UserProfileSerializer)
+        rows = fast.index_by_pk(fast.rows(UserProfile.objects.filter(id__in=retailer_ids)))
+        return Response(fast.serialize(rows[pk] for pk in retailer_ids if pk in rows))
     
     return Response({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -231,69 +237,138 @@ def get_retailer_details(request, retailer_id):
     if user_profile.user_type != 'supplier':
         return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Get retailer's payment history
-    total_dues = DueEntry.objects.filter(
-        supplier=user_profile,
-        retailer=retailer
-    ).count()
-    
-    paid_on_time = 0
-    payment_history = 'new'
-    
-    if total_dues > 0:
-        paid_on_time = DueEntry.objects.filter(
-            supplier=user_profile,
-            retailer=retailer,
-            status='paid'
-        ).count()
-        
-        payment_ratio = paid_on_time / total_dues
-        payment_history = 'excellent' if payment_ratio > 0.9 else \
-                         'good' if payment_ratio > 0.7 else \
-                         'fair'
-    
-    # Get total outstanding amount
-    outstanding_amount = DueEntry.objects.filter(
-        supplier=user_profile,
-        retailer=retailer,
-        status__in=['pending', 'overdue']
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Get recent transactions
-    recent_transactions = Transaction.objects.filter(
-        supplier=user_profile,
-        retailer=retailer
-    ).order_by('-created_at')[:5]
+    scorecard = scorecards.get_scorecard(user_profile.id, retailer.id)
     
     response_data = {
         'id': retailer.id,
         'business_name': retailer.business_name,
         'phone': retailer.phone,
         'address': retailer.address,
-        'payment_history': payment_history,
-        'outstanding_amount': outstanding_amount,
-        'total_dues': total_dues,
-        'paid_on_time': paid_on_time,
-        'recent_transactions': TransactionSerializer(recent_transactions, many=True).data
+        **scorecard
     }
     
     return Response(response_data)
 
+def filter_dues(dues, params):
+    status_filter = params.get('status')
+    if status_filter:
+        dues = dues.filter(status__in=status_filter.split(','))
+    
+    retailer_id = params.get('retailer')
+    if retailer_id:
+        if not retailer_id.isdigit():
+            raise InvalidCursor('Invalid retailer')
+        dues = dues.filter(retailer_id=retailer_id)
+    
+    for param, lookup in (('due_date_from', 'due_date__gte'), ('due_date_to', 'due_date__lte')):
+        value = params.get(param)
+        if value:
+            due_date = parse_date(value)
+            if due_date is None:
+                raise InvalidCursor(f'Invalid {param}')
+            dues = dues.filter(**{lookup: due_date})
+    
+    return dues
+
+def filter_created(queryset, params):
+    # Whole local days, as ranges on created_at so its indexes stay usable
+    for param, lookup, days in (('created_from', 'created_at__gte', 0), ('created_to', 'created_at__lt', 1)):
+        value = params.get(param)
+        if value:
+            created = parse_date(value)
+            if created is None:
+                raise InvalidCursor(f'Invalid {param}')
+            start = datetime.combine(created + timedelta(days=days), datetime.min.time())
+            queryset = queryset.filter(**{lookup: timezone.make_aware(start)})
+    return queryset
+
+def filter_transactions(transactions, params):
+    status_filter = params.get('status')
+    if status_filter:
+        transactions = transactions.filter(status__in=status_filter.split(','))
+    
+    retailer_id = params.get('retailer')
+    if retailer_id:
+        if not retailer_id.isdigit():
+            raise InvalidCursor('Invalid retailer')
+        transactions = transactions.filter(retailer_id=retailer_id)
+    
+    return filter_created(transactions, params)
+
+def participant_filter(user_profile):
+    if user_profile.user_type == 'supplier':
+        return {'supplier': user_profile}
+    if user_profile.user_type == 'retailer':
+        return {'retailer': user_profile}
+    return None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(EXPORT_RENDERERS)
+def export_dues(request):
+    user_profile = get_object_or_404(UserProfile, user=request.user)
+    participant = participant_filter(user_profile)
+    if participant is None:
+        return JsonResponse({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        dues = filter_created(filter_dues(DueEntry.objects.filter(**participant), request.GET), request.GET)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return exports.streaming_export(
+        dues.order_by('id'), DueEntrySerializer, request.accepted_renderer.format, 'dues',
+        asynchronous=exports.is_asgi(request)
+    )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(EXPORT_RENDERERS)
+def export_transactions(request):
+    user_profile = get_object_or_404(UserProfile, user=request.user)
+    participant = participant_filter(user_profile)
+    if participant is None:
+        return JsonResponse({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        transactions = filter_transactions(Transaction.objects.filter(**participant), request.GET)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return exports.streaming_export(
+        transactions.order_by('id'), TransactionSerializer, request.accepted_renderer.format, 'transactions',
+        asynchronous=exports.is_asgi(request)
+    )
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERERS)
+@conditional(dues_etag)
 def get_dues(request):
     user_profile = get_object_or_404(UserProfile, user=request.user)
     
     if user_profile.user_type == 'supplier':
         dues = DueEntry.objects.filter(supplier=user_profile)
-        serializer = DueEntrySerializer(dues, many=True)
-        return Response(serializer.data)
     elif user_profile.user_type == 'retailer':
         dues = DueEntry.objects.filter(retailer=user_profile)
-        serializer = DueEntrySerializer(dues, many=True)
-        return Response(serializer.data)
+    else:
+        return Response({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response({'error': 'Invalid user type'}, status=status.HTTP_400_BAD_REQUEST)
+    fast = values_serializer(DueEntrySerializer)
+    try:
+        page, next_cursor = paginate_keyset(
+            fast.rows(filter_dues(dues, request.GET)),
+            cursor=request.GET.get('cursor'),
+            limit=parse_page_size(request.GET.get('limit')),
+            key=fast.row_getter('created_at', 'id')
+        )
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'results': fast.serialize(page),
+        'next_cursor': next_cursor
+    })
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -309,18 +384,57 @@ def create_due(request):
     })
     
     if serializer.is_valid():
-        serializer.save()
+        try:
+            with transaction.atomic():
+                due = serializer.save()
+                # The signal handler has already taken the amount off the
+                # retailer's available credit; roll back if that overdrew it
+                credit.check_limit(due.retailer_id, due.amount)
+        except credit.CreditLimitExceeded as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        events.publish('due_created', {'data': serializer.data}, events.due_participants(due))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_create_dues(request):
+    """
+    Import dues from an uploaded "file" (multipart) or from the raw request
+    body sent as text/csv or application/x-ndjson. See core.imports.
+    """
+    user_profile = get_object_or_404(UserProfile, user=request.user)
+
+    if user_profile.user_type != 'supplier':
+        return Response({'error': 'Only suppliers can create dues'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+            fmt = imports.detect_format(upload.name, upload.content_type)
+            stream = upload
+        else:
+            fmt = imports.detect_format(content_type=request.content_type)
+            stream = request.stream
+    except imports.ImportFormatError as e:
+        return Response({'error': str(e)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    report = imports.import_dues(user_profile, stream or [], fmt)
+    return Response(
+        report,
+        status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+    )
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_due_details(request, due_id):
     user_profile = get_object_or_404(UserProfile, user=request.user)
-    due = get_object_or_404(DueEntry, id=due_id)
+    due = get_object_or_404(DueEntrySerializer.setup_eager_loading(DueEntry.objects.all()), id=due_id)
     
-    if due.supplier != user_profile and due.retailer != user_profile:
+    if due.supplier_id != user_profile.id and due.retailer_id != user_profile.id:
         return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
     serializer = DueEntrySerializer(due)
@@ -330,20 +444,111 @@ def get_due_details(request, due_id):
 @permission_classes([IsAuthenticated])
 def make_payment(request, due_id):
     user_profile = get_object_or_404(UserProfile, user=request.user)
-    due = get_object_or_404(DueEntry, id=due_id)
-    
-    if due.retailer != user_profile:
+
+    data = {**request.data}
+    if request.headers.get('Idempotency-Key'):
+        data['idempotency_key'] = request.headers['Idempotency-Key']
+    serializer = PaymentRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = serializer.validated_data
+
+    # A retry of a payment that was already posted is answered from the
+    # idempotency key index alone
+    existing = payments.find_existing(due_id, params['idempotency_key'], retailer_id=user_profile.id)
+    if existing is not None:
+        return Response(PaymentSerializer(existing).data, status=status.HTTP_200_OK)
+
+    retailer_id = DueEntry.objects.filter(id=due_id).values_list('retailer_id', flat=True).first()
+    if retailer_id is None:
+        return Response({'error': 'Due not found'}, status=status.HTTP_404_NOT_FOUND)
+    if retailer_id != user_profile.id:
         return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
-    
-    serializer = PaymentSerializer(data={
-        **request.data,
-        'due': due_id
-    })
-    
-    if serializer.is_valid():
-        payment = serializer.save()
-        due.status = 'paid'
-        due.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+
+    try:
+        payment, due, created = payments.post_payment(
+            due_id,
+            amount=params.get('amount'),
+            payment_method=params['payment_method'],
+            reference_id=params['reference_id'],
+            idempotency_key=params['idempotency_key']
+        )
+    except payments.PaymentRejected as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = PaymentSerializer(payment).data
+    if not created:
+        return Response(data, status=status.HTTP_200_OK)
+
+    events.publish('payment_made', {
+        'data': data,
+        'due': DueEntrySerializer(due).data
+    }, events.due_participants(due))
+    return Response(data, status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def request_credit_assessment(request, retailer_id):
+    """
+    Queue a credit assessment of a retailer (UserProfile id). The scoring
+    runs in the run_assessment_worker command; the result arrives as a
+    credit_limit_updated event.
+    """
+    user_profile = get_object_or_404(UserProfile, user=request.user)
+
+    if user_profile.user_type != 'fintech':
+        return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+    retailer = get_object_or_404(RetailerProfile, user_profile_id=retailer_id)
+    job, created = assessments.request_assessment(retailer, requested_by=user_profile)
+    return Response(
+        AssessmentJobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+    )
+
+def _emi_due(user_profile, due_id):
+    """The due as a values() dict if the user may take an EMI plan on it, else an error Response."""
+    due = DueEntry.objects.filter(id=due_id).annotate(
+        has_active_plan=Exists(EMIPlan.objects.filter(due=OuterRef('pk'), status='active'))
+    ).values(
+        'retailer_id', 'amount', 'amount_paid', 'status', 'has_active_plan',
+        credit_score=F('retailer__retailerprofile__credit_score')
+    ).first()
+    if due is None:
+        return None, Response({'error': 'Due not found'}, status=status.HTTP_404_NOT_FOUND)
+    if user_profile.user_type != 'fintech' and user_profile.id != due['retailer_id']:
+        return None, Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    return due, None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_emi_plans(request, due_id):
+    """EMI options for a due's outstanding balance, for its retailer or a fintech user."""
+    user_profile = get_object_or_404(UserProfile, user=request.user)
+    due, error = _emi_due(user_profile, due_id)
+    if error:
+        return error
+    balance = due['amount'] - due['amount_paid']
+    try:
+        emi.check_eligible(due['status'], balance)
+    except emi.EMIRejected as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if due['has_active_plan']:
+        return Response({'error': 'This due already has an active EMI plan'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(emi.plan_options(balance, emi.interest_rate(due['credit_score'])))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def activate_emi_plan(request, due_id, plan_id):
+    """Put a due on the EMI plan plan_id (its tenure in months) and schedule its installments."""
+    user_profile = get_object_or_404(UserProfile, user=request.user)
+    due, error = _emi_due(user_profile, due_id)
+    if error:
+        return error
+    if not plan_id.isdigit():
+        return Response({'error': 'Unknown EMI plan'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        plan = emi.activate(due_id, int(plan_id), due['credit_score'], activated_by=user_profile)
+    except emi.EMIRejected as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(EMIPlanSerializer(plan).data, status=status.HTTP_201_CREATED)
\ No newline at end of file
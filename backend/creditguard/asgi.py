@@ -11,4 +11,14 @@ application = ProtocolTypeRouter({
     "websocket": AuthMiddlewareStack(
         URLRouter(websocket_urlpatterns)
     ),
-})
\ No newline at end of file
+})
+
+from django.conf import settings
+
+if settings.OVERDUE_SWEEP_INTERVAL:
+    from core import overdue
+    from creditguard.periodic import PeriodicTasks
+
+    application = PeriodicTasks(application, [
+        lambda: overdue.run_periodically(settings.OVERDUE_SWEEP_INTERVAL),
+    ])
\ No newline at end of file
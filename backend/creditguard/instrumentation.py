@@ -0,0 +1,248 @@
+"""
+Per-request latency and query instrumentation.
+
+RequestMetricsMiddleware times every request and, through a database
+execute wrapper on each connection, its SQL: query count, time spent in
+the database and duplicate queries (the same SQL text run again with
+other parameters, the signature of an N+1). Observations are aggregated
+per view name (the URL pattern name) into fixed-bucket histograms held in
+process, alongside the response size, so this works with DEBUG off.
+Each worker process keeps its own numbers; scrape every process, or sum
+them, as with any per-process Prometheus target.
+
+metrics_view serves the histograms to staff users as JSON, or in the
+Prometheus text format with ?format=prometheus.
+
+With REQUEST_PROFILE_SAMPLE_RATE above zero, that share of requests runs
+under cProfile, and a profile is kept when the request took longer than
+REQUEST_PROFILE_THRESHOLD_MS. The last REQUEST_PROFILE_KEEP profiles are
+served by profiles_view.
+"""
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = (
+    # (name, help, buckets)
+    ('request_duration_seconds', 'Wall time of the request.', SECONDS_BUCKETS),
+    ('db_duration_seconds', 'Time spent executing SQL.', SECONDS_BUCKETS),
+    ('db_queries', 'SQL queries executed.', QUERY_BUCKETS),
+    ('db_duplicate_queries', 'Queries whose SQL text already ran in the same request.', QUERY_BUCKETS),
+    ('response_size_bytes', 'Response body size; streamed responses are not measured.', SIZE_BUCKETS),
+)
+PROMETHEUS_PREFIX = 'creditguard_'
+UNRESOLVED = '<unresolved>'
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket; not cumulative
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for upper, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield upper, total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, or None."""
+        if not self.count:
+            return None
+        for upper, total in self.cumulative():
+            if total >= q * self.count:
+                return upper
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {_le(upper): total for upper, total in self.cumulative()},
+        }
+
+
+def _le(upper):
+    return '+Inf' if upper == float('inf') else f'{upper:g}'
+
+
+class Registry:
+    """Histograms per (metric, view), shared by every thread of the process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.profiles = deque(maxlen=getattr(settings, 'REQUEST_PROFILE_KEEP', 20))
+
+    def observe(self, view, values):
+        with self.lock:
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = {
+                    name: Histogram(buckets) for name, _, buckets in METRICS
+                }
+            for name, value in values.items():
+                if value is not None:
+                    histograms[name].observe(value)
+
+    def add_profile(self, profile):
+        with self.lock:
+            self.profiles.append(profile)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                view: {name: histogram.as_dict() for name, histogram in histograms.items()}
+                for view, histograms in sorted(self.views.items())
+            }
+
+    def as_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, help_text, _ in METRICS:
+                metric = PROMETHEUS_PREFIX + name
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histograms in sorted(self.views.items()):
+                    histogram = histograms[name]
+                    label = view.replace('\\', '\\\\').replace('"', '\\"')
+                    for upper, total in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{view="{label}",le="{_le(upper)}"}} {total}')
+                    lines.append(f'{metric}_sum{{view="{label}"}} {histogram.sum:g}')
+                    lines.append(f'{metric}_count{{view="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryTimer:
+    """connection.execute_wrapper() that counts and times queries and spots repeats."""
+
+    def __init__(self):
+        self.count = 0
+        self.duplicates = 0
+        self.time = 0.0
+        self.seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+            if sql in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(sql)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.view_name or match._func_path
+
+
+def profile_stats(profiler, limit=40):
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        profiler = cProfile.Profile() if sample_rate and random.random() < sample_rate else None
+        timer = QueryTimer()
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        view = view_name(request)
+        registry.observe(view, {
+            'request_duration_seconds': elapsed,
+            'db_duration_seconds': timer.time,
+            'db_queries': timer.count,
+            'db_duplicate_queries': timer.duplicates,
+            'response_size_bytes': None if response.streaming else len(response.content),
+        })
+
+        threshold = getattr(settings, 'REQUEST_PROFILE_THRESHOLD_MS', 500) / 1000
+        if profiler is not None and elapsed >= threshold:
+            registry.add_profile({
+                'view': view,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+                'db_ms': round(timer.time * 1000, 1),
+                'queries': timer.count,
+                'duplicate_queries': timer.duplicates,
+                'captured_at': timezone.now().isoformat(),
+                'stats': profile_stats(profiler),
+            })
+        return response
+
+
+def _staff_only(request):
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({'error': 'Not authorized'}, status=403)
+    return None
+
+
+def metrics_view(request):
+    denied = _staff_only(request)
+    if denied:
+        return denied
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(registry.as_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    return JsonResponse(registry.as_dict())
+
+
+def profiles_view(request):
+    denied = _staff_only(request)
+    if denied:
+        return denied
+    with registry.lock:
+        profiles = list(registry.profiles)
+    return JsonResponse({'profiles': profiles[::-1]})
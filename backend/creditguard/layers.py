@@ -0,0 +1,337 @@
+"""
+Channel layer backed by a shared SQLite database in WAL mode.
+
+Every ASGI worker on the host opens the same database file, so group sends
+from one process reach sockets held by another without Redis. Messages and
+group memberships are rows with an expiry time; sends beyond a channel's
+capacity raise ChannelFull (or are dropped for group sends, as with the
+Redis layer).
+
+Process-specific channels ("<prefix>.<client>!<id>") are received through
+a single poller per process that claims all pending messages for that
+process in one statement, so the polling cost does not grow with the
+number of open sockets. Claimed messages wait in a per-channel buffer for
+the next receive(); those for channels nobody is receiving on (a consumer
+that has gone away) expire as they would have in the database, and the
+poller stops once no buffer is left.
+
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'creditguard.layers.SQLiteChannelLayer',
+            'CONFIG': {'path': BASE_DIR / 'channels.sqlite3'},
+        },
+    }
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import sqlite3
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    process TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_messages_process ON channel_messages (process, id);
+CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel, id);
+CREATE INDEX IF NOT EXISTS channel_messages_expires ON channel_messages (expires);
+CREATE TABLE IF NOT EXISTS channel_groups (
+    group_name TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (group_name, channel)
+);
+CREATE INDEX IF NOT EXISTS channel_groups_expires ON channel_groups (expires);
+"""
+
+
+def _encode_default(value):
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode()}
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _decode_hook(value):
+    if len(value) == 1 and '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+def process_name(channel):
+    """The client prefix of a process-specific channel, or '' for a normal one."""
+    if '!' not in channel:
+        return ''
+    return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+
+
+def serialize(message):
+    return json.dumps(message, default=_encode_default, separators=(',', ':'))
+
+
+def deserialize(body):
+    return json.loads(body, object_hook=_decode_hook)
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    extensions = ['groups', 'flush']
+
+    def __init__(
+        self,
+        path='channels.sqlite3',
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.005,
+        max_poll_interval=0.05,
+        cleanup_interval=1.0,
+        busy_timeout=5.0,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.cleanup_interval = cleanup_interval
+        self.busy_timeout = busy_timeout
+        self.client_prefix = f'sqlite{os.getpid()}' + ''.join(
+            random.choice(string.ascii_letters) for _ in range(8)
+        )
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-channel-layer')
+        self._connection = None
+        self._last_cleanup = 0.0
+        self._last_buffer_cleanup = 0.0
+        self._buffers = {}
+        self._receivers = {}
+        self._poller = None
+
+    # Database access; every call runs on the layer's single worker thread
+
+    def _db(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _write(self, func, *args):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(db, *args)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return result
+
+    def _maybe_cleanup(self, db, now):
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        # A channel whose messages expire undelivered has no live reader;
+        # drop it from its groups along with the messages.
+        db.execute(
+            'DELETE FROM channel_groups WHERE channel IN '
+            '(SELECT DISTINCT channel FROM channel_messages WHERE expires < ?)',
+            (now,)
+        )
+        db.execute('DELETE FROM channel_messages WHERE expires < ?', (now,))
+        db.execute('DELETE FROM channel_groups WHERE expires < ?', (now,))
+
+    def _insert(self, db, channels, body, now):
+        """Insert body for each channel that has room; returns the channels that were full."""
+        full = []
+        rows = []
+        for channel in channels:
+            pending = db.execute(
+                'SELECT COUNT(*) FROM channel_messages WHERE channel = ? AND expires >= ?',
+                (channel, now)
+            ).fetchone()[0]
+            if pending >= self.get_capacity(channel):
+                full.append(channel)
+                continue
+            rows.append((channel, process_name(channel), now + self.expiry, body))
+        db.executemany(
+            'INSERT INTO channel_messages (channel, process, expires, body) VALUES (?, ?, ?, ?)',
+            rows
+        )
+        return full
+
+    def _send(self, db, channel, body):
+        now = time.time()
+        self._maybe_cleanup(db, now)
+        return self._insert(db, [channel], body, now)
+
+    def _group_send(self, db, group, body):
+        now = time.time()
+        self._maybe_cleanup(db, now)
+        channels = [
+            row[0] for row in db.execute(
+                'SELECT channel FROM channel_groups WHERE group_name = ? AND expires >= ?',
+                (group, now)
+            )
+        ]
+        return self._insert(db, channels, body, now)
+
+    def _claim_all(self, db):
+        now = time.time()
+        self._maybe_cleanup(db, now)
+        return db.execute(
+            'DELETE FROM channel_messages WHERE process = ? AND expires >= ? '
+            'RETURNING id, channel, expires, body',
+            (self.client_prefix, now)
+        ).fetchall()
+
+    def _claim_one(self, db, channel):
+        now = time.time()
+        return db.execute(
+            'DELETE FROM channel_messages WHERE id = '
+            '(SELECT id FROM channel_messages WHERE channel = ? AND expires >= ? ORDER BY id LIMIT 1) '
+            'RETURNING body',
+            (channel, now)
+        ).fetchone()
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        assert '__asgi_channel__' not in message
+        full = await self._run(self._write, self._send, channel, serialize(message))
+        if full:
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        if '!' in channel:
+            queue = self._buffers.setdefault(channel, asyncio.Queue())
+            self._receivers[channel] = self._receivers.get(channel, 0) + 1
+            self._ensure_poller()
+            try:
+                while True:
+                    expires, message = await queue.get()
+                    if expires >= time.time():
+                        return message
+            finally:
+                self._receivers[channel] -= 1
+                if not self._receivers[channel]:
+                    del self._receivers[channel]
+                    if queue.empty() and self._buffers.get(channel) is queue:
+                        del self._buffers[channel]
+
+        interval = self.poll_interval
+        while True:
+            row = await self._run(self._write, self._claim_one, channel)
+            if row is not None:
+                return deserialize(row[0])
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    async def new_channel(self, prefix='specific'):
+        return '%s.%s!%s' % (
+            prefix,
+            self.client_prefix,
+            ''.join(random.choice(string.ascii_letters) for _ in range(12)),
+        )
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not loop:
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        interval = self.poll_interval
+        while self._buffers:
+            rows = await self._run(self._write, self._claim_all)
+            for _, channel, expires, body in sorted(rows):
+                self._buffers.setdefault(channel, asyncio.Queue()).put_nowait((expires, deserialize(body)))
+            self._expire_buffers(time.time())
+            if rows:
+                interval = self.poll_interval
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+
+    def _expire_buffers(self, now):
+        """Drop expired messages held for channels with no receive() waiting, and emptied buffers."""
+        if now - self._last_buffer_cleanup < self.cleanup_interval:
+            return
+        self._last_buffer_cleanup = now
+        for channel, queue in list(self._buffers.items()):
+            if channel in self._receivers:
+                continue
+            held = [queue.get_nowait() for _ in range(queue.qsize())]
+            for item in held:
+                if item[0] >= now:
+                    queue.put_nowait(item)
+            if queue.empty():
+                del self._buffers[channel]
+
+    # Flush extension
+
+    async def flush(self):
+        def _flush(db):
+            db.execute('DELETE FROM channel_messages')
+            db.execute('DELETE FROM channel_groups')
+        await self._run(self._write, _flush)
+        # Emptied in place: a waiting receive() holds on to its channel's queue
+        for channel, queue in list(self._buffers.items()):
+            while not queue.empty():
+                queue.get_nowait()
+            if channel not in self._receivers:
+                del self._buffers[channel]
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), 'Group name not valid'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+
+        def _add(db):
+            db.execute(
+                'INSERT INTO channel_groups (group_name, channel, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (group_name, channel) DO UPDATE SET expires = excluded.expires',
+                (group, channel, time.time() + self.group_expiry)
+            )
+        await self._run(self._write, _add)
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), 'Invalid channel name'
+        assert self.valid_group_name(group), 'Invalid group name'
+
+        def _discard(db):
+            db.execute(
+                'DELETE FROM channel_groups WHERE group_name = ? AND channel = ?',
+                (group, channel)
+            )
+        await self._run(self._write, _discard)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        assert self.valid_group_name(group), 'Invalid group name'
+        # Full channels are skipped, matching the other channel layers
+        await self._run(self._write, self._group_send, group, serialize(message))
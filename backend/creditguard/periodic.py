@@ -0,0 +1,24 @@
+"""
+ASGI wrapper that runs background coroutines inside the server process.
+
+The tasks start in the server's event loop on the first connection or
+request (ASGI servers do not all send lifespan events) and run for the
+life of the process. Each worker process runs its own copy, so tasks must
+be safe to run concurrently.
+"""
+import asyncio
+
+
+class PeriodicTasks:
+    def __init__(self, application, tasks):
+        self.application = application
+        self.tasks = tasks
+        self.loop = None
+        self.running = []
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.running = [loop.create_task(task()) for task in self.tasks]
+        return await self.application(scope, receive, send)
@@ -0,0 +1,95 @@
+"""
+Read replicas for the read-only API endpoints.
+
+ReplicaReadMiddleware marks a request as replica-readable when it is a GET
+or HEAD to a view named in REPLICA_READ_VIEWS and the client is not pinned.
+PrimaryReplicaRouter then sends that request's reads to a random alias in
+DATABASE_REPLICAS; everything else, including management commands, workers
+and WebSocket consumers, reads and writes the primary ('default'). Only
+list views that never write: a write computed from replica reads would
+copy stale data onto the primary.
+
+Within a replica-readable request, reads still go to the primary:
+  - inside transaction.atomic() on the primary;
+  - once the request has written, so it sees its own write;
+  - for auth and sessions, so a logout is never undone by a lagging copy.
+Writes, and the select_for_update() and get_or_create() reads Django
+routes as writes, always go to the primary.
+
+A request that writes sets a cookie for REPLICA_PIN_SECONDS, which pins
+that client to the primary so it reads its own writes while the replicas
+catch up. The cookie works across worker processes.
+
+Replicas are copies kept in sync by whatever replicates the database; for
+SQLite, the sync_replicas management command copies the primary file.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps whose reads always go to the primary
+PRIMARY_APPS = {'auth', 'sessions', 'contenttypes'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class RequestRouting:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_APPS or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary along with the data
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = RequestRouting()
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax', secure=request.is_secure()
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        routing.use_replica = (
+            request.method in SAFE_METHODS
+            and request.resolver_match.view_name in settings.REPLICA_READ_VIEWS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        )
+        return None
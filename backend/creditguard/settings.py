@@ -30,6 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'creditguard.instrumentation.RequestMetricsMiddleware',
+    'creditguard.routers.ReplicaReadMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -61,21 +64,75 @@ TEMPLATES = [
 WSGI_APPLICATION = 'creditguard.wsgi.application'
 ASGI_APPLICATION = 'creditguard.asgi.application'
 
-# Channel Layers for WebSocket
+# Channel Layers for WebSocket; the SQLite layer is shared by every worker
+# process on the host, so events reach sockets held by any of them
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'creditguard.layers.SQLiteChannelLayer',
+        'CONFIG': {
+            'path': BASE_DIR / 'channels.sqlite3',
+            'capacity': 100,
+            'expiry': 60,
+            'group_expiry': 86400,
+        },
     },
 }
 
-# Database
+# Cache (per-process unless pointed at a shared backend)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Seconds a cached retailer scorecard may be served before it is recomputed
+RETAILER_SCORECARD_TTL = int(os.getenv('RETAILER_SCORECARD_TTL', '60'))
+
+# Seconds between overdue sweeps run inside each ASGI process; 0 leaves it
+# to the mark_overdue management command
+OVERDUE_SWEEP_INTERVAL = int(os.getenv('OVERDUE_SWEEP_INTERVAL', '0'))
+
+# Request instrumentation (creditguard.instrumentation): the share of
+# requests run under cProfile, and how slow one must be for its profile to
+# be kept; 0 disables profiling
+REQUEST_PROFILE_SAMPLE_RATE = float(os.getenv('REQUEST_PROFILE_SAMPLE_RATE', '0'))
+REQUEST_PROFILE_THRESHOLD_MS = int(os.getenv('REQUEST_PROFILE_THRESHOLD_MS', '500'))
+REQUEST_PROFILE_KEEP = 20
+
+# Database; creditguard.sqlite runs SQLite in WAL mode with tuned pragmas.
+# Connections are kept for DB_CONN_MAX_AGE seconds instead of reopened per
+# request; 0, the default, closes them after each request. Under ASGI,
+# Django opens them on a thread per request and a kept connection is never
+# reused or closed, so only wsgi.py turns reuse on.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'creditguard.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas (creditguard.routers): each path in DB_REPLICAS, comma
+# separated, is an SQLite copy of the primary refreshed by
+# `manage.py sync_replicas`. With none, everything uses the primary.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'NAME': path.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['creditguard.routers.PrimaryReplicaRouter']
+
+# GET endpoints that may read from a replica. None of them may write:
+# retailer-details caches its scorecard, which a lagging copy would keep
+# stale, and dashboard-stats rebuilds a missing ledger summary
+REPLICA_READ_VIEWS = {
+    'dashboard-analytics', 'retailers-list', 'retailers-search',
+    'recent-retailers', 'dues-list', 'due-details', 'emi-plans',
+}
+# Seconds a client that wrote reads from the primary, to see its own writes
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+REPLICA_PIN_COOKIE = 'primary_pin'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -0,0 +1,79 @@
+"""
+SQLite backend tuned for several web workers sharing one database file.
+
+Each new connection applies PRAGMAS, with any key overridden through
+OPTIONS['pragmas']. WAL lets readers keep reading the last committed
+snapshot while a writer holds the lock, where the default rollback journal
+makes them wait for every commit. With WAL, synchronous=NORMAL cannot
+corrupt the database; a power loss may only drop the last commits.
+
+Transactions begin IMMEDIATE (OPTIONS['transaction_mode']). A deferred
+transaction that reads and then writes fails at once with "database is
+locked" when another writer committed in between; taking the write lock
+up front makes it wait up to busy_timeout instead. Readers are not blocked
+by it in WAL mode.
+
+Closing a connection runs PRAGMA optimize, which analyzes the tables that
+connection queried whose statistics look stale.
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'creditguard.sqlite',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {'pragmas': {'cache_size': -64000}},
+        },
+    }
+"""
+import sqlite3
+
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    # First, so switching the journal mode waits for other connections
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Negative sizes are KiB: 20 MB of page cache per connection
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+BACKEND_OPTIONS = ('pragmas', 'transaction_mode')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pragmas(self):
+        return {**PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'IMMEDIATE').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ValueError(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}")
+        return mode
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Ours, not sqlite3.connect() arguments
+        for option in BACKEND_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.execute('PRAGMA optimize')
+            except sqlite3.Error:
+                # Only statistics; never keep a broken connection open over it
+                pass
+        super()._close()
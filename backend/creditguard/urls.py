@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from . import instrumentation
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),
+    path('metrics/', instrumentation.metrics_view, name='metrics'),
+    path('metrics/profiles/', instrumentation.profiles_view, name='metrics-profiles'),
 ]
\ No newline at end of file
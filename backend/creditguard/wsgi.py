@@ -7,5 +7,8 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'creditguard.settings')
+# WSGI workers serve requests on long-lived threads, so keep connections
+# between them; see DATABASES in settings
+os.environ.setdefault('DB_CONN_MAX_AGE', '600')
 
 application = get_wsgi_application()
\ No newline at end of file
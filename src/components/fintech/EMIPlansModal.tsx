@@ -36,7 +36,7 @@ export default function EMIPlansModal({
       const plans = await fintech.getEMIPlans(dueId);
       setEmiPlans(plans);
     } catch (err: any) {
-      setError(err.response?.data?.message || 'Failed to load EMI plans');
+      setError(err.response?.data?.error || err.response?.data?.message || 'Failed to load EMI plans');
     } finally {
       setLoading(false);
     }
@@ -52,7 +52,7 @@ export default function EMIPlansModal({
       onSuccess();
       onClose();
     } catch (err: any) {
-      setError(err.response?.data?.message || 'Failed to activate EMI plan');
+      setError(err.response?.data?.error || err.response?.data?.message || 'Failed to activate EMI plan');
     } finally {
       setActivating(false);
     }
@@ -35,6 +35,10 @@ export default function PaymentModal({ isOpen, onClose, onSuccess, payment }: Pa
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [referenceId, setReferenceId] = useState('');
+  // One key per payment attempt, so resubmitting after a network error
+  // cannot charge the due twice
+  const [idempotencyKey, setIdempotencyKey] = useState(() => crypto.randomUUID());
+  const balance = payment ? Number(payment.amount) - Number(payment.amount_paid || 0) : 0;
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -45,14 +49,16 @@ export default function PaymentModal({ isOpen, onClose, onSuccess, payment }: Pa
 
     try {
       await dues.makePayment(payment.id, {
-        amount: payment.amount,
+        amount: balance,
         payment_method: selectedMethod,
-        reference_id: referenceId
+        reference_id: referenceId,
+        idempotency_key: idempotencyKey
       });
+      setIdempotencyKey(crypto.randomUUID());
       onSuccess();
       onClose();
     } catch (err: any) {
-      setError(err.response?.data?.message || 'Payment failed. Please try again.');
+      setError(err.response?.data?.error || err.response?.data?.message || 'Payment failed. Please try again.');
     } finally {
       setLoading(false);
     }
@@ -86,7 +92,7 @@ export default function PaymentModal({ isOpen, onClose, onSuccess, payment }: Pa
             <div className="flex justify-between items-center">
               <span className="text-sm text-gray-500">Amount to Pay</span>
               <span className="text-lg font-semibold text-gray-900">
-                ₹{payment.amount.toLocaleString()}
+                ₹{balance.toLocaleString()}
               </span>
             </div>
             <div className="mt-2 text-sm text-gray-500">
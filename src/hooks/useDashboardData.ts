@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import { dashboard } from '../services/api/dashboard';
 import { useWebSocket } from './useWebSocket';
+import { ServerEvent } from '../services/websocket';
 
 export function useDashboardData() {
   const [stats, setStats] = useState<any>(null);
@@ -25,21 +26,30 @@ export function useDashboardData() {
   useEffect(() => {
     loadData();
 
-    // Listen for real-time updates
-    const handleDueUpdate = () => loadData();
-    const handlePaymentUpdate = () => loadData();
-    const handleCreditUpdate = () => loadData();
+    // Listen for real-time updates; events carry the new stats
+    const handleUpdate = (message: ServerEvent) => {
+      if (message.stats) {
+        setStats(message.stats);
+      } else {
+        loadData();
+      }
+    };
+    const handleResync = () => loadData();
 
-    websocket.addListener('due_created', handleDueUpdate);
-    websocket.addListener('due_updated', handleDueUpdate);
-    websocket.addListener('payment_made', handlePaymentUpdate);
-    websocket.addListener('credit_limit_updated', handleCreditUpdate);
+    websocket.addListener('due_created', handleUpdate);
+    websocket.addListener('due_updated', handleUpdate);
+    websocket.addListener('dues_updated', handleUpdate);
+    websocket.addListener('payment_made', handleUpdate);
+    websocket.addListener('credit_limit_updated', handleUpdate);
+    websocket.addListener('resync', handleResync);
 
     return () => {
-      websocket.removeListener('due_created', handleDueUpdate);
-      websocket.removeListener('due_updated', handleDueUpdate);
-      websocket.removeListener('payment_made', handlePaymentUpdate);
-      websocket.removeListener('credit_limit_updated', handleCreditUpdate);
+      websocket.removeListener('due_created', handleUpdate);
+      websocket.removeListener('due_updated', handleUpdate);
+      websocket.removeListener('dues_updated', handleUpdate);
+      websocket.removeListener('payment_made', handleUpdate);
+      websocket.removeListener('credit_limit_updated', handleUpdate);
+      websocket.removeListener('resync', handleResync);
     };
   }, [loadData, websocket]);
 
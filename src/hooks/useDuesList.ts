@@ -1,19 +1,24 @@
 import { useState, useEffect, useCallback } from 'react';
-import { dues } from '../services/api/dues';
+import { dues, Due } from '../services/api/dues';
 import { useWebSocket } from './useWebSocket';
+import { ServerEvent } from '../services/websocket';
 
 export function useDuesList() {
-  const [duesList, setDuesList] = useState([]);
+  const [duesList, setDuesList] = useState<Due[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const websocket = useWebSocket();
 
+  // Reloads from the first page; loadMore appends the pages after it
   const loadDues = useCallback(async () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await dues.getAll();
-      setDuesList(data);
+      const page = await dues.getPage();
+      setDuesList(page.results);
+      setNextCursor(page.next_cursor);
     } catch (err: any) {
       setError(err.message || 'Failed to load dues');
       console.error('Dues loading error:', err);
@@ -22,19 +27,61 @@ export function useDuesList() {
     }
   }, []);
 
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      setError(null);
+      const page = await dues.getPage({ cursor: nextCursor });
+      // A due pushed over the socket may already be in the list
+      setDuesList((current) => {
+        const seen = new Set(current.map((due) => due.id));
+        return [...current, ...page.results.filter((due) => !seen.has(due.id))];
+      });
+      setNextCursor(page.next_cursor);
+    } catch (err: any) {
+      setError(err.message || 'Failed to load dues');
+      console.error('Dues loading error:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextCursor, loadingMore]);
+
   useEffect(() => {
     loadDues();
 
-    // Listen for real-time updates
-    const handleDueUpdate = () => loadDues();
+    // Listen for real-time updates and apply the changed dues in place
+    const applyDues = (changed: Due[]) => {
+      setDuesList((current) => {
+        const next = [...current];
+        changed.forEach((due) => {
+          const index = next.findIndex((item) => item.id === due.id);
+          if (index === -1) {
+            next.unshift(due);
+          } else {
+            next[index] = due;
+          }
+        });
+        return next;
+      });
+    };
+    const handleDueUpdate = (message: ServerEvent) => applyDues([message.data]);
+    const handleDuesBatch = (message: ServerEvent) => applyDues(message.data);
+    const handlePayment = (message: ServerEvent) => applyDues([message.due]);
+    const handleResync = () => loadDues();
+
     websocket.addListener('due_created', handleDueUpdate);
     websocket.addListener('due_updated', handleDueUpdate);
-    websocket.addListener('payment_made', handleDueUpdate);
+    websocket.addListener('dues_updated', handleDuesBatch);
+    websocket.addListener('payment_made', handlePayment);
+    websocket.addListener('resync', handleResync);
 
     return () => {
       websocket.removeListener('due_created', handleDueUpdate);
       websocket.removeListener('due_updated', handleDueUpdate);
-      websocket.removeListener('payment_made', handleDueUpdate);
+      websocket.removeListener('dues_updated', handleDuesBatch);
+      websocket.removeListener('payment_made', handlePayment);
+      websocket.removeListener('resync', handleResync);
     };
   }, [loadDues, websocket]);
 
@@ -42,5 +89,5 @@ export function useDuesList() {
     await loadDues();
   };
 
-  return { duesList, loading, error, refreshDues };
+  return { duesList, loading, error, refreshDues, loadMore, loadingMore, hasMore: nextCursor !== null };
 }
\ No newline at end of file
@@ -73,9 +73,17 @@ export const retailers = {
 };
 
 export const dues = {
+  // Every due, following next_cursor through the pages as
+  // services/api/dues does
   getAll: async () => {
-    const response = await api.get('/dues/');
-    return response.data;
+    const all: any[] = [];
+    let cursor: string | null | undefined;
+    do {
+      const response = await api.get('/dues/', { params: { cursor, limit: 200 } });
+      all.push(...response.data.results);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return all;
   },
   create: async (data: any) => {
     const response = await api.post('/dues/', data);
@@ -13,6 +13,7 @@ export interface Due {
     phone: string;
   };
   amount: number;
+  amount_paid: number;
   description: string;
   purchase_date: string;
   due_date: string;
@@ -28,13 +29,56 @@ export interface Payment {
   payment_method: string;
   payment_date: string;
   reference_id?: string;
+  idempotency_key?: string | null;
   status: 'pending' | 'completed' | 'failed';
 }
 
+export interface DuesPage {
+  results: Due[];
+  next_cursor: string | null;
+}
+
+export interface DuesQuery {
+  cursor?: string;
+  limit?: number;
+  status?: string;
+  retailer?: string;
+  due_date_from?: string;
+  due_date_to?: string;
+}
+
+export interface BulkImportReport {
+  created: number;
+  failed: number;
+  errors: { row: number; errors: Record<string, string[]> }[];
+  errors_truncated: boolean;
+}
+
+// The largest page /dues/ returns
+const MAX_PAGE_SIZE = 200;
+
 export const dues = {
-  getAll: async (): Promise<Due[]> => {
+  // Every due, following next_cursor through the pages; use getPage to
+  // load them a page at a time
+  getAll: async (params: Omit<DuesQuery, 'cursor' | 'limit'> = {}): Promise<Due[]> => {
     try {
-      const response = await api.get('/dues/');
+      const all: Due[] = [];
+      let cursor: string | null | undefined;
+      do {
+        const response = await api.get('/dues/', { params: { ...params, cursor, limit: MAX_PAGE_SIZE } });
+        all.push(...response.data.results);
+        cursor = response.data.next_cursor;
+      } while (cursor);
+      return all;
+    } catch (error) {
+      console.error('Error fetching dues:', error);
+      throw error;
+    }
+  },
+
+  getPage: async (params: DuesQuery = {}): Promise<DuesPage> => {
+    try {
+      const response = await api.get('/dues/', { params });
       return response.data;
     } catch (error) {
       console.error('Error fetching dues:', error);
@@ -58,10 +102,33 @@ export const dues = {
     }
   },
 
+  // Link for downloading every matching due; the server streams the file
+  exportUrl: (
+    format: 'csv' | 'ndjson' = 'csv',
+    params: Omit<DuesQuery, 'cursor' | 'limit'> & { created_from?: string; created_to?: string } = {}
+  ): string => api.getUri({ url: '/dues/export/', params: { ...params, format } }),
+
+  // CSV or NDJSON with retailer_phone / retailer_gst, amount, description,
+  // purchase_date and due_date columns
+  bulkImport: async (file: File): Promise<BulkImportReport> => {
+    const form = new FormData();
+    form.append('file', file);
+    try {
+      const response = await api.post('/dues/bulk/', form);
+      return response.data;
+    } catch (error) {
+      console.error('Error importing dues:', error);
+      throw error;
+    }
+  },
+
+  // Reuse idempotency_key when retrying the same payment; the server
+  // returns the original payment instead of posting it twice.
   makePayment: async (dueId: string, data: {
-    amount: number;
+    amount?: number;
     payment_method: string;
     reference_id?: string;
+    idempotency_key?: string;
   }): Promise<Payment> => {
     try {
       const response = await api.post(`/dues/${dueId}/pay/`, data);
@@ -1,10 +1,21 @@
 import { API_URL } from "./config";
 
+export interface ServerEvent {
+  type: string;
+  seq: number;
+  data: any;
+  stats?: any;
+  due?: any;
+}
+
 class WebSocketService {
   private isConnected: boolean = false;
+  private listeners: Map<string, Set<Function>> = new Map();
+  private lastSeq: number | null = null;
 
   connect(userId: string, userType: string) {
     this.isConnected = true;
+    this.lastSeq = null;
     console.log('Mock WebSocket connected');
   }
 
@@ -14,11 +25,27 @@ class WebSocketService {
   }
 
   addListener(event: string, callback: Function) {
-    // Mock implementation for POC
+    if (!this.listeners.has(event)) {
+      this.listeners.set(event, new Set());
+    }
+    this.listeners.get(event)!.add(callback);
   }
 
   removeListener(event: string, callback: Function) {
-    // Mock implementation for POC
+    this.listeners.get(event)?.delete(callback);
+  }
+
+  // Server events carry a per-user sequence number. A gap means events were
+  // missed, so listeners get a 'resync' and should refetch instead of
+  // applying the delta.
+  handleMessage(message: ServerEvent) {
+    const gap = this.lastSeq !== null && message.seq !== this.lastSeq + 1;
+    this.lastSeq = message.seq;
+    this.emit(gap ? 'resync' : message.type, message);
+  }
+
+  private emit(event: string, message: ServerEvent) {
+    this.listeners.get(event)?.forEach((callback) => callback(message));
   }
 
   getConnectionStatus(): boolean {